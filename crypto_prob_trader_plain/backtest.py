@@ -3,59 +3,128 @@ import pandas as pd
 import numpy as np
 from config import settings
 from datafeed import get_klines
-from strategy import generate_signals
-from features import make_features
-from model import fit_prob_model, add_probabilities, evaluate
+from strategy import signal_column
+import featgraph
+
+def _next_true(mask: np.ndarray) -> np.ndarray:
+    """nxt[k] = first j >= k with mask[j], else len(mask); has a trailing sentinel slot."""
+    n = len(mask)
+    idx = np.where(mask, np.arange(n), n)
+    nxt = np.full(n + 1, n, dtype=np.int64)
+    if n:
+        nxt[:n] = np.minimum.accumulate(idx[::-1])[::-1]
+    return nxt
+
+def _first_hit(arr: np.ndarray, start: int, stop: int, level: float, below: bool) -> int:
+    """First j in [start, stop) with arr[j] <= level (below) or >= level, else stop.
+    Scans in doubling blocks, so the cost is proportional to the trade length.
+    """
+    step = 64
+    while start < stop:
+        end = min(stop, start + step)
+        seg = arr[start:end]
+        hit = seg <= level if below else seg >= level
+        k = int(hit.argmax())
+        if hit[k]:
+            return start + k
+        start = end
+        step *= 2
+    return stop
+
+def long_only_arrays(close, high, low, buy, sell, fee_rate=0.0004, sl_pct=None, tp_pct=None):
+    """Long-only state machine over contiguous arrays.
+    Jumps entry → exit → next entry with vectorized searches; Python work is per trade, not per bar.
+    Returns (entry_idx, exit_idx, entry_px, exit_px, rets, equity, max_dd); an open
+    last trade has exit_idx -1 and NaN exit/ret.
+    """
+    close = np.ascontiguousarray(close, dtype=float)
+    high = np.ascontiguousarray(high, dtype=float)
+    low = np.ascontiguousarray(low, dtype=float)
+    n = len(close)
+    next_buy = _next_true(np.asarray(buy, dtype=bool))
+    next_sell = _next_true(np.asarray(sell, dtype=bool))
+
+    ent_i, ext_i, ent_px, ext_px, rets = [], [], [], [], []
+    i = int(next_buy[0])
+    while i < n:
+        entry = close[i]
+        sl_px = entry * (1 - sl_pct/100) if sl_pct is not None else None
+        tp_px = entry * (1 + tp_pct/100) if tp_pct is not None else None
+        e = int(next_sell[i + 1])
+        if sl_px is not None:
+            e = _first_hit(low, i + 1, e, sl_px, below=True)
+        if tp_px is not None:
+            e = _first_hit(high, i + 1, e, tp_px, below=False)
+        ent_i.append(i)
+        ent_px.append(entry)
+        if e >= n:
+            ext_i.append(-1); ext_px.append(np.nan); rets.append(np.nan)
+            break
+        # same precedence as the bar loop: SL, then TP, then SELL at close
+        if sl_px is not None and low[e] <= sl_px:
+            exit_price = sl_px
+        elif tp_px is not None and high[e] >= tp_px:
+            exit_price = tp_px
+        else:
+            exit_price = close[e]
+        ret = (exit_price * (1 - fee_rate)) / (entry * (1 + fee_rate)) - 1
+        ext_i.append(e); ext_px.append(exit_price); rets.append(ret)
+        i = int(next_buy[e + 1])
+
+    ent_i = np.array(ent_i, dtype=np.int64)
+    ext_i = np.array(ext_i, dtype=np.int64)
+    rets = np.array(rets, dtype=float)
+    step = np.zeros(n)
+    closed = ext_i >= 0
+    step[ext_i[closed]] = rets[closed]
+    equity = np.cumsum(step)
+    peak = np.maximum.accumulate(np.maximum(equity, 0.0)) if n else equity
+    max_dd = max(0.0, float((peak - equity).max())) if n else 0.0
+    return ent_i, ext_i, np.array(ent_px, dtype=float), np.array(ext_px, dtype=float), rets, equity, max_dd
 
 def simple_long_only(df: pd.DataFrame, fee_rate: float = 0.0004, sl_pct: float = None, tp_pct: float = None):
-    balance = 0.0
-    equity_curve = []
-    in_pos = False
-    entry = 0.0
-    max_dd = 0.0
-    peak = 0.0
-    trades = []
-    for ts, row in df.iterrows():
-        price = row["close"]
-        signal = row["signal"]
-        if not in_pos and signal == "BUY":
-            in_pos = True
-            entry = price
-            trades.append({"time_in": ts, "entry": entry})
-        elif in_pos:
-            hit_exit = False
-            exit_price = price
-            if sl_pct is not None and row["low"] <= entry * (1 - sl_pct/100):
-                exit_price = entry * (1 - sl_pct/100); hit_exit = True
-            if not hit_exit and tp_pct is not None and row["high"] >= entry * (1 + tp_pct/100):
-                exit_price = entry * (1 + tp_pct/100); hit_exit = True
-            if signal == "SELL" or hit_exit:
-                ret = (exit_price * (1 - fee_rate)) / (entry * (1 + fee_rate)) - 1
-                balance += ret
-                trades[-1].update({"time_out": ts, "exit": exit_price, "ret": ret})
-                in_pos = False
-        peak = max(peak, balance)
-        dd = peak - balance
-        max_dd = max(max_dd, dd)
-        equity_curve.append(balance)
+    signal = df["signal"].to_numpy()
+    ent_i, ext_i, ent_px, ext_px, rets, equity, max_dd = long_only_arrays(
+        df["close"].to_numpy(), df["high"].to_numpy(), df["low"].to_numpy(),
+        signal == "BUY", signal == "SELL",
+        fee_rate=fee_rate, sl_pct=sl_pct, tp_pct=tp_pct)
+    if len(ent_i):
+        trades = pd.DataFrame({"time_in": df.index[ent_i], "entry": ent_px})
+        if (ext_i >= 0).any():
+            trades["time_out"] = pd.Series(df.index[np.maximum(ext_i, 0)]).where(ext_i >= 0)
+            trades["exit"] = ext_px
+            trades["ret"] = rets
+    else:
+        trades = pd.DataFrame()
     res = {
-        "total_return": balance,
+        "total_return": float(equity[-1]) if len(equity) else 0.0,
         "max_drawdown": max_dd,
-        "equity_curve": pd.Series(equity_curve, index=df.index),
-        "trades": pd.DataFrame(trades)
+        "equity_curve": pd.Series(equity, index=df.index),
+        "trades": trades
     }
     return res
 
-def run_backtests():
+def run_backtests(train_size=None, test_size=None, mode=None, workers=None):
     print(f"Fetching data {settings.symbol} {settings.interval} {settings.limit}...")
     df_raw = get_klines(settings.symbol, settings.interval, settings.limit)
 
-    rule_df, _ = generate_signals(df_raw, settings.rsi_len, settings.fib_lookback, settings.prox_pct)
+    # Rule inputs straight from the feature graph: the backtest never touches the model
+    # registry, so it cannot fit on the full history or overwrite the live model
+    blk = featgraph.block(df_raw, settings.rsi_len, settings.fib_lookback, settings.prox_pct)
+    rule_df = pd.concat([df_raw, blk.frame(valid_only=False)[featgraph.INDICATOR_COLS]], axis=1)
+    lvls = featgraph.fib_levels(df_raw, settings.fib_lookback)
 
-    feat_df, feats = make_features(df_raw, settings.rsi_len, settings.fib_lookback, settings.prox_pct)
-    model = fit_prob_model(feat_df, feats)
-    print("Prob model train metrics:", evaluate(model, feat_df, feats))
-    prob_df = add_probabilities(model, feat_df, feats, thr=settings.threshold)
+    # Walk-forward: every prob_up below is out-of-sample (NaN inside the first train window)
+    from walkforward import walk_forward, summarize_folds  # walkforward → sweep → backtest
+    feat_df, feats = blk.features()
+    oos, folds = walk_forward(feat_df, feats, train_size, test_size, mode, workers)
+    print(f"Prob model out-of-sample metrics ({len(folds)} folds):", summarize_folds(folds) if len(folds) else {})
+    thr = settings.threshold
+    prob_df = pd.DataFrame({"prob_up": oos,
+                            "signal_prob": np.where(oos > thr, "BUY", np.where(oos < 1 - thr, "SELL", ""))})
+    # the rule's prob gate uses the same out-of-sample series
+    rule_df["prob_up"] = oos.reindex(rule_df.index)
+    rule_df["signal"] = signal_column(rule_df, lvls, settings.prox_pct)
 
     merged = df_raw.join(rule_df[["signal"]], how="left").join(prob_df[["prob_up","signal_prob"]], how="left")
     merged["signal_rule"] = merged["signal"].fillna("")
@@ -78,7 +147,7 @@ def run_backtests():
     summarize("Prob", res_prob)
     summarize("Hybrid", res_hyb)
 
-    return {"rule": res_rule, "prob": res_prob, "hybrid": res_hyb, "merged": merged}
+    return {"rule": res_rule, "prob": res_prob, "hybrid": res_hyb, "merged": merged, "folds": folds}
 
 if __name__ == "__main__":
     run_backtests()
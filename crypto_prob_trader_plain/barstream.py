@@ -0,0 +1,159 @@
+"""Gap-free live bars: kline websocket + batched REST backfill + incremental indicators.
+
+BarStream seeds a KlineWindow and a stream_indicators.IndicatorSet once, then only
+moves forward: every closed bar is fed to the indicators exactly once, in order.
+When a kline skips bars (missed messages) or the shared websocket reconnects
+(streamhub on_connect), the missing range is fetched with datafeed.fetch_since
+(up to 1000 bars per request, not one request per bar), spliced into the window
+and pushed through the indicators before the live event is applied. A disconnect
+therefore never forces the indicators to be recomputed from scratch. Next to the
+indicators a stream_indicators.FeatureState keeps the model features and fib levels
+of the newest bar, so latest() is everything a last-bar decision needs (run_live).
+
+    bars = BarStream("ETHUSDT", "1m").start()
+    while True:
+        for row in bars.poll(timeout=60):   # closed bars, OHLCV + indicator values
+            ...
+"""
+import threading
+import time
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from config import settings
+from datafeed import (KlineWindow, MAX_PAGE, closed_mask, fetch_since, interval_ms,
+                      klines_to_frame, open_store)
+from stream_indicators import FeatureState, IndicatorSet
+import featgraph
+from streamhub import get_hub
+from ws_live import KlineStream
+
+class BarStream:
+    def __init__(self, symbol: str = None, interval: str = None, limit: int = None, rsi_len: int = None,
+                 window: KlineWindow = None, lookback: int = None, prox_pct: float = None):
+        self.window = window or KlineWindow(symbol, interval, limit)
+        self.symbol = self.window.symbol
+        self.interval = self.window.interval
+        self.step = interval_ms(self.interval)
+        self.rsi_len = rsi_len or settings.rsi_len
+        self.indicators = IndicatorSet(self.rsi_len)
+        self.features = FeatureState(lookback or settings.fib_lookback,
+                                     settings.prox_pct if prox_pct is None else prox_pct)
+        self.stream = KlineStream(self.symbol, self.interval)
+        self.last_closed = None   # open time (ms) of the last bar fed to the indicators
+        self.live = None          # provisional indicator/feature values of the in-progress bar
+        self.last_event = None    # perf_counter of the last websocket event
+        self.backfills = 0
+        self.backfilled_bars = 0
+        self._rows = deque(maxlen=self.window.limit)  # (time, indicator/feature dict) of closed bars
+        self._resync = threading.Event()
+
+    def start(self):
+        df = self.window.refresh()
+        now_ms = int(time.time() * 1000)
+        ms = df.index.as_unit("ms").asi8
+        closed = df[ms + self.step <= now_ms]  # the last row may still be in progress
+        # the only full computation: everything after this advances bar by bar
+        self.indicators.seed(closed)
+        blk = featgraph.block(closed, self.rsi_len, self.features.lookback, self.features.prox_pct)
+        seeded = blk.frame(valid_only=False)
+        last = {c: float(seeded[c].iat[-1]) for c in ["close"] + featgraph.INDICATOR_COLS}
+        self._rows.append((closed.index[-1], {**last, **self.features.seed(seeded)}))
+        self.last_closed = int(ms[len(closed) - 1])
+        get_hub().on_connect(self._on_connect)
+        self.stream.start()
+        self.last_event = time.perf_counter()
+        return self
+
+    def stop(self):
+        self.stream.stop()
+        get_hub().off_connect(self._on_connect)
+
+    def _on_connect(self, reconnect: bool):
+        # runs on the hub thread: just flag it, poll() does the REST work
+        if reconnect:
+            self._resync.set()
+
+    def resync(self, reason: str = "resync") -> list:
+        """Backfill every closed bar after last_closed (e.g. after a silent socket)."""
+        return self._backfill(reason)
+
+    def poll(self, timeout: float) -> list:
+        """Apply pending websocket klines; returns the newly closed bars in order, each a dict
+        of time, OHLCV, indicator values and `received` (perf_counter, websocket bars only)."""
+        out = []
+        if self._resync.is_set():
+            self._resync.clear()
+            out += self._backfill("reconnect")
+        for ev in self.stream.get(timeout):
+            self.last_event = ev.received
+            open_ms = int(ev.raw[0])
+            if open_ms <= self.last_closed:
+                continue  # already final here (duplicate or covered by a backfill)
+            if open_ms > self.last_closed + self.step:
+                out += self._backfill(f"gap before {pd.to_datetime(open_ms, unit='ms')}")
+                if open_ms <= self.last_closed:
+                    continue
+            self.window.apply(ev.raw, ev.closed)
+            bar = klines_to_frame([ev.raw])
+            if ev.closed:
+                out.append(self._commit(bar, received=ev.received))
+            else:
+                self.live = self._advance(bar.iloc[0], final=False)
+        return out
+
+    def _advance(self, row, final: bool, time=None) -> dict:
+        ind = self.indicators.update(row, final=final, time=time)
+        return {"close": float(row["close"]), **ind, **self.features.update(row, ind, final=final)}
+
+    def _backfill(self, reason: str) -> list:
+        raw = fetch_since(self.symbol, self.interval, self.last_closed + self.step)
+        self.backfills += 1
+        if not raw:
+            return []
+        closed = closed_mask(raw)
+        new = klines_to_frame(raw)
+        if self.window.use_store:
+            open_store(self.symbol, self.interval).append_frame(new[closed])
+        # splice first, then advance the indicators over the missing closed bars in order
+        self.window.merge(new)
+        out = [self._commit(new.iloc[[i]]) for i in np.flatnonzero(closed)]
+        if not closed[-1]:
+            self.live = self._advance(new.iloc[-1], final=False)
+        self.backfilled_bars += len(out)
+        print(f"[bars] {self.symbol} {self.interval}: {reason} → backfilled {len(out)} bars "
+              f"in {-(-len(raw) // MAX_PAGE)} request(s)")
+        return out
+
+    def _commit(self, bar: pd.DataFrame, received: float = None) -> dict:
+        t = bar.index[0]
+        ind = self._advance(bar.iloc[0], final=True, time=t)
+        self.last_closed = int(bar.index.as_unit("ms").asi8[0])
+        self.live = None
+        self._rows.append((t, ind))
+        return {"time": t, **bar.iloc[0].to_dict(), **ind, "received": received}
+
+    def latest(self) -> dict:
+        """Close, indicator, feature and fib values of the newest bar (the in-progress one
+        while it is live) with its `time`."""
+        t, row = self._rows[-1]
+        if self.live is not None and len(self.window.df) and self.window.df.index[-1] > t:
+            t, row = self.window.df.index[-1], self.live
+        return {"time": t, **row}
+
+    @property
+    def idle_s(self) -> float:
+        return time.perf_counter() - self.last_event
+
+    def frame(self) -> pd.DataFrame:
+        """The window with indicator/feature columns for the bars from start() on (and the
+        provisional values of the in-progress bar)."""
+        rows = list(self._rows)
+        if self.live is not None and len(self.window.df) and \
+                (not rows or self.window.df.index[-1] > rows[-1][0]):
+            rows.append((self.window.df.index[-1], self.live))
+        ind = pd.DataFrame([r for _, r in rows], index=pd.DatetimeIndex([t for t, _ in rows], name="time"))
+        ind = ind.drop(columns="close")
+        return self.window.df.join(ind, how="left")
@@ -0,0 +1,102 @@
+"""Plotly figures for the dashboard with a flat per-viewer cost.
+
+The history (close, EMAs, fib lines, BUY markers, MACD, P(up)) is built once per
+data version, downsampled server-side with LTTB (largest-triangle-three-buckets)
+to a pixel budget and drawn with WebGL traces once it is long. The once-a-second
+live layer is a separate small figure holding only the latest bars and the live
+price marker, so what is re-sent every second does not grow with the history.
+Streamlit cannot patch a figure already in the browser, so this split is the
+closest thing to "send the history once, then only the deltas".
+"""
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+from config import settings
+
+WEBGL_MIN_POINTS = 2000  # below this SVG traces are cheaper than a WebGL context
+LIVE_BARS = 30           # bars shown next to the live marker
+
+def lttb(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """Indices of the n_out points LTTB keeps (first and last always kept; NaN-free input)."""
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)  # n_out-2 buckets between the ends
+    keep = np.empty(n_out, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        nxt_lo, nxt_hi = hi, edges[i + 2] if i + 2 < len(edges) else n
+        cx, cy = x[nxt_lo:nxt_hi].mean(), y[nxt_lo:nxt_hi].mean()
+        bx, by = x[lo:hi], y[lo:hi]
+        area = np.abs((x[a] - cx) * (by - y[a]) - (x[a] - bx) * (cy - y[a]))
+        a = lo + int(area.argmax())
+        keep[i + 1] = a
+    return keep
+
+def downsample(s: pd.Series, n_out: int) -> pd.Series:
+    s = s.dropna()
+    if len(s) <= n_out:
+        return s
+    x = s.index.asi8 if isinstance(s.index, pd.DatetimeIndex) else np.arange(len(s))
+    return s.iloc[lttb(x, s.to_numpy(dtype=float), n_out)]
+
+def _line(s: pd.Series, name: str, n_out: int, **kw):
+    pts = downsample(s, n_out)
+    trace = go.Scattergl if len(s) > WEBGL_MIN_POINTS else go.Scatter
+    return trace(x=pts.index, y=pts.to_numpy(), name=name, mode="lines", **kw)
+
+def history_figures(df: pd.DataFrame, lvls: dict, thr: float, max_points: int = None) -> dict:
+    """{"price", "macd", "prob"} figures of the whole history, at most max_points per line."""
+    n_out = max_points or settings.chart_max_points
+    price = go.Figure()
+    price.add_trace(_line(df["close"], "Close", n_out, line=dict(width=1.2)))
+    for col in ("ema50", "ema200"):
+        if col in df.columns:
+            price.add_trace(_line(df[col], col.upper(), n_out))
+    for name, lvl in lvls.items():
+        price.add_hline(y=lvl, line_dash="dash", opacity=0.3, annotation_text=name)
+    buys = df[df["signal"] == "BUY"]
+    if not buys.empty:
+        price.add_trace(go.Scatter(x=buys.index, y=buys["close"], mode="markers",
+                                   name="BUY", marker_symbol="triangle-up", marker_size=10))
+    price.update_layout(height=460, margin=dict(l=10, r=10, t=30, b=10))
+
+    figs = {"price": price}
+    if {"macd", "macd_signal"}.issubset(df.columns):
+        macd = go.Figure()
+        macd.add_trace(_line(df["macd"], "MACD", n_out))
+        macd.add_trace(_line(df["macd_signal"], "Signal", n_out))
+        macd.update_layout(height=300, margin=dict(l=10, r=10, t=30, b=10))
+        figs["macd"] = macd
+    if "prob_up" in df.columns:
+        prob = go.Figure()
+        prob.add_trace(_line(df["prob_up"], "Prob(up)", n_out))
+        prob.add_hline(y=thr, line_dash="dash", opacity=0.4, annotation_text="BUY thr")
+        prob.add_hline(y=1 - thr, line_dash="dash", opacity=0.4, annotation_text="SELL thr")
+        prob.update_yaxes(range=[0, 1])
+        prob.update_layout(height=300, margin=dict(l=10, r=10, t=30, b=10))
+        figs["prob"] = prob
+    return figs
+
+def live_figure(df: pd.DataFrame, lvls: dict, live_price: float, bar_close, bars: int = LIVE_BARS) -> go.Figure:
+    """The latest bars as candles plus the live price marker: a fixed, small payload."""
+    tail = df.iloc[-bars:]
+    fig = go.Figure(go.Candlestick(x=tail.index, open=tail["open"], high=tail["high"],
+                                   low=tail["low"], close=tail["close"], name="Bars"))
+    lo, hi = float(tail["low"].min()), float(tail["high"].max())
+    for name, lvl in lvls.items():
+        if lo <= lvl <= hi:
+            fig.add_hline(y=lvl, line_dash="dash", opacity=0.3, annotation_text=name)
+    now_utc = pd.Timestamp.now(tz="UTC").tz_localize(None)
+    fig.add_trace(go.Scatter(x=[now_utc], y=[live_price], mode="markers+text", text=[f"{live_price:.2f}"],
+                             textposition="top center", name="Live", marker_symbol="circle", marker_size=10))
+    bar_close = pd.Timestamp(bar_close)
+    fig.add_vline(x=bar_close.tz_localize(None) if bar_close.tzinfo else bar_close, line_dash="dot", opacity=0.3)
+    fig.update_layout(height=260, margin=dict(l=10, r=10, t=30, b=10), showlegend=False,
+                      xaxis_rangeslider_visible=False)
+    return fig
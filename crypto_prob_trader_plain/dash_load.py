@@ -0,0 +1,188 @@
+"""Load test for the Streamlit dashboard: N concurrent sessions on one server.
+
+Starts fake_binance (REST + streams), runs `streamlit run streamlit_app.py` against
+it and opens N headless sessions on the server's websocket. Each session behaves
+like a browser tab: one full script run, then it honours the fragments' auto-rerun
+timers (live panel every 1s, data panel every POLL_SECONDS) by sending fragment
+reruns. Reports run latency per kind, server threads/RSS and how many REST
+requests the fake exchange saw (one shared data feed → independent of N).
+
+    python dash_load.py --sessions 50 --seconds 60
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+import numpy as np
+import websockets
+from streamlit.proto.Alert_pb2 import Alert
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+from fake_binance import FakeBinance, FakeStreams
+
+def _free_port() -> int:
+    import socket
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def _proc_status(pid: int) -> dict:
+    out = {}
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            key, _, val = line.partition(":")
+            if key in ("Threads", "VmRSS"):
+                out[key] = int(val.split()[0])
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    out["cpu_s"] = (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")  # utime + stime
+    return out
+
+class Session:
+    def __init__(self, url: str):
+        self.url = url
+        self.runs = {"full": [], "fragment": []}
+        self.errors = 0
+        self.last_error = None
+        self.failed = None   # connection error, if the session never ran
+        self._pending = []   # (kind, sent perf_counter) not yet picked up by a run
+        self._in_run = []    # requests the current run serves (queued reruns are merged)
+        self._timers = {}    # fragment_id -> task
+
+    async def _rerun(self, ws, fragment_id: str = ""):
+        msg = BackMsg()
+        msg.rerun_script.query_string = ""
+        if fragment_id:
+            msg.rerun_script.fragment_id = fragment_id
+            msg.rerun_script.is_auto_rerun = True
+        self._pending.append(("fragment" if fragment_id else "full", time.perf_counter()))
+        await ws.send(msg.SerializeToString())
+
+    async def _auto_rerun(self, ws, interval: float, fragment_id: str):
+        while True:
+            await asyncio.sleep(interval)
+            await self._rerun(ws, fragment_id)
+
+    async def run(self, seconds: float):
+        async with websockets.connect(self.url, max_size=None, open_timeout=60) as ws:
+            await self._rerun(ws)
+            deadline = time.perf_counter() + seconds
+            try:
+                while True:
+                    remaining = deadline - time.perf_counter()
+                    if remaining <= 0:
+                        break
+                    try:
+                        raw = await asyncio.wait_for(ws.recv(), remaining)
+                    except asyncio.TimeoutError:
+                        break
+                    self._handle(ws, raw)
+            finally:
+                for task in self._timers.values():
+                    task.cancel()
+
+    def _handle(self, ws, raw: bytes):
+        msg = ForwardMsg()
+        msg.ParseFromString(raw)
+        kind = msg.WhichOneof("type")
+        if kind == "auto_rerun":
+            fid = msg.auto_rerun.fragment_id
+            if fid not in self._timers:
+                self._timers[fid] = asyncio.ensure_future(self._auto_rerun(ws, msg.auto_rerun.interval, fid))
+        elif kind == "delta":
+            el = msg.delta.new_element
+            what = el.WhichOneof("type")
+            if what == "exception" or (what == "alert" and el.alert.format == Alert.ERROR):
+                self.errors += 1
+                self.last_error = el.exception.message if what == "exception" else el.alert.body
+        elif kind == "session_status_changed" and msg.session_status_changed.script_is_running:
+            self._in_run, self._pending = self._in_run + self._pending, []
+        elif kind == "script_finished" and self._in_run:
+            if msg.script_finished == ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+                return  # the interrupting run serves these requests too
+            what = "full" if any(k == "full" for k, _ in self._in_run) else "fragment"
+            self.runs[what].append(time.perf_counter() - min(t for _, t in self._in_run))
+            self._in_run = []
+
+async def _drive(url: str, n: int, seconds: float, ramp_s: float) -> list:
+    sessions = [Session(url) for _ in range(n)]
+
+    async def start(i, s):
+        await asyncio.sleep(ramp_s * i / max(1, n))
+        try:
+            await s.run(seconds)
+        except Exception as e:
+            s.failed = repr(e)
+
+    await asyncio.gather(*(start(i, s) for i, s in enumerate(sessions)))
+    return sessions
+
+def load_test(n_sessions: int = 50, seconds: float = 60.0, poll_seconds: int = 5, ramp_s: float = 5.0):
+    here = os.path.dirname(os.path.abspath(__file__))
+    port = _free_port()
+    with tempfile.TemporaryDirectory() as tmp, FakeBinance(weight_limit=10 ** 9) as fake, \
+            FakeStreams() as streams:
+        env = dict(os.environ, BINANCE_REST_URL=fake.url, BINANCE_WS_URL=streams.url,
+                   KLINE_STORE_DIR=os.path.join(tmp, "data"), MODEL_DIR=os.path.join(tmp, "models"),
+                   INTERVAL="1m", LIMIT="500", POLL_SECONDS=str(poll_seconds))
+        server = subprocess.Popen(
+            [sys.executable, "-m", "streamlit", "run", os.path.join(here, "streamlit_app.py"),
+             "--server.headless", "true", "--server.port", str(port),
+             "--server.enableXsrfProtection", "false", "--server.enableCORS", "false",
+             "--browser.gatherUsageStats", "false"],
+            cwd=here, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.STDOUT)
+        try:
+            for _ in range(300):
+                try:
+                    urllib.request.urlopen(f"http://127.0.0.1:{port}/_stcore/health", timeout=1)
+                    break
+                except OSError:
+                    time.sleep(0.1)
+            else:
+                raise RuntimeError("streamlit server did not come up")
+            idle = _proc_status(server.pid)
+            t0, cpu0 = time.perf_counter(), time.process_time()
+            sessions = asyncio.run(_drive(f"ws://127.0.0.1:{port}/_stcore/stream", n_sessions, seconds, ramp_s))
+            wall = time.perf_counter() - t0
+            driver_cpu = time.process_time() - cpu0
+            busy = _proc_status(server.pid)
+        finally:
+            server.terminate()
+            server.wait(timeout=10)
+
+    print(f"{n_sessions} sessions for {seconds:.0f}s on one server ({wall:.0f}s wall)")
+    for kind in ("full", "fragment"):
+        lat = np.array([x for s in sessions for x in s.runs[kind]]) * 1000
+        if len(lat):
+            print(f"  {kind:8s} runs={len(lat):6d} ({len(lat) / wall:6.1f}/s)  "
+                  f"p50={np.percentile(lat, 50):6.0f}ms p95={np.percentile(lat, 95):6.0f}ms "
+                  f"p99={np.percentile(lat, 99):6.0f}ms")
+    starved = sum(1 for s in sessions if len(s.runs["fragment"]) == 0)
+    failed = [s.failed for s in sessions if s.failed]
+    if failed:
+        print(f"  failed sessions: {len(failed)} (e.g. {failed[0]})")
+    errors = [s.last_error for s in sessions if s.errors]
+    print(f"  sessions without a fragment run: {starved} | errors shown: {sum(s.errors for s in sessions)}"
+          + (f" (e.g. {errors[0]})" if errors else ""))
+    print(f"  server threads: {idle['Threads']} idle → {busy['Threads']} under load | "
+          f"RSS {busy['VmRSS'] / 1024:.0f}MB | server CPU {(busy['cpu_s'] - idle['cpu_s']) / wall:.0%} "
+          f"of one core, load driver {driver_cpu / wall:.0%} ({os.cpu_count()} cores)")
+    print(f"  fake exchange REST requests: {fake.requests}")
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--sessions", type=int, default=50)
+    ap.add_argument("--seconds", type=float, default=60.0)
+    ap.add_argument("--poll", type=int, default=5, help="POLL_SECONDS for the data panel")
+    ap.add_argument("--ramp", type=float, default=5.0, help="seconds over which sessions connect")
+    args = ap.parse_args()
+    load_test(args.sessions, args.seconds, args.poll, args.ramp)
+
+if __name__ == "__main__":
+    main()
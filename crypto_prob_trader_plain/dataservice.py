@@ -0,0 +1,162 @@
+"""Process-wide market data for the dashboard, shared by every viewer.
+
+Each (symbol, interval) that somebody looks at gets one Feed: a background thread
+that refreshes a KlineWindow (incremental REST), runs generate_signals (the model
+comes from the registry, keyed by symbol/interval/params, not by hashing frames)
+and publishes the result as an immutable, versioned Snapshot. Sessions only read
+the latest snapshot, so ten viewers of ETHUSDT 1h cost one fetch and one model,
+not ten. Anything derived per data version (figures, ...) is memoised on the
+snapshot itself with Snapshot.derive(). Feeds nobody has read for FEED_IDLE_S stop.
+
+    snap = get_service().snapshot("ETHUSDT", "1h", max_age=60)
+    snap.df, snap.lvls, snap.version
+"""
+import threading
+import time
+
+import pandas as pd
+
+from config import settings
+from datafeed import KlineWindow
+from strategy import generate_signals
+
+FEED_IDLE_S = 600.0     # stop refreshing a pair nobody has read for this long
+MIN_REFRESH_S = 1.0
+
+class Snapshot:
+    """One published state of a feed. Never mutated after publication: treat df as read-only."""
+    __slots__ = ("symbol", "interval", "version", "df", "lvls", "fetched_at", "build_s", "_derived", "_lock")
+
+    def __init__(self, symbol: str, interval: str, version: int, df: pd.DataFrame, lvls: dict, build_s: float):
+        self.symbol = symbol
+        self.interval = interval
+        self.version = version
+        self.df = df
+        self.lvls = lvls
+        self.fetched_at = time.time()
+        self.build_s = build_s
+        self._derived = {}
+        self._lock = threading.Lock()
+
+    @property
+    def age_s(self) -> float:
+        return time.time() - self.fetched_at
+
+    def derive(self, key, fn):
+        """fn(snapshot), computed once per snapshot and key and shared by all sessions."""
+        with self._lock:
+            if key not in self._derived:
+                self._derived[key] = fn(self)
+            return self._derived[key]
+
+class Feed:
+    def __init__(self, symbol: str, interval: str, refresh_s: float, limit: int = None):
+        self.symbol = symbol
+        self.interval = interval
+        self.refresh_s = max(MIN_REFRESH_S, refresh_s)
+        self.window = KlineWindow(symbol, interval, limit)
+        self.snapshot = None   # latest Snapshot; replaced atomically, never modified
+        self.error = None      # last refresh error (the previous snapshot stays served)
+        self.last_read = time.monotonic()
+        self._ready = threading.Event()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"feed-{symbol}-{interval}", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    @property
+    def alive(self) -> bool:
+        return self._thread.is_alive()
+
+    def refresh(self):
+        t0 = time.perf_counter()
+        raw = self.window.refresh()
+        df, lvls = generate_signals(raw, settings.rsi_len, settings.fib_lookback, settings.prox_pct,
+                                    symbol=self.symbol, interval=self.interval)
+        version = self.snapshot.version + 1 if self.snapshot else 1
+        self.snapshot = Snapshot(self.symbol, self.interval, version, df, lvls, time.perf_counter() - t0)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.refresh()
+                self.error = None
+            except Exception as e:
+                self.error = e
+                print(f"[data] {self.symbol} {self.interval}: {e}")
+            self._ready.set()
+            if time.monotonic() - self.last_read > FEED_IDLE_S:
+                break
+            self._wake.wait(self.refresh_s)
+            self._wake.clear()
+
+    def wait(self, timeout: float = None) -> bool:
+        return self._ready.wait(timeout)
+
+class DataService:
+    def __init__(self, limit: int = None):
+        self.limit = limit
+        self._feeds = {}
+        self._lock = threading.Lock()
+
+    def feed(self, symbol: str, interval: str, max_age: float = None) -> Feed:
+        """The shared feed of a pair, started on first use; the fastest viewer sets the cadence."""
+        key = (symbol.upper(), interval)
+        refresh_s = settings.poll_seconds if max_age is None else max_age
+        with self._lock:
+            feed = self._feeds.get(key)
+            if feed is None or not feed.alive:
+                feed = self._feeds[key] = Feed(key[0], interval, refresh_s, self.limit).start()
+            elif refresh_s < feed.refresh_s:
+                feed.refresh_s = max(MIN_REFRESH_S, refresh_s)
+                feed._wake.set()
+        feed.last_read = time.monotonic()
+        return feed
+
+    def snapshot(self, symbol: str, interval: str, max_age: float = None, timeout: float = 30.0) -> Snapshot:
+        """Latest snapshot of the pair (waits for the first one); raises the refresh error if none exists."""
+        feed = self.feed(symbol, interval, max_age)
+        if not feed.wait(timeout):
+            raise TimeoutError(f"no data for {symbol} {interval} after {timeout:.0f}s")
+        snap = feed.snapshot
+        if snap is None:
+            raise feed.error
+        return snap
+
+    def refresh_now(self, symbol: str, interval: str):
+        self.feed(symbol, interval)._wake.set()
+
+    def stats(self) -> dict:
+        with self._lock:
+            feeds = list(self._feeds.values())
+        return {f"{f.symbol} {f.interval}": {"version": f.snapshot.version if f.snapshot else 0,
+                                             "age_s": f.snapshot.age_s if f.snapshot else None,
+                                             "build_s": f.snapshot.build_s if f.snapshot else None,
+                                             "refresh_s": f.refresh_s, "alive": f.alive,
+                                             "error": str(f.error) if f.error else None}
+                for f in feeds}
+
+    def stop(self):
+        with self._lock:
+            for feed in self._feeds.values():
+                feed.stop()
+            self._feeds.clear()
+
+_lock = threading.Lock()
+_service = None
+
+def get_service() -> DataService:
+    """The process-wide service (one per Streamlit server, shared by all sessions)."""
+    global _service
+    if _service is None:
+        with _lock:
+            if _service is None:
+                _service = DataService()
+    return _service
@@ -0,0 +1,138 @@
+"""Range max/min index over high/low for rolling Fibonacci levels at any lookback.
+
+ExtremaIndex builds sparse tables once (O(n log n)); afterwards "max high / min low
+over the last N bars ending at t" is two lookups for any N, and a whole rolling
+column for a new lookback is one vectorized gather instead of another rolling scan.
+MonotonicWindow is the streaming (live) variant for one fixed lookback.
+"""
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+FIB_RATIOS = {"fib382": 0.382, "fib50": 0.5, "fib618": 0.618}
+
+class SparseTable:
+    """Idempotent range query (max or min) over a 1-D array."""
+
+    def __init__(self, values, op=np.maximum, max_window: int = None):
+        values = np.ascontiguousarray(values, dtype=float)
+        self.op = op
+        self.n = len(values)
+        top = max(1, min(self.n, max_window or self.n))
+        self.levels = [values]
+        k = 1
+        while (1 << k) <= top:
+            prev = self.levels[-1]
+            half = 1 << (k - 1)
+            self.levels.append(op(prev[:-half], prev[half:]))
+            k += 1
+
+    @property
+    def max_window(self) -> int:
+        return (1 << len(self.levels)) - 1
+
+    def query(self, start: int, stop: int) -> float:
+        """op over values[start:stop] (stop exclusive, non-empty)."""
+        k = (stop - start).bit_length() - 1
+        if k >= len(self.levels):
+            raise ValueError(f"window {stop - start} exceeds max_window {self.max_window}")
+        lvl = self.levels[k]
+        return float(self.op(lvl[start], lvl[stop - (1 << k)]))
+
+    def rolling(self, window: int) -> np.ndarray:
+        """out[t] = op over the `window` values ending at t; NaN for t < window-1."""
+        out = np.full(self.n, np.nan)
+        if window > self.n:
+            return out
+        k = window.bit_length() - 1
+        if k >= len(self.levels):
+            raise ValueError(f"window {window} exceeds max_window {self.max_window}")
+        lvl = self.levels[k]
+        t = np.arange(window - 1, self.n)
+        out[window - 1:] = self.op(lvl[t - window + 1], lvl[t - (1 << k) + 1])
+        return out
+
+class ExtremaIndex:
+    """Sparse tables for max(high) and min(low) of one kline history."""
+
+    def __init__(self, high, low, index=None, max_window: int = None):
+        self.index = index
+        self.hi_table = SparseTable(high, np.maximum, max_window)
+        self.lo_table = SparseTable(low, np.minimum, max_window)
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, max_window: int = None):
+        return cls(df["high"].to_numpy(), df["low"].to_numpy(), df.index, max_window)
+
+    def __len__(self):
+        return self.hi_table.n
+
+    def hi_lo(self, lookback: int, t: int = -1) -> tuple:
+        """(max high, min low) over the last `lookback` bars ending at position t."""
+        n = len(self)
+        t = t % n
+        start = max(0, t - lookback + 1)
+        return self.hi_table.query(start, t + 1), self.lo_table.query(start, t + 1)
+
+    def fib_levels(self, lookback: int = 200, t: int = -1) -> dict:
+        """Same dict as indicators.fib_levels(df.iloc[:t+1], lookback)."""
+        hi, lo = self.hi_lo(lookback, t)
+        rng = hi - lo
+        return {name: hi - r * rng for name, r in FIB_RATIOS.items()}
+
+    def rolling(self, lookback: int) -> tuple:
+        """(hi, lo) arrays equal to high.rolling(lookback).max() / low.rolling(lookback).min()."""
+        return self.hi_table.rolling(lookback), self.lo_table.rolling(lookback)
+
+    def rolling_fib(self, lookbacks) -> dict:
+        """{lookback: DataFrame of fib382/fib50/fib618} without rescanning the data."""
+        out = {}
+        for lb in lookbacks:
+            hi, lo = self.rolling(lb)
+            rng = hi - lo
+            out[lb] = pd.DataFrame({name: hi - r * rng for name, r in FIB_RATIOS.items()},
+                                   index=self.index)
+        return out
+
+class MonotonicWindow:
+    """Streaming max(high)/min(low) over the last `lookback` bars, amortized O(1) per bar.
+    push(..., final=False) answers for an in-progress bar without storing it.
+    """
+
+    def __init__(self, lookback: int):
+        self.lookback = lookback
+        self.t = 0
+        self._hi = deque()  # (t, high), highs decreasing
+        self._lo = deque()  # (t, low), lows increasing
+
+    def seed(self, df: pd.DataFrame):
+        for h, l in zip(df["high"].to_numpy()[-self.lookback:], df["low"].to_numpy()[-self.lookback:]):
+            self.push(h, l)
+        return self
+
+    def push(self, high: float, low: float, final: bool = True) -> tuple:
+        if not final:
+            # deque fronts are the window extremes; at most one entry just fell out
+            start = self.t - self.lookback + 1
+            hi = next((h for t, h in self._hi if t >= start), high)
+            lo = next((l for t, l in self._lo if t >= start), low)
+            return max(hi, high), min(lo, low)
+        t = self.t
+        while self._hi and self._hi[-1][1] <= high:
+            self._hi.pop()
+        self._hi.append((t, high))
+        while self._lo and self._lo[-1][1] >= low:
+            self._lo.pop()
+        self._lo.append((t, low))
+        start = t - self.lookback + 1
+        while self._hi[0][0] < start:
+            self._hi.popleft()
+        while self._lo[0][0] < start:
+            self._lo.popleft()
+        self.t += 1
+        return self._hi[0][1], self._lo[0][1]
+
+    @property
+    def hi_lo(self) -> tuple:
+        return self._hi[0][1], self._lo[0][1]
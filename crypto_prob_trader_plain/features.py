@@ -1,15 +1,27 @@
 
 import numpy as np
 import pandas as pd
+import pandas_ta as ta
 from indicators import add_rsi, add_ema, add_atr, add_macd
 
+FEATURE_COLS = [
+    "rsi", "ema_spread", "ema_cross_up", "ema_cross_down",
+    "macd_edge", "fib_rel_dist", "near_fib", "vol_10", "atr_norm"
+]
+
 def make_features(df: pd.DataFrame, rsi_len=14, lookback=200, prox_pct=0.25):
     out = df.copy()
     out = add_rsi(out, rsi_len)
     out = add_ema(out, spans=(50, 200))
     out = add_atr(out, length=14)
     out = add_macd(out, fast=12, slow=26, signal=9)
+    return build_features(out, lookback=lookback, prox_pct=prox_pct)
 
+def build_features(out: pd.DataFrame, lookback=200, prox_pct=0.25, extrema=None):
+    """Derived features on a frame that already carries rsi/ema50/ema200/atr/macd columns.
+    Writes into `out`; make_features hands it a private copy. `extrema` (an
+    extrema.ExtremaIndex over the same rows) replaces the rolling max/min scans.
+    """
     out["ret"] = np.log(out["close"]).diff()
     out["vol_10"] = out["ret"].rolling(10).std()
     out["atr_norm"] = out["atr"] / out["close"]
@@ -21,8 +33,11 @@ def make_features(df: pd.DataFrame, rsi_len=14, lookback=200, prox_pct=0.25):
     out["macd_edge"] = out["macd"] - out["macd_signal"]
 
     # Rolling Fibonacci (no look-ahead)
-    hi = out["high"].rolling(lookback).max()
-    lo = out["low"].rolling(lookback).min()
+    if extrema is not None:
+        hi, lo = (pd.Series(a, index=out.index) for a in extrema.rolling(lookback))
+    else:
+        hi = out["high"].rolling(lookback).max()
+        lo = out["low"].rolling(lookback).min()
     rng = hi - lo
     fib382 = hi - 0.382 * rng
     fib50  = hi - 0.5   * rng
@@ -36,9 +51,106 @@ def make_features(df: pd.DataFrame, rsi_len=14, lookback=200, prox_pct=0.25):
 
     out["y"] = (out["ret"].shift(-1) > 0).astype(int)
 
-    feature_cols = [
-        "rsi", "ema_spread", "ema_cross_up", "ema_cross_down",
-        "macd_edge", "fib_rel_dist", "near_fib", "vol_10", "atr_norm"
-    ]
+    feature_cols = list(FEATURE_COLS)
     out = out.dropna(subset=feature_cols + ["y"]).copy()
     return out, feature_cols
+
+class FeatureBuffer:
+    """Copy-free pipeline: OHLCV, indicators and features written column by column into
+    one preallocated float64 block; consumers get views, not copies.
+
+    Same values as make_features (the 0/1 flags are stored as floats). compute() reuses
+    the block when the history fits, which invalidates views handed out earlier.
+    """
+    OHLCV = ["open", "high", "low", "close", "volume"]
+    COLUMNS = OHLCV + ["rsi", "ema50", "ema200", "atr", "macd", "macd_signal", "macd_hist",
+                       "ret", "vol_10", "atr_norm", "ema_spread", "ema_cross_up", "ema_cross_down",
+                       "macd_edge", "fib_rel_dist", "near_fib", "y"]
+
+    def __init__(self, capacity: int = 0):
+        self._pos = {c: i for i, c in enumerate(self.COLUMNS)}
+        self.block = np.empty((len(self.COLUMNS), capacity))  # one contiguous row per column
+        self.n = 0
+        self.index = None
+        self.start = 0  # first row with every feature defined
+
+    def col(self, name: str) -> np.ndarray:
+        return self.block[self._pos[name], :self.n]
+
+    def _s(self, name: str) -> pd.Series:
+        return pd.Series(self.col(name), index=self.index, copy=False)
+
+    def _put(self, name: str, values):
+        np.copyto(self.col(name), np.asarray(values, dtype=float))
+
+    def compute(self, df: pd.DataFrame, rsi_len=14, lookback=200, prox_pct=0.25, extrema=None):
+        n = len(df)
+        if n > self.block.shape[1]:
+            self.block = np.empty((len(self.COLUMNS), n))
+        self.n, self.index = n, df.index
+        for c in self.OHLCV:
+            self._put(c, df[c].to_numpy(dtype=float))
+        close, high, low = self._s("close"), self.col("high"), self.col("low")
+        c = self.col("close")
+
+        # --- indicators (same formulas as indicators.py) ---
+        self._put("rsi", ta.rsi(close, length=rsi_len))
+        self._put("ema50", close.ewm(span=50, adjust=False).mean())
+        self._put("ema200", close.ewm(span=200, adjust=False).mean())
+        prev_close = np.empty(n)
+        prev_close[:1] = np.nan
+        prev_close[1:] = c[:-1]
+        tr = np.fmax(np.fmax(np.abs(high - low), np.abs(high - prev_close)), np.abs(low - prev_close))
+        self._put("atr", pd.Series(tr).rolling(14, min_periods=14).mean())
+        np.subtract(close.ewm(span=12, adjust=False).mean().to_numpy(),
+                    close.ewm(span=26, adjust=False).mean().to_numpy(), out=self.col("macd"))
+        self._put("macd_signal", self._s("macd").ewm(span=9, adjust=False).mean())
+        np.subtract(self.col("macd"), self.col("macd_signal"), out=self.col("macd_hist"))
+
+        # --- features (same formulas as build_features) ---
+        ret = self.col("ret")
+        np.log(c, out=ret)
+        ret[1:] = np.diff(ret)
+        ret[:1] = np.nan
+        self._put("vol_10", self._s("ret").rolling(10).std())
+        np.divide(self.col("atr"), c, out=self.col("atr_norm"))
+        e50, e200 = self.col("ema50"), self.col("ema200")
+        np.subtract(e50, e200, out=self.col("ema_spread"))
+        up, down = self.col("ema_cross_up"), self.col("ema_cross_down")
+        up[:1] = down[:1] = 0.0
+        up[1:] = (e50[1:] > e200[1:]) & (e50[:-1] <= e200[:-1])
+        down[1:] = (e50[1:] < e200[1:]) & (e50[:-1] >= e200[:-1])
+        np.subtract(self.col("macd"), self.col("macd_signal"), out=self.col("macd_edge"))
+
+        if extrema is not None:
+            hi, lo = extrema.rolling(lookback)
+        else:
+            hi = pd.Series(high, copy=False).rolling(lookback).max().to_numpy()
+            lo = pd.Series(low, copy=False).rolling(lookback).min().to_numpy()
+        rng = hi - lo
+        dist = self.col("fib_rel_dist")
+        dist[:] = np.minimum.reduce([np.abs(c - (hi - r * rng)) / c for r in (0.382, 0.5, 0.618)])
+        self.col("near_fib")[:] = dist <= (prox_pct/100.0)
+        y = self.col("y")
+        y[:-1] = ret[1:] > 0
+        y[-1:] = 0.0
+
+        rows = [self._pos[f] for f in FEATURE_COLS]
+        valid = ~np.isnan(self.block[rows, :n]).any(axis=0)
+        first = int(valid.argmax()) if valid.any() else n
+        self.start = first if valid[first:].all() else None  # None → gaps, needs a mask
+        self._valid = valid
+        return self
+
+    def frame(self, valid_only: bool = True) -> pd.DataFrame:
+        """DataFrame view over the block (every row, or the rows make_features keeps)."""
+        if not valid_only:
+            return pd.DataFrame(self.block[:, :self.n].T, index=self.index, columns=self.COLUMNS, copy=False)
+        if self.start is None:
+            return self.frame(valid_only=False)[self._valid]
+        return pd.DataFrame(self.block[:, self.start:self.n].T, index=self.index[self.start:],
+                            columns=self.COLUMNS, copy=False)
+
+    def features(self):
+        """(feat_df, feature_cols) with the make_features contract, as a view."""
+        return self.frame(), list(FEATURE_COLS)
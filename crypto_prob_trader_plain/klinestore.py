@@ -0,0 +1,206 @@
+"""On-disk columnar kline store: one raw little-endian file per column, per symbol/interval.
+
+    data/ETHUSDT_1h/open_time.i8  open.f8  high.f8  low.f8  close.f8  volume.f8
+
+Reads are np.memmap views (no parsing, no copy); appends only add closed bars newer
+than the last stored open_time, so every process shares one growing history.
+A merge (backfill into the middle) rewrites all six columns as *.new files and
+commits them together through a small journal (merge.commit, the new row count):
+a merge killed before the journal leaves the old store, one killed after it is
+finished on the next open, and a store that still disagrees with its journal
+refuses to open instead of pairing values with the wrong open times.
+"""
+import os
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from config import settings
+
+VALUE_COLS = ("open", "high", "low", "close", "volume")
+COLS = ("open_time",) + VALUE_COLS
+JOURNAL = "merge.commit"
+
+class KlineStore:
+    def __init__(self, symbol: str, interval: str, root: str = None):
+        self.symbol = symbol.upper()
+        self.interval = interval
+        self.dir = Path(root or settings.store_dir) / f"{self.symbol}_{interval}"
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self._repair()
+
+    # ---------- files ----------
+    def _path(self, col: str) -> Path:
+        return self.dir / (f"{col}.i8" if col == "open_time" else f"{col}.f8")
+
+    def _new_path(self, col: str) -> Path:
+        p = self._path(col)
+        return p.with_name(p.name + ".new")
+
+    def _rows_on_disk(self, col: str) -> int:
+        p = self._path(col)
+        return p.stat().st_size // 8 if p.exists() else 0
+
+    def _repair(self):
+        """Finish or discard an interrupted merge, then trim columns to a common length
+        (an append interrupted half-way leaves them uneven)."""
+        journal = self.dir / JOURNAL
+        pending = journal.exists() or any(self._new_path(c).exists() for c in COLS)
+        if not pending and len({self._rows_on_disk(c) for c in COLS}) == 1:
+            return
+        with self._locked():
+            if journal.exists():
+                self._roll_forward()
+                return
+            for c in COLS:  # uncommitted merge: the old columns are untouched
+                self._new_path(c).unlink(missing_ok=True)
+            n = min(self._rows_on_disk(c) for c in COLS)
+            for c in COLS:
+                p = self._path(c)
+                if p.exists() and p.stat().st_size != n * 8:
+                    with open(p, "r+b") as f:
+                        f.truncate(n * 8)
+
+    @contextmanager
+    def _locked(self, timeout: float = 10.0, stale: float = 30.0):
+        """Cross-process append lock via an O_EXCL lock file (works on Windows too)."""
+        path = self.dir / ".lock"
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                break
+            except FileExistsError:
+                try:
+                    if time.time() - path.stat().st_mtime > stale:
+                        path.unlink()
+                        continue
+                except FileNotFoundError:
+                    continue
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f"kline store {self.dir} is locked")
+                time.sleep(0.01)
+        try:
+            yield
+        finally:
+            os.close(fd)
+            path.unlink(missing_ok=True)
+
+    # ---------- read ----------
+    def __len__(self) -> int:
+        return self._rows_on_disk("open_time")
+
+    def first_open_time(self) -> int | None:
+        """First stored open_time in ms, or None for an empty store."""
+        if len(self) == 0:
+            return None
+        with open(self._path("open_time"), "rb") as f:
+            return int(np.frombuffer(f.read(8), dtype="<i8")[0])
+
+    def last_open_time(self) -> int | None:
+        """Last stored open_time in ms, or None for an empty store."""
+        n = len(self)
+        if n == 0:
+            return None
+        with open(self._path("open_time"), "rb") as f:
+            f.seek((n - 1) * 8)
+            return int(np.frombuffer(f.read(8), dtype="<i8")[0])
+
+    def arrays(self, tail: int = None) -> dict:
+        """Read-only memmap views of every column (the last `tail` rows if given)."""
+        n = len(self)
+        start = max(0, n - tail) if tail is not None else 0
+        out = {}
+        for c in COLS:
+            dtype = "<i8" if c == "open_time" else "<f8"
+            if n == 0:
+                out[c] = np.empty(0, dtype=dtype)
+                continue
+            mm = np.memmap(self._path(c), dtype=dtype, mode="r", shape=(n,))
+            out[c] = mm[start:]
+        return out
+
+    def frame(self, tail: int = None) -> pd.DataFrame:
+        """Same layout as datafeed.get_klines (time index, OHLCV columns); values are memmap-backed."""
+        a = self.arrays(tail)
+        idx = pd.DatetimeIndex(pd.to_datetime(a["open_time"], unit="ms"), name="time")
+        return pd.DataFrame({c: a[c] for c in VALUE_COLS}, index=idx, copy=False)
+
+    # ---------- write ----------
+    def append(self, open_time_ms: np.ndarray, values: dict) -> int:
+        """Append rows strictly newer than the stored tail; returns how many were written.
+        `open_time_ms` must be ascending int64 ms, `values` maps each OHLCV column to an array.
+        """
+        open_time_ms = np.asarray(open_time_ms, dtype="<i8")
+        with self._locked():
+            last = self.last_open_time()
+            keep = open_time_ms > last if last is not None else np.ones(len(open_time_ms), bool)
+            if not keep.any():
+                return 0
+            # value columns first, open_time last: open_time length is the commit point
+            for c in VALUE_COLS:
+                with open(self._path(c), "ab") as f:
+                    f.write(np.asarray(values[c], dtype="<f8")[keep].tobytes())
+            with open(self._path("open_time"), "ab") as f:
+                f.write(open_time_ms[keep].tobytes())
+            return int(keep.sum())
+
+    def merge(self, open_time_ms: np.ndarray, values: dict) -> int:
+        """Insert rows anywhere in the history (backfill): union by open_time, existing rows
+        win on duplicates, all columns are rewritten and committed together (_swap). Returns rows added.
+        """
+        open_time_ms = np.asarray(open_time_ms, dtype="<i8")
+        if len(open_time_ms) == 0:
+            return 0
+        last = self.last_open_time()
+        if last is None or open_time_ms.min() > last:
+            return self.append(open_time_ms, values)
+        with self._locked():
+            cur = self.arrays()
+            ot = np.concatenate([cur["open_time"], open_time_ms])
+            uniq, first = np.unique(ot, return_index=True)  # sorted; first occurrence = stored row
+            added = len(uniq) - len(cur["open_time"])
+            if added == 0:
+                return 0
+            cols = {c: np.concatenate([cur[c], np.asarray(values[c], dtype="<f8")])[first] for c in VALUE_COLS}
+            del cur
+            self._swap({"open_time": uniq.astype("<i8"), **cols})
+            return int(added)
+
+    def _swap(self, cols: dict):
+        """Replace every column as one unit: write *.new, commit the journal, move them in."""
+        for c in COLS:
+            with open(self._new_path(c), "wb") as f:
+                f.write(cols[c].tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+        journal = self.dir / JOURNAL
+        tmp = journal.with_name(JOURNAL + ".tmp")
+        with open(tmp, "w") as f:
+            f.write(str(len(cols["open_time"])))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, journal)  # commit point
+        self._roll_forward()
+
+    def _roll_forward(self):
+        """Move the committed *.new columns into place and check them against the journal."""
+        journal = self.dir / JOURNAL
+        n = int(journal.read_text())
+        for c in COLS:
+            if self._new_path(c).exists():
+                os.replace(self._new_path(c), self._path(c))
+        bad = {c: self._rows_on_disk(c) for c in COLS if self._rows_on_disk(c) != n}
+        if bad:  # keep the journal: the store stays unopenable until someone looks at it
+            raise RuntimeError(f"kline store {self.dir} is corrupt: merge committed {n} rows "
+                               f"but {bad} (rows per column); remove it and backfill again")
+        journal.unlink()
+
+    def append_frame(self, df: pd.DataFrame) -> int:
+        """Append a get_klines-style frame (DatetimeIndex of open times, OHLCV columns)."""
+        ms = df.index.as_unit("ms").asi8 if isinstance(df.index, pd.DatetimeIndex) \
+            else np.asarray(df.index, dtype="<i8")
+        return self.append(ms, {c: df[c].to_numpy(dtype=float) for c in VALUE_COLS})
@@ -1,104 +1,248 @@
+import queue
+import threading
+import time
 
 import matplotlib.pyplot as plt
-from matplotlib.animation import FuncAnimation
 import matplotlib.dates as mdates
+from matplotlib.collections import LineCollection
 import numpy as np
 import pandas as pd
 
 from config import settings
 from datafeed import get_klines
 from strategy import generate_signals
-from features import make_features
-from model import fit_prob_model, add_probabilities
 
 WINDOW_BARS = 300
 MAX_SL_PCT = 0.10
 MAX_TP_PCT = 0.20
-
-_model = None
-_feats = None
+TICK_MS = 200          # GUI timer: only picks up frames, never blocks on I/O
+X_HEADROOM = 0.10      # free space right of the last bar, so a new bar rarely moves the x-axis
+Y_MARGIN = 0.05
 
 def fetch():
     df = get_klines(settings.symbol, settings.interval, settings.limit)
     df, lvls = generate_signals(df, settings.rsi_len, settings.fib_lookback, settings.prox_pct)
     return df, lvls
 
-def ensure_probabilities(df: pd.DataFrame) -> pd.DataFrame:
-    global _model, _feats
-    feat_df, feats = make_features(df, rsi_len=settings.rsi_len,
-                                   lookback=settings.fib_lookback,
-                                   prox_pct=settings.prox_pct)
-    if _model is None or _feats != feats:
-        _model = fit_prob_model(feat_df, feats)
-        _feats = feats
-    out = add_probabilities(_model, feat_df, feats, thr=settings.threshold)
-    return out
-
-def update(frame, ax_price, ax_macd, ax_prob):
-    ax_price.clear(); ax_macd.clear(); ax_prob.clear()
-    ax_price.grid(True, alpha=0.25)
-    ax_macd.grid(True, alpha=0.25)
-    ax_prob.grid(True, alpha=0.25)
-
-    df, lvls = fetch()
-    use = df.tail(WINDOW_BARS).copy()
-    x = pd.to_datetime(use.index)
-
-    ax_price.plot(x, use["close"].values, label="Close", linewidth=1.1)
-    if {"ema50","ema200"}.issubset(use.columns):
-        ax_price.plot(x, use["ema50"].values, label="EMA50", linewidth=1.0)
-        ax_price.plot(x, use["ema200"].values, label="EMA200", linewidth=1.0)
-
-    for j, (name, lvl) in enumerate(lvls.items()):
-        ax_price.axhline(lvl, linestyle="--", linewidth=0.8, alpha=0.5, label=name if j==0 else None)
-        ax_price.text(x.iloc[-1], lvl, f"{lvl:.2f}", va="center", ha="left", fontsize=8)
-
-    buys = use[use["signal"] == "BUY"]
-    if not buys.empty:
-        ax_price.scatter(pd.to_datetime(buys.index), buys["close"], marker="^", s=90, label="BUY")
-
-    if not buys.empty and buys.index[-1] == use.index[-1]:
-        price = use["close"].iloc[-1]
-        stop_loss = price * (1 - MAX_SL_PCT)
-        take_profit = price * (1 + MAX_TP_PCT)
-        ax_price.axhline(stop_loss, linestyle="--")
-        ax_price.text(x.iloc[-1], stop_loss, f"SL {stop_loss:.2f}", va="bottom", fontsize=8)
-        ax_price.axhline(take_profit, linestyle="--")
-        ax_price.text(x.iloc[-1], take_profit, f"TP {take_profit:.2f}", va="bottom", fontsize=8)
-
-    last = use["close"].iloc[-1]
-    ax_price.scatter(x.iloc[-1], last, zorder=5)
-    ax_price.text(x.iloc[-1], last, f"{last:.2f}", va="bottom", ha="left", fontsize=9)
-
-    ax_price.set_title(f"{settings.symbol} • {settings.interval} • Live")
-    ax_price.set_ylabel("Price")
-    ax_price.legend(loc="upper left", ncols=4, fontsize=8)
-
-    if {"macd","macd_signal","macd_hist"}.issubset(use.columns):
-        ax_macd.bar(x, use["macd_hist"].values, alpha=0.5)
-        ax_macd.plot(x, use["macd"].values, label="MACD")
-        ax_macd.plot(x, use["macd_signal"].values, label="Signal")
+def build_frame(df: pd.DataFrame, lvls: dict) -> dict:
+    """Everything the chart draws, as plain arrays (prob_up comes from generate_signals' model)."""
+    use = df.tail(WINDOW_BARS)
+    x = mdates.date2num(pd.to_datetime(use.index).to_pydatetime())
+    col = lambda c: use[c].to_numpy(dtype=float) if c in use.columns else np.full(len(use), np.nan)
+    buy = (use["signal"] == "BUY").to_numpy()
+    price = float(use["close"].iat[-1])
+    buy_now = bool(buy[-1])
+    return {
+        "x": x, "close": col("close"), "ema50": col("ema50"), "ema200": col("ema200"),
+        "macd": col("macd"), "macd_signal": col("macd_signal"), "macd_hist": col("macd_hist"),
+        "prob": col("prob_up"), "buys": np.column_stack([x[buy], col("close")[buy]]),
+        "lvls": dict(lvls), "last": price,
+        "sl": price * (1 - MAX_SL_PCT) if buy_now else None,
+        "tp": price * (1 + MAX_TP_PCT) if buy_now else None,
+        "time": use.index[-1],
+    }
+
+class FrameWorker(threading.Thread):
+    """REST + generate_signals (and any model refit) off the GUI thread. Only the newest
+    ready frame is kept: a slow GUI skips stale frames instead of queueing them."""
+
+    def __init__(self, poll_seconds: float):
+        super().__init__(name="chart-data", daemon=True)
+        self.poll_seconds = poll_seconds
+        self.frames = queue.Queue(maxsize=1)
+        self.stopping = threading.Event()
+        self.fetch_s = np.nan
+
+    def run(self):
+        while not self.stopping.is_set():
+            t0 = time.perf_counter()
+            try:
+                frame = build_frame(*fetch())
+            except Exception as e:
+                print(f"[chart] Error: {e}")
+            else:
+                self.fetch_s = time.perf_counter() - t0
+                try:
+                    self.frames.get_nowait()  # drop the unread older frame
+                except queue.Empty:
+                    pass
+                self.frames.put(frame)
+            self.stopping.wait(self.poll_seconds)
+
+    def stop(self):
+        self.stopping.set()
+
+class LiveChart:
+    """Artists are created once and updated with set_data/set_offsets/set_segments.
+    They are animated, so a full draw renders only the static background (axes, ticks,
+    thresholds, legend); that is cached on every draw_event and a new frame restores it
+    and redraws just the animated artists (blitting). A full redraw happens only when a
+    frame leaves the current axis limits (or on resize/zoom)."""
+
+    def __init__(self, fig, ax_price, ax_macd, ax_prob):
+        self.fig, self.canvas = fig, fig.canvas
+        self.ax_price, self.ax_macd, self.ax_prob = ax_price, ax_macd, ax_prob
+        self.bg = None
+        self.frames = 0
+        self.full_draws = 0
+
+        for ax in (ax_price, ax_macd, ax_prob):
+            ax.grid(True, alpha=0.25)
+        ax_price.set_title(f"{settings.symbol} • {settings.interval} • Live")
+        ax_price.set_ylabel("Price")
+        self.close, = ax_price.plot([], [], label="Close", linewidth=1.1)
+        self.ema50, = ax_price.plot([], [], label="EMA50", linewidth=1.0)
+        self.ema200, = ax_price.plot([], [], label="EMA200", linewidth=1.0)
+        self.fib = LineCollection([], linestyles="--", linewidths=0.8, alpha=0.5, colors="tab:gray", label="fib")
+        ax_price.add_collection(self.fib)
+        self.fib_text = []
+        self.buys = ax_price.scatter([], [], marker="^", s=90, label="BUY", color="tab:green")
+        self.sl, = ax_price.plot([], [], linestyle="--", color="tab:red")
+        self.tp, = ax_price.plot([], [], linestyle="--", color="tab:green")
+        self.sl_text = ax_price.text(0, 0, "", va="bottom", fontsize=8)
+        self.tp_text = ax_price.text(0, 0, "", va="bottom", fontsize=8)
+        self.last = ax_price.scatter([], [], zorder=5, color="tab:blue")
+        self.last_text = ax_price.text(0, 0, "", va="bottom", ha="left", fontsize=9)
+        ax_price.legend(loc="upper left", ncols=4, fontsize=8)
+
+        self.hist = LineCollection([], linewidths=2, alpha=0.5, colors="tab:gray")
+        ax_macd.add_collection(self.hist)
+        self.macd, = ax_macd.plot([], [], label="MACD")
+        self.signal, = ax_macd.plot([], [], label="Signal")
         ax_macd.set_ylabel("MACD")
         ax_macd.legend(fontsize=8)
 
-    prob_df = ensure_probabilities(df)
-    prob_use = prob_df.tail(WINDOW_BARS)
-    xp = pd.to_datetime(prob_use.index)
-    ax_prob.plot(xp, prob_use["prob_up"].values, label="P(up)")
-    ax_prob.axhline(settings.threshold, linestyle="--", alpha=0.5, label="BUY thr")
-    ax_prob.axhline(1-settings.threshold, linestyle="--", alpha=0.5, label="SELL thr")
-    ax_prob.set_ylim(0, 1)
-    ax_prob.set_ylabel("Probability")
-    ax_prob.legend(fontsize=8)
-
-    ax_prob.xaxis.set_major_formatter(mdates.DateFormatter('%Y-%m-%d %H:%M'))
-    plt.setp(ax_prob.xaxis.get_majorticklabels(), rotation=15, ha='right')
+        self.prob, = ax_prob.plot([], [], label="P(up)")
+        ax_prob.axhline(settings.threshold, linestyle="--", alpha=0.5, label="BUY thr")
+        ax_prob.axhline(1-settings.threshold, linestyle="--", alpha=0.5, label="SELL thr")
+        ax_prob.set_ylim(0, 1)
+        ax_prob.set_ylabel("Probability")
+        ax_prob.legend(fontsize=8)
+        ax_prob.xaxis.set_major_formatter(mdates.DateFormatter('%Y-%m-%d %H:%M'))
+        plt.setp(ax_prob.xaxis.get_majorticklabels(), rotation=15, ha='right')
+
+        self.status = ax_price.text(0.99, 0.98, "waiting for data…", transform=ax_price.transAxes,
+                                    ha="right", va="top", fontsize=8, alpha=0.7)
+        self.artists = [self.close, self.ema50, self.ema200, self.fib, self.buys, self.sl, self.tp,
+                        self.sl_text, self.tp_text, self.last, self.last_text, self.status,
+                        self.hist, self.macd, self.signal, self.prob]
+        for a in self.artists:
+            a.set_animated(True)
+        self.canvas.mpl_connect("draw_event", self._on_draw)
+
+    # ---------- blitting ----------
+    def _on_draw(self, event):
+        self.bg = self.canvas.copy_from_bbox(self.fig.bbox)
+        self._draw_artists()
+
+    def _draw_artists(self):
+        for a in self.artists:
+            self.fig.draw_artist(a)
+
+    def blit(self):
+        if self.bg is None:
+            self.canvas.draw_idle()
+            return
+        self.canvas.restore_region(self.bg)
+        self._draw_artists()
+        self.canvas.blit(self.fig.bbox)
+
+    # ---------- frames ----------
+    def apply(self, f: dict) -> bool:
+        """Move the artists to frame f; True if the axis limits had to change (full redraw)."""
+        x = f["x"]
+        self.close.set_data(x, f["close"])
+        self.ema50.set_data(x, f["ema50"])
+        self.ema200.set_data(x, f["ema200"])
+        self.buys.set_offsets(f["buys"])
+        x0, x1 = x[0], x[-1]
+
+        lvls = f["lvls"]
+        self.fib.set_segments([[(x0, v), (x1, v)] for v in lvls.values()])
+        if len(self.fib_text) != len(lvls):
+            for t in self.fib_text:
+                t.remove()
+                self.artists.remove(t)
+            self.fib_text = [self.ax_price.text(0, 0, "", va="center", ha="left", fontsize=8, animated=True)
+                             for _ in lvls]
+            self.artists += self.fib_text
+        for t, v in zip(self.fib_text, lvls.values()):
+            t.set_position((x1, v))
+            t.set_text(f"{v:.2f}")
+
+        for line, text, level, tag in ((self.sl, self.sl_text, f["sl"], "SL"), (self.tp, self.tp_text, f["tp"], "TP")):
+            visible = level is not None
+            line.set_visible(visible)
+            text.set_visible(visible)
+            if visible:
+                line.set_data([x0, x1], [level, level])
+                text.set_position((x1, level))
+                text.set_text(f"{tag} {level:.2f}")
+
+        self.last.set_offsets([[x1, f["last"]]])
+        self.last_text.set_position((x1, f["last"]))
+        self.last_text.set_text(f"{f['last']:.2f}")
+        self.status.set_text(f"{f['time']}")
+
+        hist = np.nan_to_num(f["macd_hist"])
+        self.hist.set_segments(np.stack([np.column_stack([x, np.zeros_like(x)]),
+                                         np.column_stack([x, hist])], axis=1))
+        self.macd.set_data(x, f["macd"])
+        self.signal.set_data(x, f["macd_signal"])
+        self.prob.set_data(x, f["prob"])
+
+        price_vals = [f["close"], f["ema50"], f["ema200"], list(lvls.values())]
+        if f["sl"] is not None:
+            price_vals.append([f["sl"], f["tp"]])
+        changed = self._fit_x(x)
+        changed |= self._fit_y(self.ax_price, np.concatenate([np.ravel(v) for v in price_vals]))
+        changed |= self._fit_y(self.ax_macd, np.concatenate([f["macd"], f["macd_signal"], hist, [0.0]]))
+        return changed
+
+    def _fit_x(self, x) -> bool:
+        lo, hi = self.ax_prob.get_xlim()  # shared x
+        step = (x[-1] - x[0]) / max(1, len(x) - 1)
+        if x[0] >= lo and x[-1] + step <= hi and hi - x[-1] <= 2 * X_HEADROOM * (x[-1] - x[0]):
+            return False
+        self.ax_prob.set_xlim(x[0], x[-1] + X_HEADROOM * (x[-1] - x[0]) + step)
+        return True
+
+    @staticmethod
+    def _fit_y(ax, vals) -> bool:
+        vals = vals[np.isfinite(vals)]
+        if not len(vals):
+            return False
+        vlo, vhi = float(vals.min()), float(vals.max())
+        lo, hi = ax.get_ylim()
+        span = max(vhi - vlo, 1e-12)
+        # keep the limits while the data fits and still fills at least half of them
+        if lo <= vlo and vhi <= hi and (hi - lo) <= 2 * span * (1 + 2 * Y_MARGIN):
+            return False
+        ax.set_ylim(vlo - Y_MARGIN * span, vhi + Y_MARGIN * span)
+        return True
+
+    def tick(self, frames: queue.Queue):
+        try:
+            f = frames.get_nowait()
+        except queue.Empty:
+            return  # nothing new: no drawing at all, the GUI stays responsive
+        self.frames += 1
+        if self.apply(f):
+            self.full_draws += 1
+            self.canvas.draw_idle()  # ticks/limits changed; _on_draw re-caches the background
+        else:
+            self.blit()
 
 def main():
     fig, (ax1, ax2, ax3) = plt.subplots(3, 1, figsize=(12, 10), sharex=True,
                                         gridspec_kw={'height_ratios': [3, 1.2, 1]})
-    ani = FuncAnimation(fig, update, fargs=(ax1, ax2, ax3),
-                        interval=max(1000, settings.poll_seconds*1000))
+    chart = LiveChart(fig, ax1, ax2, ax3)
+    worker = FrameWorker(max(1, settings.poll_seconds))
+    worker.start()
+    timer = fig.canvas.new_timer(interval=TICK_MS)
+    timer.add_callback(chart.tick, worker.frames)
+    timer.start()
+    fig.canvas.mpl_connect("close_event", lambda event: worker.stop())
     fig.tight_layout()
     plt.show()
 
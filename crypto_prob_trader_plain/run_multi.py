@@ -0,0 +1,192 @@
+"""Asyncio live runner for many symbol/interval pairs in one process.
+
+Each pair keeps its own state (KlineWindow, last_signal_time, prev_lvls; its model
+is its own registry entry). Every cycle refreshes all windows concurrently (the
+blocking REST calls run on an I/O thread pool sized by HTTP_POOL_SIZE) and runs the
+pandas/sklearn evaluation on worker processes, so evaluations use every core and one
+slow symbol never stalls the others. A pair is always scored by the same worker
+("shard"), which keeps that pair's feature cache and model (its registry entry,
+fitted and refitted inside the worker); orders and logs stay in the main process.
+
+    python run_multi.py --pairs ETHUSDT:1h BTCUSDT:15m SOLUSDT:1h
+    python run_multi.py --load-test 200 --cycles 3   # fake_binance, no network
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from config import settings
+from datafeed import KlineWindow
+from strategy import generate_signals
+from execute import place_order
+from registry import registry
+from run_live import buy_rules, last_bar, lvls_changed, nearest_fib
+
+def max_rss_mb() -> float:
+    """Peak resident set size of this process in MB, NaN where getrusage is unavailable (Windows)."""
+    try:
+        import resource
+    except ImportError:
+        return np.nan
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS, kilobytes on Linux/BSD
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+class PairState:
+    """Everything run_live keeps in module globals, per symbol/interval."""
+
+    def __init__(self, symbol: str, interval: str, limit: int = None):
+        self.symbol = symbol.upper()
+        self.interval = interval
+        self.window = KlineWindow(self.symbol, interval, limit)
+        self.last_signal_time = None
+        self.prev_lvls = None
+        self.fetch_s = np.nan
+        self.eval_s = np.nan
+        self.errors = 0
+
+    def apply(self, scored: tuple, verbose: bool = True):
+        """Act on one _score() result: log new fib levels, place a BUY once per bar."""
+        ts_open, price, p_up, lvls, decision = scored
+        if lvls_changed(self.prev_lvls, lvls):
+            if verbose:
+                print(f"[{self.symbol} {self.interval}] Fib " +
+                      " ".join(f"{k}={v:.2f}" for k, v in lvls.items()))
+            self.prev_lvls = lvls
+        if decision and self.last_signal_time != ts_open:
+            print(f"[{self.symbol} {self.interval} {ts_open}] ✅ BUY @ {price:.2f} | P(up)={p_up:.2f}")
+            place_order("BUY", self.symbol, settings.order_size_usdt)
+            self.last_signal_time = ts_open
+        elif verbose:
+            print(f"[{self.symbol} {self.interval} {ts_open}] price={price:.2f} P(up)={p_up:.2f} | no signal")
+
+# ---------- worker side ----------
+def _init_worker(model_root: str):
+    registry.root = Path(model_root)
+
+def _score(symbol: str, interval: str, df) -> tuple:
+    """(ts_open, price, p_up, lvls, decision, models in this worker) for the window's last bar."""
+    df, lvls = generate_signals(df, settings.rsi_len, settings.fib_lookback, settings.prox_pct,
+                                symbol=symbol, interval=interval)
+    ts_open = df.index[-1]
+    price = float(df["close"].iat[-1])
+    p_up = float(df["prob_up"].iat[-1])
+    _, _, near_pct = nearest_fib(price, lvls)
+    _, decision = buy_rules(last_bar(df), near_pct, p_up)
+    return ts_open, price, p_up, lvls, decision, len(registry.metrics())
+
+# ---------- parent side ----------
+class MultiRunner:
+    def __init__(self, pairs, limit: int = None, io_workers: int = None, cpu_workers: int = None,
+                 verbose: bool = True):
+        self.states = [PairState(symbol, interval, limit) for symbol, interval in pairs]
+        self.io = ThreadPoolExecutor(io_workers or settings.http_pool, thread_name_prefix="fetch")
+        n_shards = max(1, min(len(self.states), cpu_workers or os.cpu_count() or 1))
+        # one single-process pool per shard: a pair's model and cache live in exactly one worker
+        self.shards = [ProcessPoolExecutor(max_workers=1, initializer=_init_worker,
+                                           initargs=(str(registry.root),)) for _ in range(n_shards)]
+        self.models = [0] * n_shards
+        self.verbose = verbose
+
+    async def step(self, i: int, st: PairState):
+        loop = asyncio.get_running_loop()
+        shard = i % len(self.shards)
+        try:
+            t0 = time.perf_counter()
+            await loop.run_in_executor(self.io, st.window.refresh)
+            t1 = time.perf_counter()
+            *scored, models = await loop.run_in_executor(self.shards[shard], _score,
+                                                         st.symbol, st.interval, st.window.df)
+            st.fetch_s, st.eval_s = t1 - t0, time.perf_counter() - t1
+            self.models[shard] = models
+            st.apply(scored, self.verbose)
+        except Exception as e:
+            st.errors += 1
+            print(f"[{st.symbol} {st.interval}] Error: {e}")
+
+    async def cycle(self) -> float:
+        t0 = time.perf_counter()
+        await asyncio.gather(*(self.step(i, st) for i, st in enumerate(self.states)))
+        return time.perf_counter() - t0
+
+    async def run(self, cycles: int = None, poll_seconds: float = None):
+        poll = settings.poll_seconds if poll_seconds is None else poll_seconds
+        n = 0
+        while cycles is None or n < cycles:
+            dt = await self.cycle()
+            n += 1
+            self.report(n, dt)
+            await asyncio.sleep(max(0.0, poll - dt))
+
+    def report(self, n: int, cycle_s: float):
+        fetch = np.array([st.fetch_s for st in self.states]) * 1000
+        ev = np.array([st.eval_s for st in self.states]) * 1000
+        rss_mb = max_rss_mb()
+        rss = f"{rss_mb:.0f}MB" if np.isfinite(rss_mb) else "n/a"
+        print(f"cycle {n}: {len(self.states)} pairs in {cycle_s:.2f}s | "
+              f"fetch p50={np.nanpercentile(fetch, 50):.0f}ms p95={np.nanpercentile(fetch, 95):.0f}ms | "
+              f"eval p50={np.nanpercentile(ev, 50):.0f}ms p95={np.nanpercentile(ev, 95):.0f}ms | "
+              f"errors={sum(st.errors for st in self.states)} | models={sum(self.models)} | "
+              f"maxRSS={rss}")
+
+    def close(self, wait: bool = False):
+        """wait=True blocks until every worker is done (a fit may still be saving its model)."""
+        self.io.shutdown(wait=False)
+        for shard in self.shards:
+            shard.shutdown(wait=wait, cancel_futures=True)
+
+def parse_pairs(items) -> list:
+    pairs = []
+    for item in items:
+        symbol, _, interval = item.partition(":")
+        pairs.append((symbol.upper(), interval or settings.interval))
+    return pairs
+
+def load_test(n_pairs: int, cycles: int = 3, interval: str = "1m", limit: int = 500,
+              latency_s: float = 0.05, cpu_workers: int = None) -> list:
+    """n_pairs synthetic symbols against an in-process fake exchange (temp store/model dirs).
+    Returns the PairStates (fetch_s, eval_s and errors of the last cycle)."""
+    from fake_binance import FakeBinance
+    with tempfile.TemporaryDirectory() as tmp, \
+            FakeBinance(weight_limit=10 ** 9, latency_s=latency_s) as fake:
+        settings.rest_url, settings.store_dir = fake.url, tmp
+        registry.root = Path(tmp) / "models"
+        runner = MultiRunner([(f"SYM{i:03d}USDT", interval) for i in range(n_pairs)],
+                             limit=limit, cpu_workers=cpu_workers, verbose=False)
+        try:
+            asyncio.run(runner.run(cycles, poll_seconds=0))
+        finally:
+            # a fit still running would write into tmp while it is being removed
+            runner.close(wait=True)
+        print(f"fake exchange served {fake.requests} requests (latency {latency_s * 1000:.0f}ms each)")
+    return runner.states
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--pairs", nargs="+", default=[f"{settings.symbol}:{settings.interval}"],
+                    help="SYMBOL:INTERVAL (interval defaults to INTERVAL)")
+    ap.add_argument("--load-test", type=int, default=None, metavar="N", help="N fake pairs, then exit")
+    ap.add_argument("--cycles", type=int, default=None)
+    ap.add_argument("--latency", type=float, default=0.05, help="load test: fake exchange latency (s)")
+    args = ap.parse_args()
+
+    if args.load_test:
+        load_test(args.load_test, cycles=args.cycles or 3, latency_s=args.latency)
+        return
+    pairs = parse_pairs(args.pairs)
+    print(f"Running live on {len(pairs)} pairs (poll={settings.poll_seconds}s)")
+    runner = MultiRunner(pairs)
+    try:
+        asyncio.run(runner.run(args.cycles))
+    finally:
+        runner.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""Parallel parameter sweep over rsi_len / fib_lookback / prox_pct / threshold / SL / TP.
+
+Klines and the parameter-free indicators (EMA, MACD, ATR, one RSI per rsi_len) are
+computed once in the parent and published to the workers through shared memory;
+each worker task is one (rsi_len, lookback, prox_pct) feature set + walk-forward
+model fits, and scores every threshold × SL × TP combination for the rule / prob /
+hybrid signals. prob_up is the stitched out-of-sample series of walkforward (as in
+backtest.run_backtests), so no configuration is ranked on a model that saw its own
+test bars; nothing trades on a prob gate inside the first train window.
+
+    python sweep.py --rsi 10 14 21 --lookback 100 200 --prox 0.25 0.5 --thr 0.55 0.6 --workers 4
+"""
+import argparse
+import itertools
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from config import settings
+from indicators import add_rsi, add_ema, add_atr, add_macd
+from extrema import ExtremaIndex
+from features import build_features
+from strategy import signal_masks
+from backtest import long_only_arrays
+
+BASE_COLS = ["open", "high", "low", "close", "volume",
+             "ema50", "ema200", "atr", "macd", "macd_signal", "macd_hist"]
+
+# ---------- shared memory frame ----------
+class SharedFrame:
+    """A float64 column block + int64 index living in two SharedMemory segments."""
+
+    def __init__(self, values_shm, index_shm, spec):
+        self._values_shm = values_shm
+        self._index_shm = index_shm
+        self.spec = spec
+
+    @classmethod
+    def publish(cls, df: pd.DataFrame):
+        values = np.ascontiguousarray(df.to_numpy(dtype=float))
+        index = np.ascontiguousarray(df.index.to_numpy()).view(np.int64)
+        v_shm = shared_memory.SharedMemory(create=True, size=max(1, values.nbytes))
+        i_shm = shared_memory.SharedMemory(create=True, size=max(1, index.nbytes))
+        np.ndarray(values.shape, dtype=float, buffer=v_shm.buf)[:] = values
+        np.ndarray(index.shape, dtype=np.int64, buffer=i_shm.buf)[:] = index
+        spec = {"values": v_shm.name, "index": i_shm.name, "shape": values.shape,
+                "columns": list(df.columns), "index_dtype": str(df.index.dtype),
+                "index_name": df.index.name}
+        return cls(v_shm, i_shm, spec)
+
+    @classmethod
+    def attach(cls, spec):
+        return cls(shared_memory.SharedMemory(name=spec["values"]),
+                   shared_memory.SharedMemory(name=spec["index"]), spec)
+
+    def frame(self) -> pd.DataFrame:
+        spec = self.spec
+        values = np.ndarray(spec["shape"], dtype=float, buffer=self._values_shm.buf)
+        index = np.ndarray(spec["shape"][:1], dtype=np.int64, buffer=self._index_shm.buf)
+        idx = pd.Index(index.view(np.dtype(spec["index_dtype"])), name=spec["index_name"])
+        return pd.DataFrame(values, index=idx, columns=spec["columns"], copy=False)
+
+    def close(self, unlink=False):
+        for shm in (self._values_shm, self._index_shm):
+            shm.close()
+            if unlink:
+                shm.unlink()
+
+def shared_indicators(df_raw: pd.DataFrame, rsi_lens) -> pd.DataFrame:
+    """Everything that does not depend on lookback/prox/threshold, computed once."""
+    out = add_macd(add_atr(add_ema(df_raw[["open", "high", "low", "close", "volume"]],
+                                   spans=(50, 200)), length=14), fast=12, slow=26, signal=9)
+    out = out[BASE_COLS].copy()
+    for n in sorted(set(rsi_lens)):
+        out[f"rsi_{n}"] = add_rsi(out[["close"]], n)["rsi"]
+    return out
+
+# ---------- worker side ----------
+_shared = None
+_extrema = None
+
+def _init_worker(spec, max_lookback):
+    global _shared, _extrema
+    _shared = SharedFrame.attach(spec)
+    # one range-extremum index per worker serves every lookback of every task
+    _extrema = ExtremaIndex.from_frame(_shared.frame(), max_window=max_lookback)
+
+def _evaluate(rsi_len, lookback, prox_pct, thresholds, exits, fee_rate, wf):
+    from walkforward import oos_prob_up  # walkforward imports sweep
+    base = _shared.frame()
+    frame = base[BASE_COLS].copy()
+    frame["rsi"] = base[f"rsi_{rsi_len}"]
+    lvls = _extrema.fib_levels(lookback)
+
+    feat_df, feats = build_features(frame.copy(), lookback=lookback, prox_pct=prox_pct, extrema=_extrema)
+    t0 = time.perf_counter()
+    prob_up, _ = oos_prob_up(feat_df, feats, *wf)
+    fit_s = time.perf_counter() - t0
+    frame["prob_up"] = prob_up
+
+    close, high, low = (frame[c].to_numpy() for c in ("close", "high", "low"))
+    prob_up = frame["prob_up"].to_numpy()
+    rows = []
+    for thr in thresholds:
+        rule_buy, rule_sell = signal_masks(frame, lvls, prox_pct, thr)
+        prob_buy, prob_sell = prob_up > thr, prob_up < 1 - thr
+        masks = {"rule": (rule_buy, rule_sell),
+                 "prob": (prob_buy, prob_sell),
+                 "hybrid": (rule_buy & prob_buy, rule_sell & prob_sell)}
+        for sl_pct, tp_pct in exits:
+            for mode, (buy, sell) in masks.items():
+                ent_i, _, _, _, rets, _, max_dd = long_only_arrays(
+                    close, high, low, buy, sell, fee_rate=fee_rate, sl_pct=sl_pct, tp_pct=tp_pct)
+                closed = rets[~np.isnan(rets)]
+                rows.append({"rsi_len": rsi_len, "fib_lookback": lookback, "prox_pct": prox_pct,
+                             "threshold": thr, "sl_pct": sl_pct, "tp_pct": tp_pct, "mode": mode,
+                             "total_return": float(closed.sum()), "max_drawdown": max_dd,
+                             "trades": len(ent_i),
+                             "win_rate": float((closed > 0).mean()) if len(closed) else np.nan,
+                             "fit_s": fit_s})
+    return rows
+
+# ---------- parent side ----------
+def run_sweep(grid: dict, df_raw: pd.DataFrame = None, workers: int = None,
+              fee_rate: float = 0.0004, train_size: int = None, test_size: int = None,
+              mode: str = None) -> pd.DataFrame:
+    """grid keys: rsi_len, fib_lookback, prox_pct, threshold, sl_pct, tp_pct (lists).
+    train_size/test_size/mode are the walk-forward windows of prob_up (settings.wf_*).
+    Returns every configuration ranked by total_return (best first).
+    """
+    wf = (train_size or settings.wf_train, test_size or settings.wf_test, mode or settings.wf_mode)
+    if df_raw is None:
+        from datafeed import get_klines
+        df_raw = get_klines(settings.symbol, settings.interval, settings.limit)
+    feature_sets = list(itertools.product(grid["rsi_len"], grid["fib_lookback"], grid["prox_pct"]))
+    exits = list(itertools.product(grid["sl_pct"], grid["tp_pct"]))
+    workers = workers or min(len(feature_sets), os.cpu_count() or 1)
+
+    shared = SharedFrame.publish(shared_indicators(df_raw, grid["rsi_len"]))
+    rows = []
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(shared.spec, max(grid["fib_lookback"]))) as pool:
+            futures = [pool.submit(_evaluate, r, lb, px, list(grid["threshold"]), exits, fee_rate, wf)
+                       for r, lb, px in feature_sets]
+            for fut in as_completed(futures):
+                rows.extend(fut.result())
+    finally:
+        shared.close(unlink=True)
+
+    res = pd.DataFrame(rows).sort_values("total_return", ascending=False, ignore_index=True)
+    res.index = res.index + 1
+    res.index.name = "rank"
+    return res
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--rsi", type=int, nargs="+", default=[settings.rsi_len])
+    ap.add_argument("--lookback", type=int, nargs="+", default=[settings.fib_lookback])
+    ap.add_argument("--prox", type=float, nargs="+", default=[settings.prox_pct])
+    ap.add_argument("--thr", type=float, nargs="+", default=[settings.threshold])
+    ap.add_argument("--sl", type=float, nargs="+", default=[1.0])
+    ap.add_argument("--tp", type=float, nargs="+", default=[2.0])
+    ap.add_argument("--train", type=int, default=settings.wf_train, help="walk-forward train window (bars)")
+    ap.add_argument("--test", type=int, default=settings.wf_test, help="walk-forward test window (bars)")
+    ap.add_argument("--mode", choices=["expanding", "rolling"], default=settings.wf_mode)
+    ap.add_argument("--workers", type=int, default=None)
+    ap.add_argument("--top", type=int, default=20)
+    ap.add_argument("--out", default=None, help="write the full ranked table to this CSV")
+    args = ap.parse_args()
+
+    grid = {"rsi_len": args.rsi, "fib_lookback": args.lookback, "prox_pct": args.prox,
+            "threshold": args.thr, "sl_pct": args.sl, "tp_pct": args.tp}
+    t0 = time.perf_counter()
+    res = run_sweep(grid, workers=args.workers, train_size=args.train, test_size=args.test, mode=args.mode)
+    print(f"{len(res)} configurations in {time.perf_counter() - t0:.1f}s "
+          f"(prob_up out-of-sample: walk-forward {args.mode}, train {args.train} / test {args.test} bars)\n")
+    print(res.drop(columns=["fit_s"]).head(args.top).to_string(float_format=lambda v: f"{v:.4f}"))
+    if args.out:
+        res.to_csv(args.out)
+
+if __name__ == "__main__":
+    main()
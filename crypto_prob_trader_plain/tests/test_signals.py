@@ -0,0 +1,20 @@
+import pytest
+
+from indicators import fib_levels
+from strategy import signal_column
+from tests.helpers import enriched
+from tests.reference import signals_loop
+
+@pytest.mark.parametrize("n", [300, 3_000])
+@pytest.mark.parametrize("seed", [1, 7, 42])
+@pytest.mark.parametrize("prox_pct, thr", [(5.0, 0.55), (0.25, 0.6)])
+def test_vectorized_signals_match_loop(n, seed, prox_pct, thr):
+    df = enriched(n, seed)
+    lvls = fib_levels(df, n)
+    assert list(signal_column(df, lvls, prox_pct, thr)) == signals_loop(df, lvls, prox_pct, thr)
+
+def test_equivalence_cases_emit_signals():
+    # the wide-proximity case must actually exercise both branches
+    df = enriched(3_000, 42)
+    sig = signal_column(df, fib_levels(df, 3_000), 5.0, 0.55)
+    assert (sig == "BUY").any() and (sig == "SELL").any()
@@ -0,0 +1,33 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from indicators import add_rsi, add_ema, add_atr, add_macd
+from stream_indicators import IndicatorSet
+from tests.helpers import STREAM_COLS, synthetic_ohlcv
+
+def _batch(df):
+    return add_macd(add_atr(add_ema(add_rsi(df, 14), spans=(50, 200)), 14))[STREAM_COLS]
+
+def _assert_close(got: pd.DataFrame, want: pd.DataFrame, rtol=1e-9):
+    assert (got.isna() == want.isna()).all().all()
+    np.testing.assert_allclose(got.to_numpy(), want.to_numpy(), rtol=rtol, equal_nan=True)
+
+@pytest.mark.parametrize("n, seed_bars", [(1_500, 500), (1_500, 5), (3_000, 1_000)])
+@pytest.mark.parametrize("seed", [1, 7, 42])
+def test_streaming_matches_batch(n, seed_bars, seed):
+    df = synthetic_ohlcv(n, seed)
+    st = IndicatorSet().seed(df.iloc[:seed_bars])
+    rows = []
+    for _, bar in df.iloc[seed_bars:].iterrows():
+        st.update({**bar, "close": bar["close"] * 1.001}, final=False)  # a revised tick first
+        rows.append(st.update(bar))
+    _assert_close(pd.DataFrame(rows, index=df.index[seed_bars:]), _batch(df).iloc[seed_bars:])
+
+def test_in_progress_bar_matches_batch_and_leaves_state():
+    df = synthetic_ohlcv(800, 3)
+    st = IndicatorSet().seed(df.iloc[:-1])
+    live = st.update(df.iloc[-1], final=False)
+    want = _batch(df).iloc[-1]
+    np.testing.assert_allclose([live[c] for c in STREAM_COLS], want.to_numpy(), rtol=1e-9)
+    assert st.update(df.iloc[-1], final=False) == live  # not committed: same answer again
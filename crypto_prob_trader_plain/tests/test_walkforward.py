@@ -0,0 +1,38 @@
+import pandas as pd
+import pytest
+
+from features import make_features
+from sweep import run_sweep
+from tests.helpers import synthetic_ohlcv
+from walkforward import fold_ranges, oos_prob_up, walk_forward
+
+def _features(n=1_500, seed=3):
+    return make_features(synthetic_ohlcv(n, seed), 14, 200, 0.25)
+
+def test_serial_oos_matches_pool():
+    feat_df, feats = _features()
+    pooled, folds = walk_forward(feat_df, feats, 400, 200, "expanding", workers=2)
+    serial, serial_folds = oos_prob_up(feat_df, feats, 400, 200, "expanding")
+    pd.testing.assert_series_equal(serial, pooled)
+    assert len(serial_folds) == len(folds)
+    assert serial.iloc[:401].isna().all() and serial.iloc[401:].notna().all()
+
+@pytest.mark.parametrize("mode", ["expanding", "rolling"])
+def test_folds_purge_one_bar_before_each_test_window(mode):
+    folds = fold_ranges(1_000, 300, 100, mode)
+    assert folds[0][2] == 301 and folds[-1][3] == 1_000
+    for train_start, train_stop, test_start, test_stop in folds:
+        # y[train_stop - 1] is the return into train_stop, never into the test window
+        assert train_stop == test_start - 1
+        assert train_stop - train_start == (300 if mode == "rolling" else train_stop)
+
+def test_sweep_prob_is_out_of_sample():
+    df = synthetic_ohlcv(1_500, 5)
+    grid = {"rsi_len": [14], "fib_lookback": [200], "prox_pct": [5.0], "threshold": [0.5],
+            "sl_pct": [None], "tp_pct": [None]}
+    res = run_sweep(grid, df, workers=1, train_size=5_000, test_size=200)
+    # the train window covers all rows: no out-of-sample prob_up, so no prob trades
+    prob = res[res["mode"] == "prob"]
+    assert (prob["trades"] == 0).all()
+    res = run_sweep(grid, df, workers=1, train_size=400, test_size=200)
+    assert (res[res["mode"] == "prob"]["trades"] > 0).all()
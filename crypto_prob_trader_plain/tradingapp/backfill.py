@@ -0,0 +1,130 @@
+"""Concurrent historical backfill into the local kline store.
+
+The [start, end] range is cut into 1000-bar time slices that a bounded thread
+pool fetches in parallel; a shared rate limiter follows X-MBX-USED-WEIGHT-1M and
+backs off on 429/418 (Retry-After). Pages are stitched, deduped and merged into
+the store, so backtests can read far more than one REST call's worth of bars.
+
+    python backfill.py --start 2023-01-01 --end 2024-01-01 --workers 4
+"""
+import argparse
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import requests
+
+from config import settings
+from datafeed import MAX_PAGE, open_store, interval_ms, rest_base_url
+from clientpool import shared_session
+from klinestore import VALUE_COLS
+
+class RateLimiter:
+    """Shared by all workers: pauses everyone when the used weight nears the limit
+    or the exchange answers 429/418."""
+
+    def __init__(self, weight_limit: int = 6000, headroom: float = 0.8):
+        self.weight_limit = weight_limit
+        self.headroom = headroom
+        self.used = 0
+        self._pause_until = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            delay = self._pause_until - time.time()
+        if delay > 0:
+            time.sleep(delay)
+
+    def update(self, resp: requests.Response):
+        now = time.time()
+        with self._lock:
+            self.used = int(resp.headers.get("X-MBX-USED-WEIGHT-1M", self.used))
+            if resp.status_code in (418, 429):
+                retry = float(resp.headers.get("Retry-After", 60))
+                self._pause_until = max(self._pause_until, now + retry)
+            elif self.used >= self.weight_limit * self.headroom:
+                # weight window resets at the next minute boundary
+                self._pause_until = max(self._pause_until, (now // 60 + 1) * 60)
+
+def _to_ms(ts) -> int:
+    t = pd.Timestamp(ts)
+    t = t.tz_localize("UTC") if t.tzinfo is None else t.tz_convert("UTC")
+    return int(t.value // 1_000_000)
+
+def page_ranges(start_ms: int, end_ms: int, step_ms: int, page: int = MAX_PAGE) -> list:
+    """[(first_open_ms, last_open_ms)] slices of at most `page` bars covering the range."""
+    first = -(-start_ms // step_ms) * step_ms
+    span = step_ms * page
+    return [(s, min(s + span - step_ms, end_ms)) for s in range(first, end_ms + 1, span)]
+
+def _fetch_page(session, limiter, symbol, interval, start_ms, end_ms, retries=6) -> dict:
+    url = f"{rest_base_url()}/api/v3/klines"
+    params = {"symbol": symbol, "interval": interval, "startTime": start_ms,
+              "endTime": end_ms, "limit": MAX_PAGE}
+    for attempt in range(retries):
+        limiter.wait()
+        try:
+            resp = session.get(url, params=params, timeout=10)
+        except requests.RequestException:
+            time.sleep(0.5 * 2 ** attempt)
+            continue
+        limiter.update(resp)
+        if resp.status_code in (418, 429):
+            continue
+        if resp.status_code >= 500:
+            time.sleep(0.5 * 2 ** attempt)
+            continue
+        resp.raise_for_status()
+        raw = resp.json()
+        # compact arrays right away: a multi-year 1m backfill is millions of rows
+        return {"open_time": np.array([r[0] for r in raw], dtype=np.int64),
+                **{c: np.array([r[i] for r in raw], dtype=float) for i, c in enumerate(VALUE_COLS, start=1)}}
+    raise RuntimeError(f"klines page {symbol} {interval} {start_ms}-{end_ms} failed after {retries} attempts")
+
+def backfill(symbol: str = None, interval: str = None, start=None, end=None,
+             workers: int = 4, session: requests.Session = None, limiter: RateLimiter = None) -> int:
+    """Fetch [start, end] (default end: now) concurrently and merge closed bars into the store.
+    Returns how many new bars were stored.
+    """
+    symbol = (symbol or settings.symbol).upper()
+    interval = interval or settings.interval
+    step = interval_ms(interval)
+    now_ms = int(time.time() * 1000)
+    start_ms = _to_ms(start)
+    end_ms = min(_to_ms(end), now_ms) if end is not None else now_ms
+    pages = page_ranges(start_ms, end_ms, step)
+    if not pages:
+        return 0
+    session = session or shared_session()
+    limiter = limiter or RateLimiter()
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        parts = list(pool.map(lambda p: _fetch_page(session, limiter, symbol, interval, *p), pages))
+
+    merged = {k: np.concatenate([p[k] for p in parts]) for k in parts[0]}
+    ot, first = np.unique(merged["open_time"], return_index=True)
+    keep = np.ones(len(ot), dtype=bool)
+    if end_ms == now_ms:  # the exchange's newest row is the candle still in progress (see closed_mask)
+        keep[-1:] = False
+    store = open_store(symbol, interval)
+    return store.merge(ot[keep], {c: merged[c][first][keep] for c in VALUE_COLS})
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--symbol", default=settings.symbol)
+    ap.add_argument("--interval", default=settings.interval)
+    ap.add_argument("--start", required=True, help="e.g. 2023-01-01 (UTC)")
+    ap.add_argument("--end", default=None, help="default: now")
+    ap.add_argument("--workers", type=int, default=4)
+    args = ap.parse_args()
+    t0 = time.perf_counter()
+    added = backfill(args.symbol, args.interval, args.start, args.end, workers=args.workers)
+    store = open_store(args.symbol, args.interval)
+    print(f"{args.symbol} {args.interval}: +{added} bars in {time.perf_counter() - t0:.1f}s "
+          f"(store now {len(store)} bars)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,344 @@
+"""Benchmarks on deterministic synthetic OHLCV (no network needed).
+Equivalence with the original loops is checked by the tests (python -m pytest -q);
+these only time the paths.
+
+    python bench.py signals  --sizes 1000 100000 1000000
+    python bench.py backtest --sizes 1000 100000 1000000
+    python bench.py store    --sizes 1000000
+    python bench.py stream   --sizes 10000
+    python bench.py extrema  --sizes 1000000
+    python bench.py pipeline --sizes 1000000
+
+    python bench.py suite --save bench_baseline.json          # every pipeline stage, 1k … 1M bars
+    python bench.py suite --large --save bench_baseline.json  # … and 5M (features peak at ~4.5GB)
+    python bench.py compare bench_baseline.json --threshold 0.10   # exit 1 on regressions
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+import numpy as np
+import pandas as pd
+import sklearn
+
+from indicators import add_rsi, add_ema, add_atr, add_macd, fib_levels
+from strategy import signal_column
+from backtest import simple_long_only
+from klinestore import KlineStore
+from stream_indicators import IndicatorSet
+from extrema import ExtremaIndex
+from features import make_features, FeatureBuffer
+from model import fit_prob_model, add_probabilities
+from strategy import generate_signals
+from registry import registry
+import featgraph
+from tests.helpers import count_frame_copies, enriched, synthetic_ohlcv, with_random_signals
+from tests.reference import signals_loop, long_only_loop
+
+def _timeit(fn, repeat=3):
+    best = float("inf")
+    out = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, out
+
+# ---------- signals ----------
+def bench_signals(sizes, ref_max=100_000, prox_pct=5.0, thr=0.55):
+    # wide prox_pct so the fib filter lets crosses through and both paths emit signals
+    print(f"{'bars':>10s} | {'loop s':>9s} | {'vector s':>9s} | {'speedup':>8s} | signals")
+    for n in sizes:
+        df = enriched(n)
+        lvls = fib_levels(df, n)  # whole-range levels so many bars sit near a fib
+        t_vec, vec = _timeit(lambda: signal_column(df, lvls, prox_pct, thr))
+        n_sig = int((vec != "").sum())
+        if n <= ref_max:
+            t_loop, _ = _timeit(lambda: signals_loop(df, lvls, prox_pct, thr), repeat=1)
+            print(f"{n:>10d} | {t_loop:>9.4f} | {t_vec:>9.4f} | {t_loop / t_vec:>7.0f}x | {n_sig:>7d}")
+        else:
+            print(f"{n:>10d} | {'-':>9s} | {t_vec:>9.4f} | {'-':>8s} | {n_sig:>7d}")
+
+# ---------- backtest ----------
+def bench_backtest(sizes, ref_max=100_000):
+    cases = [("signals only", None, None), ("SL 1% / TP 2%", 1.0, 2.0)]
+    print(f"{'bars':>10s} | {'case':14s} | {'iterrows s':>10s} | {'arrays s':>9s} | {'speedup':>8s} | trades")
+    for n in sizes:
+        df = with_random_signals(n)
+        for label, sl, tp in cases:
+            t_arr, res = _timeit(lambda: simple_long_only(df, 0.0004, sl, tp))
+            n_tr = len(res["trades"])
+            if n <= ref_max:
+                t_ref, _ = _timeit(lambda: long_only_loop(df, 0.0004, sl, tp), repeat=1)
+                print(f"{n:>10d} | {label:14s} | {t_ref:>10.4f} | {t_arr:>9.4f} | {t_ref / t_arr:>7.0f}x | {n_tr}")
+            else:
+                print(f"{n:>10d} | {label:14s} | {'-':>10s} | {t_arr:>9.4f} | {'-':>8s} | {n_tr}")
+
+# ---------- kline store ----------
+def bench_store(sizes):
+    print(f"{'bars':>10s} | {'append s':>9s} | {'load s':>9s} | {'load tail=1000 s':>16s}")
+    for n in sizes:
+        df = synthetic_ohlcv(n)
+        with tempfile.TemporaryDirectory() as root:
+            store = KlineStore("BENCH", "1m", root=root)
+            t0 = time.perf_counter()
+            store.append_frame(df)
+            t_append = time.perf_counter() - t0
+            t_load, loaded = _timeit(lambda: KlineStore("BENCH", "1m", root=root).frame())
+            t_tail, _ = _timeit(lambda: KlineStore("BENCH", "1m", root=root).frame(tail=1000))
+            pd.testing.assert_frame_equal(loaded, df, check_freq=False, check_index_type=False)
+            del loaded
+        print(f"{n:>10d} | {t_append:>9.4f} | {t_load:>9.4f} | {t_tail:>16.4f}")
+
+# ---------- streaming indicators ----------
+def bench_stream(sizes, seed_bars=500):
+    print(f"{'bars':>10s} | {'batch/bar us':>12s} | {'stream/bar us':>13s}")
+    for n in sizes:
+        df = synthetic_ohlcv(n)
+        seed = min(seed_bars, n - 1)
+        st = IndicatorSet().seed(df.iloc[:seed])
+        cols = {c: df[c].to_numpy() for c in ("open", "high", "low", "close")}
+        t0 = time.perf_counter()
+        for i in range(seed, n):
+            bar = {c: cols[c][i] for c in cols}
+            # a revised in-progress tick first, then the closing one
+            st.update({**bar, "close": bar["close"] * 1.001}, final=False)
+            st.update(bar)
+        t_stream = (time.perf_counter() - t0) / max(1, n - seed) / 2
+        # the live alternative: recompute the whole window for every new bar
+        window = df.iloc[-1000:]
+        t_batch, _ = _timeit(lambda: add_macd(add_atr(add_ema(add_rsi(window, 14), spans=(50, 200)), 14)))
+        print(f"{n:>10d} | {t_batch * 1e6:>12.0f} | {t_stream * 1e6:>13.1f}")
+
+# ---------- range extrema ----------
+def bench_extrema(sizes, lookbacks=(50, 100, 200, 300, 500, 1000)):
+    print(f"{'bars':>10s} | {'lookbacks':>9s} | {'pandas rolling s':>16s} | {'build s':>8s} | {'index s':>8s}")
+    for n in sizes:
+        df = synthetic_ohlcv(n)
+        def with_pandas():
+            return {lb: (df["high"].rolling(lb).max().to_numpy(), df["low"].rolling(lb).min().to_numpy())
+                    for lb in lookbacks}
+        t_pd, _ = _timeit(with_pandas)
+        t_build, idx = _timeit(lambda: ExtremaIndex.from_frame(df, max_window=max(lookbacks)))
+        t_idx, _ = _timeit(lambda: {lb: idx.rolling(lb) for lb in lookbacks})
+        print(f"{n:>10d} | {len(lookbacks):>9d} | {t_pd:>16.4f} | {t_build:>8.4f} | {t_idx:>8.4f}")
+
+# ---------- copy-free feature pipeline ----------
+def measure(fn):
+    """(seconds, peak traced bytes, DataFrame copies, result) for one call."""
+    tracemalloc.start()
+    try:
+        with count_frame_copies() as copies:
+            t0 = time.perf_counter()
+            out = fn()
+            dt = time.perf_counter() - t0
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return dt, peak, copies["n"], out
+
+def _poll_with_copies(df):
+    """What one poll did before: the add_* chain in generate_signals, then make_features again."""
+    enriched = add_macd(add_atr(add_ema(add_rsi(df, 14).copy(), spans=(50, 200)), 14))
+    return make_features(enriched, 14, 200, 0.25)
+
+def bench_pipeline(sizes):
+    print(f"{'bars':>10s} | {'mode':9s} | {'time s':>7s} | {'peak MB':>8s} | {'x OHLCV':>7s} | {'df.copy()':>9s}")
+    for n in sizes:
+        df = synthetic_ohlcv(n)
+        ohlcv_mb = df.memory_usage(index=True).sum() / 1e6
+        t_a, peak_a, copies_a, _ = measure(lambda: _poll_with_copies(df))
+        buf = FeatureBuffer(n)  # preallocated once, reused every poll
+        t_b, peak_b, copies_b, _ = measure(lambda: buf.compute(df, 14, 200, 0.25).features())
+        for mode, t, peak, copies in (("copies", t_a, peak_a, copies_a), ("pipeline", t_b, peak_b, copies_b)):
+            print(f"{n:>10d} | {mode:9s} | {t:>7.3f} | {peak / 1e6:>8.1f} | {peak / 1e6 / ohlcv_mb:>7.1f} | {copies:>9d}")
+
+# ---------- suite: time / memory / copies per stage, baseline + compare ----------
+SUITE_SIZES = [1_000, 10_000, 100_000, 1_000_000]
+LARGE_SIZES = [5_000_000]  # suite --large: needs a machine with >= 8GB
+NOISE_FLOOR_S = 0.002  # absolute slack: sub-millisecond stages must not flag on timer jitter
+
+def _stage_indicators(ctx):
+    out = add_macd(add_atr(add_ema(add_rsi(ctx["df"], 14), spans=(50, 200)), 14))
+    return out, fib_levels(out, 200)
+
+def _stage_features(ctx):
+    ctx["feat"], ctx["feats"] = make_features(ctx["df"], 14, 200, 0.25)
+    return ctx["feat"]
+
+def _stage_fit(ctx):
+    ctx["model"] = fit_prob_model(ctx["feat"], ctx["feats"])
+    return ctx["model"]
+
+def _stage_predict(ctx):
+    return add_probabilities(ctx["model"], ctx["feat"], ctx["feats"])
+
+def _stage_signals(ctx):
+    featgraph.graph.clear()  # a fresh data version, as on every live poll
+    ctx["sig"], _ = generate_signals(ctx["df"], 14, 200, 0.25)
+    return ctx["sig"]
+
+def _stage_backtest(ctx):
+    return simple_long_only(ctx["sig"])
+
+# (name, fn, always warm up) in dependency order. Below 1M bars every stage gets one untimed
+# warm-up run; signals always does, so the registry fit of its model is not timed (that is "fit")
+SUITE_STAGES = [("indicators", _stage_indicators, False), ("features", _stage_features, False),
+                ("fit", _stage_fit, False), ("predict", _stage_predict, False),
+                ("signals", _stage_signals, True), ("backtest", _stage_backtest, False)]
+
+def _profile(fn):
+    """(peak MB, kept MB, kept blocks, DataFrame copies) of one traced call. Kept blocks are the
+    memory blocks still allocated when the call returns (net, not an allocation count)."""
+    tracemalloc.start()
+    try:
+        with count_frame_copies() as copies:
+            out = fn()
+        kept, peak = tracemalloc.get_traced_memory()
+        kept_blocks = sum(st.count for st in tracemalloc.take_snapshot().statistics("filename"))
+    finally:
+        tracemalloc.stop()
+    del out
+    return peak / 1e6, kept / 1e6, kept_blocks, copies["n"]
+
+def calibrate() -> float:
+    """Seconds for a fixed numpy/pandas workload, saved with every run. compare --normalize
+    divides it out when a machine is uniformly slower today (VM neighbours, thermal limits)."""
+    x = pd.Series(np.random.default_rng(0).normal(size=500_000))
+    t, _ = _timeit(lambda: (x.rolling(50).mean().sum(), np.sort(x.to_numpy()), x.ewm(span=20).mean()), repeat=5)
+    return t
+
+def _environment() -> dict:
+    return {"python": platform.python_version(), "numpy": np.__version__, "pandas": pd.__version__,
+            "sklearn": sklearn.__version__, "machine": platform.machine(), "cpus": os.cpu_count()}
+
+def run_suite(sizes, stages=None, repeat=5) -> dict:
+    """{"env": ..., "results": {"stage@bars": {time_s, peak_mb, kept_mb, kept_blocks, copies}}}."""
+    names = stages or [name for name, _, _ in SUITE_STAGES]
+    results = {}
+    print(f"{'bars':>10s} | {'stage':10s} | {'time s':>9s} | {'peak MB':>8s} | {'kept MB':>8s} | "
+          f"{'kept blocks':>11s} | {'copies':>6s}")
+    with tempfile.TemporaryDirectory() as tmp:
+        model_root = registry.root
+        registry.root = Path(tmp)  # never touch the real model dir
+        try:
+            for n in sizes:
+                ctx = {"df": synthetic_ohlcv(n)}
+                small = n < 1_000_000
+                reps = repeat if small else 1
+                for i, (name, fn, warm) in enumerate(SUITE_STAGES):
+                    run = lambda: fn(ctx)
+                    if name not in names:
+                        if any(later in names for later, _, _ in SUITE_STAGES[i + 1:]):
+                            run()  # untimed: a selected later stage needs its output
+                        continue
+                    if warm or small:
+                        run()
+                    t, _ = _timeit(run, repeat=reps)
+                    peak, kept, kept_blocks, copies = _profile(run)
+                    results[f"{name}@{n}"] = {"time_s": t, "peak_mb": peak, "kept_mb": kept,
+                                              "kept_blocks": kept_blocks, "copies": copies}
+                    print(f"{n:>10d} | {name:10s} | {t:>9.4f} | {peak:>8.1f} | {kept:>8.1f} | "
+                          f"{kept_blocks:>11d} | {copies:>6d}")
+                del ctx, run
+                featgraph.graph.clear()
+        finally:
+            registry.root = model_root
+            featgraph.graph.clear()
+    return {"env": _environment(), "date": pd.Timestamp.now(tz="UTC").isoformat(timespec="seconds"),
+            "calibration_s": calibrate(), "sizes": list(sizes), "stages": names, "repeat": repeat,
+            "results": results}
+
+def compare(baseline: dict, current: dict, threshold: float = 0.10, normalize: bool = False) -> list:
+    """Rows slower (time) or hungrier (peak memory, DataFrame copies) than the baseline by
+    more than `threshold`; prints the whole comparison. Times are scaled by the two runs'
+    calibration ratio with normalize=True."""
+    regressions = []
+    speed = baseline["calibration_s"] / current["calibration_s"] if normalize else 1.0
+    if normalize:
+        print(f"calibration: baseline {baseline['calibration_s'] * 1000:.1f}ms, now "
+              f"{current['calibration_s'] * 1000:.1f}ms → times scaled by {speed:.2f}")
+    print(f"{'stage@bars':>20s} | {'time':>17s} | {'peak MB':>17s} | {'copies':>7s} | status")
+    for key, base in baseline["results"].items():
+        cur = current["results"].get(key)
+        if cur is None:
+            continue
+        t = cur["time_s"] * speed
+        dt = t / base["time_s"] if base["time_s"] else 1.0
+        dm = cur["peak_mb"] / base["peak_mb"] if base["peak_mb"] else 1.0
+        slow = dt > 1 + threshold and t - base["time_s"] > NOISE_FLOOR_S
+        hungry = dm > 1 + threshold and cur["peak_mb"] - base["peak_mb"] > 1.0
+        copies = cur["copies"] > base["copies"]
+        status = ", ".join(w for w, bad in (("SLOWER", slow), ("MEMORY", hungry), ("COPIES", copies)) if bad)
+        if status:
+            regressions.append((key, status))
+        print(f"{key:>20s} | {t:>8.4f} {dt:>7.2f}x | {cur['peak_mb']:>8.1f} {dm:>7.2f}x | "
+              f"{base['copies']:>3d}→{cur['copies']:<3d} | {status or 'ok'}")
+    if baseline.get("env") != current.get("env"):
+        print(f"note: environments differ (baseline {baseline.get('env')}, now {current.get('env')})")
+    print(f"{len(regressions)} regression(s) beyond {threshold:.0%}")
+    return regressions
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("signals", help="vectorized signal masks vs the per-row loop")
+    p.add_argument("--sizes", type=int, nargs="+", default=[1_000, 100_000, 1_000_000])
+    p.add_argument("--ref-max", type=int, default=100_000,
+                   help="largest size the slow reference loop is run on")
+    p = sub.add_parser("backtest", help="array backtest engine vs the iterrows loop")
+    p.add_argument("--sizes", type=int, nargs="+", default=[1_000, 100_000, 1_000_000])
+    p.add_argument("--ref-max", type=int, default=100_000,
+                   help="largest size the slow reference loop is run on")
+    p = sub.add_parser("store", help="memory-mapped kline store load/append")
+    p.add_argument("--sizes", type=int, nargs="+", default=[1_000, 100_000, 1_000_000])
+    p = sub.add_parser("stream", help="O(1) streaming indicators vs batch recomputation")
+    p.add_argument("--sizes", type=int, nargs="+", default=[2_000, 20_000])
+    p = sub.add_parser("extrema", help="sparse-table rolling hi/lo vs pandas rolling max/min")
+    p.add_argument("--sizes", type=int, nargs="+", default=[10_000, 1_000_000])
+    p = sub.add_parser("pipeline", help="peak memory / copies per poll: add_* chain vs FeatureBuffer")
+    p.add_argument("--sizes", type=int, nargs="+", default=[10_000, 1_000_000])
+    p = sub.add_parser("suite", help="time / peak memory / DataFrame copies per pipeline stage")
+    p.add_argument("--sizes", type=int, nargs="+", default=SUITE_SIZES)
+    p.add_argument("--large", action="store_true", help=f"also run {LARGE_SIZES} bars")
+    p.add_argument("--stages", nargs="+", choices=[name for name, _, _ in SUITE_STAGES], default=None)
+    p.add_argument("--repeat", type=int, default=5, help="timing runs (best of) below 1M bars")
+    p.add_argument("--save", default=None, metavar="FILE", help="write the results (baseline) as JSON")
+    p = sub.add_parser("compare", help="re-run the suite of a baseline file and flag regressions")
+    p.add_argument("baseline")
+    p.add_argument("--current", default=None, metavar="FILE", help="compare a saved run instead of running now")
+    p.add_argument("--threshold", type=float, default=0.10, help="allowed relative increase (0.10 = 10%%)")
+    p.add_argument("--normalize", action="store_true",
+                   help="scale times by the calibration ratio (baseline from another/busier machine)")
+    args = ap.parse_args()
+    if args.cmd == "suite":
+        sizes = args.sizes + [n for n in LARGE_SIZES if n not in args.sizes] if args.large else args.sizes
+        res = run_suite(sizes, args.stages, args.repeat)
+        if args.save:
+            Path(args.save).write_text(json.dumps(res, indent=1))
+            print(f"saved {len(res['results'])} results to {args.save}")
+    elif args.cmd == "compare":
+        base = json.loads(Path(args.baseline).read_text())
+        cur = (json.loads(Path(args.current).read_text()) if args.current
+               else run_suite(base["sizes"], base["stages"], base.get("repeat", 5)))
+        sys.exit(1 if compare(base, cur, args.threshold, normalize=args.normalize) else 0)
+    elif args.cmd == "signals":
+        bench_signals(args.sizes, ref_max=args.ref_max)
+    elif args.cmd == "backtest":
+        bench_backtest(args.sizes, ref_max=args.ref_max)
+    elif args.cmd == "store":
+        bench_store(args.sizes)
+    elif args.cmd == "stream":
+        bench_stream(args.sizes)
+    elif args.cmd == "extrema":
+        bench_extrema(args.sizes)
+    elif args.cmd == "pipeline":
+        bench_pipeline(args.sizes)
+
+if __name__ == "__main__":
+    main()
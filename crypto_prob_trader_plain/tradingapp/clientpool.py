@@ -0,0 +1,132 @@
+"""One Binance client per process: created lazily, shared by every thread, keep-alive pooled.
+
+Constructing binance.client.Client opens a new requests.Session and pings the API,
+i.e. a TLS handshake plus a round trip; doing that per poll/order is pure overhead.
+Every REST call made through the shared client (and the shared session used by the
+backfill) is timed into `stats`.
+"""
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from binance.client import Client
+
+from config import settings
+
+class LatencyStats:
+    """Per-endpoint request counters: count, errors, total/max/last seconds."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._by_path = {}
+
+    def record(self, path: str, seconds: float, ok: bool = True):
+        with self._lock:
+            s = self._by_path.setdefault(path, {"count": 0, "errors": 0, "total_s": 0.0,
+                                                "max_s": 0.0, "last_s": 0.0})
+            s["count"] += 1
+            s["errors"] += 0 if ok else 1
+            s["total_s"] += seconds
+            s["max_s"] = max(s["max_s"], seconds)
+            s["last_s"] = seconds
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {p: {**s, "mean_s": s["total_s"] / s["count"] if s["count"] else 0.0}
+                    for p, s in self._by_path.items()}
+
+    def reset(self):
+        with self._lock:
+            self._by_path.clear()
+
+stats = LatencyStats()
+
+def _endpoint(uri: str) -> str:
+    """'https://api.binance.com/api/v3/klines?…' → '/api/v3/klines'."""
+    path = uri.split("://", 1)[-1]
+    path = path[path.find("/"):] if "/" in path else "/"
+    return path.split("?", 1)[0]
+
+def _pooled(session: requests.Session) -> requests.Session:
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=settings.http_pool)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+class PooledClient(Client):
+    """binance Client on a pooled keep-alive session, with per-request latency stats
+    and an optional base URL override (settings.rest_url, e.g. fake_binance)."""
+
+    def __init__(self, *args, base_url: str = "", **kwargs):
+        self._base_url = base_url.rstrip("/")
+        super().__init__(*args, **kwargs)
+
+    def _init_session(self) -> requests.Session:
+        return _pooled(super()._init_session())
+
+    def _create_api_uri(self, path: str, signed: bool = True, version: str = Client.PUBLIC_API_VERSION) -> str:
+        if not self._base_url:
+            return super()._create_api_uri(path, signed, version)
+        v = self.PRIVATE_API_VERSION if signed else version
+        return f"{self._base_url}/api/{v}/{path}"
+
+    def _request(self, method, uri: str, signed: bool, force_params: bool = False, **kwargs):
+        t0 = time.perf_counter()
+        ok = False
+        try:
+            res = super()._request(method, uri, signed, force_params, **kwargs)
+            ok = True
+            return res
+        finally:
+            stats.record(_endpoint(uri), time.perf_counter() - t0, ok)
+
+_lock = threading.Lock()
+_client = None
+_client_key = None
+_session = None
+
+def get_client() -> PooledClient:
+    """The process-wide client; rebuilt only if testnet/keys/base URL settings change."""
+    global _client, _client_key
+    key = (settings.testnet, settings.api_key, settings.api_secret, settings.rest_url)
+    client = _client
+    if client is not None and _client_key == key:
+        return client
+    with _lock:
+        if _client is None or _client_key != key:
+            if _client is not None:
+                _client.session.close()
+            _client = PooledClient(settings.api_key, settings.api_secret,
+                                   testnet=settings.testnet, base_url=settings.rest_url)
+            _client_key = key
+        return _client
+
+class _TimedSession(requests.Session):
+    def request(self, method, url, *args, **kwargs):
+        t0 = time.perf_counter()
+        ok = False
+        try:
+            resp = super().request(method, url, *args, **kwargs)
+            ok = resp.status_code < 400
+            return resp
+        finally:
+            stats.record(_endpoint(url), time.perf_counter() - t0, ok)
+
+def shared_session() -> requests.Session:
+    """Pooled keep-alive session for raw REST calls that need response headers (backfill)."""
+    global _session
+    if _session is None:
+        with _lock:
+            if _session is None:
+                _session = _pooled(_TimedSession())
+    return _session
+
+def close():
+    global _client, _client_key, _session
+    with _lock:
+        if _client is not None:
+            _client.session.close()
+        if _session is not None:
+            _session.close()
+        _client = _client_key = _session = None
@@ -12,23 +12,48 @@ class Settings:
     interval: str = os.getenv("INTERVAL", "1h")
     limit: int = int(os.getenv("LIMIT", "1000"))
 
+    # Local kline store (memory-mapped history shared by every script)
+    use_store: bool = os.getenv("KLINE_STORE", "true").lower() == "true"
+    store_dir: str = os.getenv("KLINE_STORE_DIR", "data")
+
     # Indicators / features
     rsi_len: int = int(os.getenv("RSI_LEN", "14"))
     fib_lookback: int = int(os.getenv("FIB_LOOKBACK", "200"))
     prox_pct: float = float(os.getenv("PROX_PCT", "0.25"))  # % distance to fib
+    feature_cache: int = int(os.getenv("FEATURE_CACHE_SIZE", "64"))  # memoized feature-graph entries
 
     # Probabilities
     threshold: float = float(os.getenv("PROB_THRESHOLD", "0.55"))
 
+    # Walk-forward evaluation (backtest.py / walkforward.py)
+    wf_train: int = int(os.getenv("WF_TRAIN_BARS", "500"))
+    wf_test: int = int(os.getenv("WF_TEST_BARS", "100"))
+    wf_mode: str = os.getenv("WF_MODE", "expanding")  # expanding | rolling
+
+    # Model registry (fitted models persisted per symbol/interval/feature set)
+    model_dir: str = os.getenv("MODEL_DIR", "models")
+    model_max_age_h: float = float(os.getenv("MODEL_MAX_AGE_HOURS", "24"))  # 0 → never by age
+    model_drift: float = float(os.getenv("MODEL_DRIFT", "1.0"))  # feature mean shift in train std devs; 0 → off
+
     # Execution & env
     paper: bool = os.getenv("PAPER_TRADING", "true").lower() == "true"
     testnet: bool = os.getenv("BINANCE_TESTNET", "true").lower() == "true"
     order_size_usdt: float = float(os.getenv("ORDER_SIZE_USDT", "50"))
 
+    rest_url: str = os.getenv("BINANCE_REST_URL", "")  # empty → api.binance.com / testnet.binance.vision
+    ws_url: str = os.getenv("BINANCE_WS_URL", "")  # empty → stream.binance.com:9443 / testnet.binance.vision
+    http_pool: int = int(os.getenv("HTTP_POOL_SIZE", "10"))  # keep-alive connections per host
     api_key: str = os.getenv("BINANCE_API_KEY", "")
     api_secret: str = os.getenv("BINANCE_API_SECRET", "")
 
-    # polling
-    poll_seconds: int = int(os.getenv("POLL_SECONDS", "60"))
+    # dashboard
+    chart_max_points: int = int(os.getenv("CHART_MAX_POINTS", "2000"))  # LTTB budget per line (≈ chart width in px)
+
+    # polling / live loop
+    poll_seconds: int = int(os.getenv("POLL_SECONDS", "60"))  # ws mode: REST gap-fill after this much silence
+    live_mode: str = os.getenv("LIVE_MODE", "ws")  # ws (kline websocket) | poll (REST every POLL_SECONDS)
+    ws_eval_updates: bool = os.getenv("WS_EVAL_UPDATES", "false").lower() == "true"  # also evaluate in-progress candles
+    trade_stream: str = os.getenv("WS_TRADE_STREAM", "aggTrade")  # aggTrade | trade (LiveTicker)
+    trade_buffer: int = int(os.getenv("WS_TRADE_BUFFER", "100000"))  # trades kept in LiveTicker's ring buffer
 
 settings = Settings()
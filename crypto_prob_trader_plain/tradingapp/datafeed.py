@@ -1,7 +1,14 @@
 
+import os
+import numpy as np
 import pandas as pd
 from binance.client import Client
 from config import settings
+from klinestore import KlineStore, VALUE_COLS
+import clientpool
+
+KLINE_COLS = ["open_time","open","high","low","close","volume","close_time","qav","trades","tbbav","tbqav","ignore"]
+MAX_PAGE = 1000  # Binance max klines per request
 
 INTERVAL_MAP = {
     "1m": Client.KLINE_INTERVAL_1MINUTE,
@@ -18,23 +25,21 @@ INTERVAL_MAP = {
     "1d": Client.KLINE_INTERVAL_1DAY,
 }
 
+def interval_ms(interval: str) -> int:
+    unit, n = interval[-1], int(interval[:-1])
+    return n * {"s": 1_000, "m": 60_000, "h": 3_600_000, "d": 86_400_000}[unit]
+
+def rest_base_url() -> str:
+    if settings.rest_url:
+        return settings.rest_url.rstrip("/")
+    return "https://testnet.binance.vision" if settings.testnet else "https://api.binance.com"
+
 def get_client():
-    if settings.testnet:
-        client = Client(settings.api_key, settings.api_secret, testnet=True)
-    else:
-        client = Client(settings.api_key, settings.api_secret)
-    return client
+    # one pooled, keep-alive client per process (see clientpool)
+    return clientpool.get_client()
 
-def get_klines(symbol: str = None, interval: str = None, limit: int = None) -> pd.DataFrame:
-    symbol = symbol or settings.symbol
-    interval = interval or settings.interval
-    limit = limit or settings.limit
-    if interval not in INTERVAL_MAP:
-        raise ValueError(f"Unsupported interval {interval}")
-    client = get_client()
-    raw = client.get_klines(symbol=symbol, interval=INTERVAL_MAP[interval], limit=limit)
-    cols = ["open_time","open","high","low","close","volume","close_time","qav","trades","tbbav","tbqav","ignore"]
-    df = pd.DataFrame(raw, columns=cols)
+def klines_to_frame(raw) -> pd.DataFrame:
+    df = pd.DataFrame(raw, columns=KLINE_COLS)
     # Convert types
     for c in ["open","high","low","close","volume","qav","tbbav","tbqav"]:
         df[c] = df[c].astype(float)
@@ -43,3 +48,156 @@ def get_klines(symbol: str = None, interval: str = None, limit: int = None) -> p
     df.set_index("open_time", inplace=True)
     df.rename_axis("time", inplace=True)
     return df[["open","high","low","close","volume"]].copy()
+
+def open_store(symbol: str, interval: str) -> KlineStore:
+    # testnet candles are synthetic; never mix them with mainnet history
+    root = os.path.join(settings.store_dir, "testnet") if settings.testnet else settings.store_dir
+    return KlineStore(symbol, interval, root=root)
+
+def fetch_since(symbol: str, interval: str, start_ms: int) -> list:
+    """Raw klines with open_time >= start_ms up to now, paging past the 1000-bar cap."""
+    client = get_client()
+    raw = []
+    while True:
+        page = client.get_klines(symbol=symbol, interval=INTERVAL_MAP[interval],
+                                 startTime=int(start_ms), limit=MAX_PAGE)
+        raw.extend(page)
+        if len(page) < MAX_PAGE:
+            return raw
+        start_ms = int(page[-1][0]) + 1
+
+def fetch_before(symbol: str, interval: str, end_ms: int, n: int) -> list:
+    """Raw klines: the newest `n` with open_time < end_ms (fewer if the listing is younger),
+    oldest first, paging backwards past the 1000-bar cap."""
+    client = get_client()
+    pages = []
+    while n > 0:
+        want = min(MAX_PAGE, n)
+        page = client.get_klines(symbol=symbol, interval=INTERVAL_MAP[interval],
+                                 endTime=int(end_ms) - 1, limit=want)
+        if page:
+            pages.append(page)
+            n -= len(page)
+            end_ms = int(page[0][0])
+        if len(page) < want:
+            break
+    return [r for page in reversed(pages) for r in page]
+
+def closed_mask(raw) -> np.ndarray:
+    """True for every bar but the newest. `raw` must reach the present (fetch_since, or
+    get_klines without endTime), where the exchange's last row is the candle still in
+    progress; deciding on its rows instead of the local clock means clock skew can never
+    persist an unfinished bar (append skips open times it already has, so it would stick).
+    """
+    mask = np.ones(len(raw), dtype=bool)
+    mask[-1:] = False
+    return mask
+
+def sync_store(store: KlineStore, limit: int = None) -> pd.DataFrame:
+    """Fetch only bars newer than the store tail, append the closed ones, extend the
+    history backwards until it holds the `limit` - 1 closed bars in front of the live one,
+    and return the still-open (in-progress) bar as a frame.
+    """
+    limit = limit or settings.limit
+    last = store.last_open_time()
+    if last is None:
+        raw = get_client().get_klines(symbol=store.symbol, interval=INTERVAL_MAP[store.interval],
+                                      limit=limit)
+    else:
+        raw = fetch_since(store.symbol, store.interval, last + 1)
+    closed = closed_mask(raw)
+    df = klines_to_frame(raw)
+    store.append_frame(df[closed])
+
+    missing = limit - 1 - len(store)
+    if missing > 0 and len(store):
+        # a store seeded by a shorter LIMIT: prepend the older bars
+        old = klines_to_frame(fetch_before(store.symbol, store.interval, store.first_open_time(), missing))
+        store.merge(old.index.as_unit("ms").asi8, {c: old[c].to_numpy(dtype=float) for c in VALUE_COLS})
+    return df[~closed]
+
+def get_klines(symbol: str = None, interval: str = None, limit: int = None,
+               use_store: bool = None, offline: bool = False) -> pd.DataFrame:
+    """Last `limit` bars. With the kline store (default) only bars newer than the stored
+    history (and older ones, if it holds fewer than `limit`) are requested; offline=True
+    (or a REST failure) serves the store alone.
+    """
+    symbol = symbol or settings.symbol
+    interval = interval or settings.interval
+    limit = limit or settings.limit
+    if interval not in INTERVAL_MAP:
+        raise ValueError(f"Unsupported interval {interval}")
+    use_store = settings.use_store if use_store is None else use_store
+    if not use_store:
+        client = get_client()
+        raw = client.get_klines(symbol=symbol, interval=INTERVAL_MAP[interval], limit=limit)
+        return klines_to_frame(raw)
+
+    store = open_store(symbol, interval)
+    live = None
+    if not offline:
+        try:
+            live = sync_store(store, limit)
+        except Exception as e:
+            if len(store) == 0:
+                raise
+            print(f"[store] {symbol} {interval}: REST unavailable ({e}); serving {len(store)} stored bars")
+    if live is None or live.empty:
+        return store.frame(tail=limit)
+    hist = store.frame(tail=max(0, limit - len(live)))
+    return pd.concat([hist, live[live.index > hist.index[-1]] if len(hist) else live])
+
+class KlineWindow:
+    """Rolling in-memory window of the last `limit` bars for a live loop.
+    After the first load each refresh() asks only for bars from the last known
+    open_time on (usually 1-2 rows), overwrites the in-progress candle and trims.
+    """
+    def __init__(self, symbol: str = None, interval: str = None, limit: int = None, use_store: bool = None):
+        self.symbol = (symbol or settings.symbol).upper()
+        self.interval = interval or settings.interval
+        self.limit = limit or settings.limit
+        self.use_store = settings.use_store if use_store is None else use_store
+        self.df = None
+        self.last_fetched = 0  # rows returned by the last REST call
+
+    def last_open_ms(self) -> int:
+        return int(self.df.index[-1:].as_unit("ms").asi8[0])
+
+    def refresh(self) -> pd.DataFrame:
+        if self.df is None or self.df.empty:
+            self.df = get_klines(self.symbol, self.interval, self.limit, use_store=self.use_store)
+            self.last_fetched = len(self.df)
+            return self.df
+        raw = fetch_since(self.symbol, self.interval, self.last_open_ms())
+        self.last_fetched = len(raw)
+        if not raw:
+            return self.df
+        new = klines_to_frame(raw)
+        if self.use_store:
+            open_store(self.symbol, self.interval).append_frame(new[closed_mask(raw)])
+        self.merge(new)
+        return self.df
+
+    def apply(self, raw_row, closed: bool) -> bool:
+        """Splice one websocket candle (REST kline row layout) into the window.
+        False if it does not continue the window (missed bars): call refresh() to gap-fill.
+        """
+        if self.df is None or self.df.empty:
+            return False
+        open_ms, last = int(raw_row[0]), self.last_open_ms()
+        if open_ms < last:
+            return True  # late duplicate of a bar we already have
+        if open_ms > last + interval_ms(self.interval):
+            return False
+        new = klines_to_frame([raw_row])
+        if closed and self.use_store:
+            open_store(self.symbol, self.interval).append_frame(new)
+        self.merge(new)
+        return True
+
+    def merge(self, new: pd.DataFrame):
+        """Splice newer/updated bars in: rows from new.index[0] on are replaced, then trimmed."""
+        if new.empty:
+            return
+        kept = self.df[self.df.index < new.index[0]]
+        self.df = pd.concat([kept, new]).iloc[-self.limit:]
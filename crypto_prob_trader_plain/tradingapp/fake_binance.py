@@ -0,0 +1,281 @@
+"""Local fake of the Binance spot REST endpoints the project uses (klines, ping, time).
+
+Candles are a deterministic function of open_time, so any page of any range is
+reproducible and concurrent fetches can be checked for gaps/duplicates. It also
+reports X-MBX-USED-WEIGHT-1M and answers 429 + Retry-After past `weight_limit`,
+which is what the backfill rate limiter reacts to.
+
+FakeStreams is the websocket side: a combined-stream endpoint (/stream) that honours
+SUBSCRIBE/UNSUBSCRIBE and pushes trade/aggTrade/kline events for the subscribed
+streams; drop() cuts every connection to exercise reconnect logic.
+
+    python fake_binance.py --port 8765 --ws-port 8766
+    BINANCE_REST_URL=http://127.0.0.1:8765 python backfill.py --start 2024-01-01
+    BINANCE_WS_URL=ws://127.0.0.1:8766 python run_live.py
+"""
+import argparse
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import numpy as np
+import websockets
+
+INTERVAL_MS = {"1m": 60_000, "3m": 180_000, "5m": 300_000, "15m": 900_000, "30m": 1_800_000,
+               "1h": 3_600_000, "2h": 7_200_000, "4h": 14_400_000, "6h": 21_600_000,
+               "8h": 28_800_000, "12h": 43_200_000, "1d": 86_400_000}
+
+def _hash01(k: np.ndarray) -> np.ndarray:
+    """Deterministic pseudo-random [0, 1) per integer (open times are multiples of 60000,
+    so hashing them modulo a power of ten would be constant)."""
+    return ((k * 2654435761) % 1009) / 1009.0
+
+def _price(ms: np.ndarray, seed: int) -> np.ndarray:
+    """Slow waves plus a per-timestamp jitter, so bar-to-bar returns have both signs."""
+    t = ms.astype(np.float64)
+    day = 86_400_000.0
+    base = 1000.0 + seed + 0.05 * (1000.0 + seed) * np.sin(t / (30 * day) + seed)
+    jitter = _hash01(ms // 60_000 + seed) - 0.5
+    return base * (1 + 0.01 * np.sin(t / (0.7 * day))) * (1 + 0.003 * jitter)
+
+def candles(symbol: str, interval: str, open_times: np.ndarray, now_ms: int) -> list:
+    """Raw kline rows (Binance wire format) for the given open times."""
+    step = INTERVAL_MS[interval]
+    seed = sum(map(ord, symbol))
+    open_ = _price(open_times, seed)
+    close = _price(open_times + step, seed)
+    noise = _hash01(open_times // 60_000)
+    high = np.maximum(open_, close) * (1 + 0.002 * noise)
+    low = np.minimum(open_, close) * (1 - 0.002 * noise)
+    vol = 10.0 + 90.0 * noise
+    rows = []
+    for i, ot in enumerate(open_times.tolist()):
+        ct = ot + step - 1
+        if ot > now_ms:
+            break
+        rows.append([ot, f"{open_[i]:.2f}", f"{high[i]:.2f}", f"{low[i]:.2f}", f"{close[i]:.2f}",
+                     f"{vol[i]:.4f}", ct, f"{vol[i] * close[i]:.4f}", 100, "0", "0", "0"])
+    return rows
+
+class FakeBinance:
+    """Threaded HTTP server; use as a context manager or start()/stop()."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, weight_limit: int = 6000,
+                 latency_s: float = 0.0, history_start_ms: int = 1_500_000_000_000):
+        self.weight_limit = weight_limit
+        self.latency_s = latency_s
+        self.history_start_ms = history_start_ms
+        self.requests = 0
+        self._weight = 0
+        self._minute = 0
+        self._lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer((host, port), self._handler())
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _charge(self, weight: int):
+        """Returns (used weight this minute, accepted?)."""
+        with self._lock:
+            self.requests += 1
+            minute = int(time.time() // 60)
+            if minute != self._minute:
+                self._minute, self._weight = minute, 0
+            self._weight += weight
+            return self._weight, self._weight <= self.weight_limit
+
+    def klines(self, q: dict) -> list:
+        symbol = q.get("symbol", "ETHUSDT")
+        interval = q.get("interval", "1h")
+        step = INTERVAL_MS[interval]
+        limit = min(int(q.get("limit", 500)), 1000)
+        now_ms = int(time.time() * 1000)
+        last_open = now_ms // step * step
+        end = min(int(q["endTime"]), last_open) if "endTime" in q else last_open
+        first = end // step * step - (limit - 1) * step
+        if "startTime" in q:
+            first = int(q["startTime"])
+        first = -(-max(first, self.history_start_ms) // step) * step
+        if first > end:
+            return []
+        open_times = np.arange(first, min(end, first + (limit - 1) * step) + 1, step, dtype=np.int64)
+        return candles(symbol, interval, open_times, now_ms)
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _send(self, code, body, used):
+                payload = json.dumps(body).encode()
+                self.send_response(code)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.send_header("X-MBX-USED-WEIGHT-1M", str(used))
+                if code == 429:
+                    self.send_header("Retry-After", str(60 - int(time.time()) % 60))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                q = {k: v[0] for k, v in parse_qs(url.query).items()}
+                if fake.latency_s:
+                    time.sleep(fake.latency_s)
+                weight = 2 if url.path.endswith("/klines") else 1
+                used, ok = fake._charge(weight)
+                if not ok:
+                    return self._send(429, {"code": -1003, "msg": "Too many requests"}, used)
+                if url.path.endswith("/ping"):
+                    return self._send(200, {}, used)
+                if url.path.endswith("/time"):
+                    return self._send(200, {"serverTime": int(time.time() * 1000)}, used)
+                if url.path.endswith("/klines"):
+                    return self._send(200, fake.klines(q), used)
+                return self._send(404, {"code": -1, "msg": "not found"}, used)
+
+        return Handler
+
+class FakeStreams:
+    """Combined-stream websocket server. Every `tick_s` each subscribed stream gets one
+    event: trades/aggTrades at the current price, klines for the current bar (x=true on the
+    first tick after a bar's close time)."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, tick_s: float = 0.05):
+        self.host, self.port, self.tick_s = host, port, tick_s
+        self.messages = 0
+        self.connections = 0
+        self._clients = set()
+        self._loop = None
+        self._server = None
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        return f"ws://{self.host}:{self.port}"
+
+    def start(self):
+        ready = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(ready,), daemon=True)
+        self._thread.start()
+        ready.wait()
+        return self
+
+    def stop(self):
+        self._loop.call_soon_threadsafe(self._server.close)
+        self._thread.join(timeout=5)
+
+    def drop(self):
+        """Close every client connection (the server keeps accepting new ones)."""
+        for ws in list(self._clients):
+            asyncio.run_coroutine_threadsafe(ws.close(), self._loop)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _run(self, ready):
+        self._loop = asyncio.new_event_loop()
+
+        async def serve():
+            self._server = await websockets.serve(self._handle, self.host, self.port)
+            self.port = self._server.sockets[0].getsockname()[1]
+            ready.set()
+            await self._server.wait_closed()
+
+        self._loop.run_until_complete(serve())
+
+    def event(self, stream: str, now_ms: int, last_open: dict) -> dict:
+        symbol, _, kind = stream.partition("@")
+        seed = sum(map(ord, symbol.upper()))
+        price = float(_price(np.array([now_ms], dtype=np.int64), seed)[0])
+        if kind in ("trade", "aggTrade"):
+            return {"e": kind, "E": now_ms, "s": symbol.upper(), "p": f"{price:.2f}",
+                    "q": f"{0.01 + _hash01(np.array([now_ms]))[0]:.4f}", "T": now_ms, "m": bool(now_ms % 2)}
+        interval = kind.split("_", 1)[1]
+        step = INTERVAL_MS[interval]
+        open_ms = now_ms - now_ms % step
+        closed = last_open.get(stream) is not None and open_ms > last_open[stream]
+        if closed:  # final update of the previous bar first
+            open_ms = last_open[stream]
+        last_open[stream] = now_ms - now_ms % step
+        row = candles(symbol.upper(), interval, np.array([open_ms], dtype=np.int64), now_ms)[0]
+        return {"e": "kline", "E": now_ms, "s": symbol.upper(),
+                "k": {"t": row[0], "T": row[6], "s": symbol.upper(), "i": interval, "o": row[1], "h": row[2],
+                      "l": row[3], "c": row[4], "v": row[5], "n": row[8], "x": closed, "q": row[7],
+                      "V": "0", "Q": "0"}}
+
+    async def _handle(self, ws):
+        self.connections += 1
+        self._clients.add(ws)
+        subscribed, last_open = set(), {}
+
+        async def pump():
+            while True:
+                await asyncio.sleep(self.tick_s)
+                now_ms = int(time.time() * 1000)
+                for stream in list(subscribed):
+                    await ws.send(json.dumps({"stream": stream, "data": self.event(stream, now_ms, last_open)}))
+                    self.messages += 1
+
+        pumper = asyncio.ensure_future(pump())
+        try:
+            async for raw in ws:
+                req = json.loads(raw)
+                if req.get("method") == "SUBSCRIBE":
+                    subscribed.update(req["params"])
+                elif req.get("method") == "UNSUBSCRIBE":
+                    subscribed.difference_update(req["params"])
+                await ws.send(json.dumps({"result": None, "id": req.get("id")}))
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            pumper.cancel()
+            self._clients.discard(ws)
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--weight-limit", type=int, default=6000)
+    ap.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    ap.add_argument("--ws-port", type=int, default=None, help="also serve combined streams on this port")
+    args = ap.parse_args()
+    fake = FakeBinance(args.host, args.port, args.weight_limit, args.latency)
+    if args.ws_port is not None:
+        streams = FakeStreams(args.host, args.ws_port).start()
+        print(f"Fake Binance streams on {streams.url}")
+    print(f"Fake Binance REST on {fake.url} (Ctrl+C to stop)")
+    try:
+        fake.httpd.serve_forever()
+    except KeyboardInterrupt:
+        fake.stop()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""Memoized feature graph: every indicator/feature is a node keyed by (data version, params).
+
+generate_signals, the backtest, the Streamlit app and the live model checks all
+ask the same process-wide graph, so one data update computes
+RSI/EMA/ATR/MACD/features once no matter how many consumers read them.
+
+The data version is a fingerprint of the OHLCV frame: length, first/last open time
+and a content hash of every OHLCV value, so an appended or revised last candle, a
+backfill spliced into the middle or a corrected old bar all make a new version;
+enriched frames share the version of the raw frame they came from. Results are
+shared, not copied: treat them as read-only.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from config import settings
+from indicators import add_rsi, add_ema, add_atr, add_macd, fib_levels as _fib_levels
+from features import FeatureBuffer
+
+OHLCV = ["open", "high", "low", "close", "volume"]
+INDICATOR_COLS = ["rsi", "ema50", "ema200", "atr", "macd", "macd_signal", "macd_hist"]
+
+def data_version(df: pd.DataFrame) -> tuple:
+    if len(df) == 0:
+        return (0,)
+    h = hashlib.sha1()
+    h.update(np.ascontiguousarray(df.index.asi8 if isinstance(df.index, pd.DatetimeIndex)
+                                  else np.arange(len(df))).tobytes())
+    for c in OHLCV:
+        if c in df.columns:
+            h.update(np.ascontiguousarray(df[c].to_numpy(dtype=float)).tobytes())
+    return (len(df), df.index[0], df.index[-1], h.hexdigest())
+
+class FeatureGraph:
+    _nodes = {}
+
+    def __init__(self, max_entries: int = None):
+        self.max_entries = max_entries or settings.feature_cache
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def node(cls, name: str):
+        def register(fn):
+            cls._nodes[name] = fn
+            return fn
+        return register
+
+    def get(self, name: str, df: pd.DataFrame, **params):
+        key = (data_version(df), name, tuple(sorted(params.items())))
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return self._cache[key]
+            self.misses += 1
+        # computed outside the lock: nodes call other nodes
+        value = self._nodes[name](self, df, **params)
+        with self._lock:
+            self._cache[key] = value
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._cache), "hits": self.hits, "misses": self.misses}
+
+# ---------- nodes ----------
+@FeatureGraph.node("rsi")
+def _rsi(g, df, length):
+    return add_rsi(df[["close"]], length)["rsi"]
+
+@FeatureGraph.node("ema")
+def _ema(g, df, span):
+    return add_ema(df[["close"]], spans=(span,))[f"ema{span}"]
+
+@FeatureGraph.node("atr")
+def _atr(g, df, length):
+    return add_atr(df[["high", "low", "close"]], length)["atr"]
+
+@FeatureGraph.node("macd")
+def _macd(g, df, fast, slow, signal):
+    return add_macd(df[["close"]], fast=fast, slow=slow, signal=signal)[["macd", "macd_signal", "macd_hist"]]
+
+@FeatureGraph.node("indicators")
+def _indicators(g, df, rsi_len):
+    out = df[[c for c in OHLCV if c in df.columns]].copy()
+    out["rsi"] = g.get("rsi", df, length=rsi_len)
+    out["ema50"] = g.get("ema", df, span=50)
+    out["ema200"] = g.get("ema", df, span=200)
+    out["atr"] = g.get("atr", df, length=14)
+    macd = g.get("macd", df, fast=12, slow=26, signal=9)
+    for c in macd.columns:
+        out[c] = macd[c]
+    return out
+
+@FeatureGraph.node("block")
+def _block(g, df, rsi_len, lookback, prox_pct):
+    # a fresh buffer per version: cached views must never be overwritten
+    return FeatureBuffer(len(df)).compute(df, rsi_len=rsi_len, lookback=lookback, prox_pct=prox_pct)
+
+@FeatureGraph.node("fib")
+def _fib(g, df, lookback):
+    return _fib_levels(df, lookback)
+
+graph = FeatureGraph()
+
+# ---------- shortcuts on the process-wide graph ----------
+def indicators(df: pd.DataFrame, rsi_len: int = 14) -> pd.DataFrame:
+    return graph.get("indicators", df, rsi_len=rsi_len)
+
+def block(df: pd.DataFrame, rsi_len: int = 14, lookback: int = 200, prox_pct: float = 0.25) -> FeatureBuffer:
+    """OHLCV + indicators + features in one float block (see features.FeatureBuffer)."""
+    return graph.get("block", df, rsi_len=rsi_len, lookback=lookback, prox_pct=prox_pct)
+
+def features(df: pd.DataFrame, rsi_len: int = 14, lookback: int = 200, prox_pct: float = 0.25):
+    """Same (feat_df, feature_cols) as features.make_features, computed once per data version,
+    returned as a view over the shared block."""
+    return block(df, rsi_len, lookback, prox_pct).features()
+
+def fib_levels(df: pd.DataFrame, lookback: int = 200) -> dict:
+    return graph.get("fib", df, lookback=lookback)
@@ -0,0 +1,205 @@
+"""Persistent registry of fitted probability models.
+
+One entry per (symbol, interval, feature set, feature params). Fitted models are
+saved under MODEL_DIR and reloaded at startup, so generate_signals / run_live /
+run_chart / the Streamlit app all score from the same model instead of refitting
+CalibratedClassifierCV on every call. A model is retrained only when it is older
+than MODEL_MAX_AGE_HOURS or the recent features drift away from the training
+distribution (mean shift of more than MODEL_DRIFT training std devs).
+
+After start_background() refits run in a worker process on a snapshot of the
+features: get() keeps returning the current model and the new one is swapped in
+atomically when the worker finishes. metrics() reports model age and fit time.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from config import settings
+from model import fit_prob_model
+
+DRIFT_WINDOW = 200  # most recent rows compared with the training stats
+
+class ModelEntry:
+    def __init__(self, model, feats, meta: dict):
+        self.model = model
+        self.feats = list(feats)
+        self.meta = meta
+
+    @property
+    def age_s(self) -> float:
+        return time.time() - self.meta["trained_at"]
+
+def feature_stats(feat_df: pd.DataFrame, feats) -> dict:
+    """Reference for the drift check: mean of the most recent rows, scaled by the
+    std of the whole training set (so a fresh fit never looks drifted)."""
+    X = feat_df[feats].to_numpy(dtype=float)
+    return {"mean": np.nanmean(X[-DRIFT_WINDOW:], axis=0).tolist(), "std": np.nanstd(X, axis=0).tolist()}
+
+def _fit_snapshot(snapshot: pd.DataFrame, feats, C: float):
+    """Runs in the training worker process."""
+    t0 = time.perf_counter()
+    model = fit_prob_model(snapshot, feats, C=C)
+    return model, time.perf_counter() - t0
+
+def _make_entry(model, fit_s: float, snapshot: pd.DataFrame, feats, C: float) -> ModelEntry:
+    meta = {"trained_at": time.time(), "fit_s": fit_s, "rows": len(snapshot),
+            "last_index": str(snapshot.index[-1]) if len(snapshot) else None,
+            "stats": feature_stats(snapshot, feats), "C": C}
+    return ModelEntry(model, feats, meta)
+
+class ModelRegistry:
+    def __init__(self, root: str = None, max_age_h: float = None, drift: float = None):
+        self.root = Path(root or settings.model_dir)
+        self.max_age_s = 3600.0 * (settings.model_max_age_h if max_age_h is None else max_age_h)
+        self.drift = settings.model_drift if drift is None else drift
+        self._entries = {}
+        self._pending = {}  # key -> reason, while a background fit is running
+        self._trainer = None
+        self._lock = threading.Lock()
+
+    # ---------- background training ----------
+    def start_background(self, workers: int = 1):
+        """Refit in worker processes from now on; get() never blocks on a fit."""
+        if self._trainer is None:
+            self._trainer = ProcessPoolExecutor(max_workers=workers)
+        return self
+
+    def shutdown(self, wait: bool = False):
+        """Drops queued refits; wait=True also blocks until a running one has been saved."""
+        if self._trainer is not None:
+            self._trainer.shutdown(wait=wait, cancel_futures=True)
+            self._trainer = None
+
+    def _submit(self, key: str, feat_df: pd.DataFrame, feats, C: float, reason: str):
+        with self._lock:
+            if key in self._pending:
+                return
+            self._pending[key] = reason
+        # a private copy: the live block keeps changing while the worker fits
+        snapshot = feat_df[list(feats) + ["y"]].copy()
+        fut = self._trainer.submit(_fit_snapshot, snapshot, list(feats), C)
+        fut.add_done_callback(lambda f: self._swap(key, f, snapshot, feats, C))
+
+    def _swap(self, key: str, fut, snapshot, feats, C):
+        try:
+            if fut.cancelled():  # dropped by shutdown()
+                return
+            model, fit_s = fut.result()
+            self.save(key, _make_entry(model, fit_s, snapshot, feats, C))
+            print(f"[registry] swapped in {key} (fit {fit_s:.2f}s, {len(snapshot)} rows)")
+        except Exception as e:
+            print(f"[registry] background fit of {key} failed: {e}")
+        finally:
+            with self._lock:
+                self._pending.pop(key, None)
+
+    def metrics(self) -> dict:
+        """{key: {age_s, fit_s, rows, retraining}} for every model loaded in this process."""
+        with self._lock:
+            return {key: {"age_s": e.age_s, "fit_s": e.meta["fit_s"], "rows": e.meta["rows"],
+                          "retraining": self._pending.get(key)}
+                    for key, e in self._entries.items()}
+
+    # ---------- keys / files ----------
+    @staticmethod
+    def key(symbol: str, interval: str, feats, params: dict) -> str:
+        spec = json.dumps({"symbol": symbol.upper(), "interval": interval, "feats": list(feats),
+                           "params": params, "testnet": settings.testnet}, sort_keys=True)
+        return f"{symbol.upper()}_{interval}_{hashlib.sha1(spec.encode()).hexdigest()[:12]}"
+
+    def _path(self, key: str) -> Path:
+        return self.root / f"{key}.joblib"
+
+    def load(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is not None:
+            return entry
+        path = self._path(key)
+        if not path.exists():
+            return None
+        try:
+            blob = joblib.load(path)
+        except Exception as e:
+            print(f"[registry] cannot load {path.name}: {e}")
+            return None
+        entry = ModelEntry(blob["model"], blob["feats"], blob["meta"])
+        with self._lock:
+            self._entries.setdefault(key, entry)
+            return self._entries[key]
+
+    def save(self, key: str, entry: ModelEntry):
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp = self._path(key).with_suffix(".tmp")
+        joblib.dump({"model": entry.model, "feats": entry.feats, "meta": entry.meta}, tmp)
+        os.replace(tmp, self._path(key))
+        with self._lock:
+            self._entries[key] = entry
+
+    # ---------- policy ----------
+    def retrain_reason(self, entry, feat_df: pd.DataFrame):
+        """None if the entry is fine for this data, else 'missing' / 'age' / 'drift'."""
+        if entry is None:
+            return "missing"
+        if self.max_age_s and entry.age_s > self.max_age_s:
+            return "age"
+        if self.drift and len(feat_df):
+            recent = feature_stats(feat_df.tail(DRIFT_WINDOW), entry.feats)["mean"]
+            mean = np.asarray(entry.meta["stats"]["mean"])
+            std = np.asarray(entry.meta["stats"]["std"])
+            shift = np.abs(np.asarray(recent) - mean) / np.where(std > 0, std, np.inf)
+            if np.nanmax(shift) > self.drift:
+                return "drift"
+        return None
+
+    def fit(self, key: str, feat_df: pd.DataFrame, feats, C: float = 1.0) -> ModelEntry:
+        model, fit_s = _fit_snapshot(feat_df, feats, C)
+        entry = _make_entry(model, fit_s, feat_df, feats, C)
+        self.save(key, entry)
+        return entry
+
+    def get(self, feat_df: pd.DataFrame, feats, symbol: str = None, interval: str = None,
+            params: dict = None, C: float = 1.0) -> ModelEntry:
+        """The registered model for this feature set; fitted/refitted only when needed.
+        In background mode the current entry is returned while a refit runs, and None
+        until the very first model for the key exists."""
+        key = self.key(symbol or settings.symbol, interval or settings.interval, feats, params or {})
+        entry = self.load(key)
+        reason = self.retrain_reason(entry, feat_df)
+        if reason is None:
+            return entry
+        if self._trainer is not None:
+            self._submit(key, feat_df, feats, C, reason)
+            return entry
+        print(f"[registry] fitting {key} ({reason}, {len(feat_df)} rows)")
+        return self.fit(key, feat_df, feats, C=C)
+
+registry = ModelRegistry()
+
+def _params(rsi_len: int = None, lookback: int = None, prox_pct: float = None) -> dict:
+    return {"rsi_len": rsi_len or settings.rsi_len,
+            "lookback": lookback or settings.fib_lookback,
+            "prox_pct": prox_pct if prox_pct is not None else settings.prox_pct}
+
+def get_model(feat_df: pd.DataFrame, feats, symbol: str = None, interval: str = None,
+              rsi_len: int = None, lookback: int = None, prox_pct: float = None):
+    """Shortcut on the process-wide registry; params default to settings.
+    None only while the first background fit for this key is still running."""
+    entry = registry.get(feat_df, feats, symbol, interval, _params(rsi_len, lookback, prox_pct))
+    return entry.model if entry is not None else None
+
+def model_key(feats, symbol: str = None, interval: str = None,
+              rsi_len: int = None, lookback: int = None, prox_pct: float = None) -> str:
+    """The key get_model() uses, for readers that only look the current entry up
+    (registry.load) without handing in a feature frame."""
+    return registry.key(symbol or settings.symbol, interval or settings.interval, feats,
+                        _params(rsi_len, lookback, prox_pct))
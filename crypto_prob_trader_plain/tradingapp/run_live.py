@@ -1,22 +1,25 @@
 import time
 from math import isclose
+import numpy as np
 import pandas as pd
 
 from config import settings
-from datafeed import get_klines
+import clientpool
+from datafeed import KlineWindow
+from barstream import BarStream
 from strategy import generate_signals
 from execute import place_order
-from features import make_features
-from model import fit_prob_model, add_probabilities
+from extrema import FIB_RATIOS
+import featgraph
+from registry import get_model, model_key, registry
 
 MAX_SL_PCT = 0.10
 MAX_TP_PCT = 0.20
 LEVERAGE   = 13
+MODEL_CHECK_BARS = 50  # ws mode: closed bars between registry age/drift checks on the full window
 
 last_signal_time = None
 prev_lvls = None
-_model = None
-_feats = None
 
 def lvls_changed(old, new, tol=0.01):
     if old is None:
@@ -36,18 +39,56 @@ def nearest_fib(price: float, lvls: dict):
             best_name, best_val, best_pct = name, lvl, pct
     return best_name, best_val, best_pct
 
-def ensure_probabilities(df: pd.DataFrame):
-    global _model, _feats
-    feat_df, feats = make_features(
-        df, rsi_len=settings.rsi_len,
-        lookback=settings.fib_lookback,
-        prox_pct=settings.prox_pct
-    )
-    if _model is None or _feats != feats:
-        _model = fit_prob_model(feat_df, feats)
-        _feats = feats
-    out = add_probabilities(_model, feat_df, feats, thr=settings.threshold)
-    return out
+def last_bar(df: pd.DataFrame) -> dict:
+    """Το τελευταίο κερί ενός df από generate_signals, στη μορφή του BarStream.latest()."""
+    last_row, prev_row = df.iloc[-1], df.iloc[-2]
+    bar = {c: float(last_row.get(c, float("nan")))
+           for c in ("close", "rsi", "ema50", "ema200", "atr", "macd", "macd_signal", "prob_up")}
+    bar["time"] = df.index[-1]
+    bar["ema_cross_up"] = float((last_row["ema50"] > last_row["ema200"]) and (prev_row["ema50"] <= prev_row["ema200"]))
+    return bar
+
+def buy_rules(bar: dict, near_pct: float, p_up: float) -> tuple:
+    """(all_ok_buy, decision) για ένα κερί από last_bar() ή BarStream.latest()."""
+    golden_cross = bool(bar["ema_cross_up"])
+    rsi_ok  = float(bar["rsi"]) < 60
+    prox_ok = near_pct <= float(settings.prox_pct)
+    macd_ok = float(bar["macd"]) > float(bar["macd_signal"])
+
+    all_ok_buy = golden_cross and rsi_ok and prox_ok and macd_ok
+    decision = all_ok_buy and (p_up > settings.threshold)
+    return all_ok_buy, decision
+
+class StreamScorer:
+    """ws mode: last-bar state from the BarStream's O(1) indicator/feature states and one
+    predict_proba row. The full feature block is built only to seed the model and, every
+    MODEL_CHECK_BARS closed bars or after a resync, for the registry's age/drift check;
+    background refits are picked up by key on the next bar."""
+
+    def __init__(self, bars: BarStream):
+        self.bars = bars
+        self.key = None
+        self.bars_seen = 0
+
+    def check_model(self):
+        feat_df, feats = featgraph.features(self.bars.window.df, settings.rsi_len,
+                                            settings.fib_lookback, settings.prox_pct)
+        get_model(feat_df, feats)  # fits, or schedules a background refit, when due
+        self.key = model_key(feats)
+        self.bars_seen = 0
+
+    def on_closed(self, n: int):
+        self.bars_seen += n
+        if self.bars_seen >= MODEL_CHECK_BARS:
+            self.check_model()
+
+    def state(self) -> tuple:
+        bar = self.bars.latest()
+        entry = registry.load(self.key)
+        x = np.array([[bar[f] for f in entry.feats]]) if entry is not None else None
+        bar["prob_up"] = (float(entry.model.predict_proba(x)[0, 1])
+                          if x is not None and np.isfinite(x).all() else float("nan"))
+        return bar, {k: bar[k] for k in FIB_RATIOS}
 
 def interval_to_timedelta(interval_str: str) -> pd.Timedelta:
     """Μετατρέπει '1m','5m','1h','4h','1d' σε Timedelta."""
@@ -61,120 +102,167 @@ def interval_to_timedelta(interval_str: str) -> pd.Timedelta:
         return pd.Timedelta(days=n)
     raise ValueError(f"Unsupported interval {interval_str}")
 
-def main():
+def evaluate(window: KlineWindow, received: float = None, scorer: StreamScorer = None):
+    """Σήματα + απόφαση για το τελευταίο κερί. Με scorer (ws mode) οι τιμές έρχονται από
+    τις O(1) καταστάσεις του BarStream· χωρίς (poll mode) από generate_signals πάνω στο
+    παράθυρο. received: perf_counter της λήψης του κλεισίματος από το websocket, για να
+    μετρηθεί η καθυστέρηση κλείσιμο → απόφαση."""
     global last_signal_time, prev_lvls
-    print(f"Running live (poll={settings.poll_seconds}s) on {settings.symbol} {settings.interval}")
+    if scorer is not None:
+        bar, lvls = scorer.state()
+    else:
+        df, lvls = generate_signals(window.df, settings.rsi_len, settings.fib_lookback, settings.prox_pct)
+        bar = last_bar(df)
+    p_up = bar["prob_up"]
+
+    ts_open  = bar["time"]                    # open time του κεριού (UTC)
+    price    = bar["close"]
+    rsi      = bar["rsi"]
+    ema50    = bar["ema50"]
+    ema200   = bar["ema200"]
+    atr      = bar["atr"]
+    macd     = bar["macd"]
+    macd_sig = bar["macd_signal"]
+
+    # ---- Ώρα τώρα & αντίστροφη μέτρηση μέχρι κλείσιμο κεριού ----
+    now_utc = pd.Timestamp.now(tz="UTC")
+    bar_close = ts_open + interval_to_timedelta(settings.interval)
+
+    # Βεβαιώσου ότι το bar_close είναι tz-aware UTC
+    if not isinstance(bar_close, pd.Timestamp):
+        bar_close = pd.to_datetime(bar_close, utc=True)
+    elif bar_close.tzinfo is None:
+        bar_close = bar_close.tz_localize("UTC")
+
+    eta = max(pd.Timedelta(0), bar_close - now_utc)
+    print(f"[now={now_utc:%Y-%m-%d %H:%M:%S}Z] bar_open={ts_open} | bar_close={bar_close} | ETA={eta}")
+    kl = clientpool.stats.snapshot().get("/api/v3/klines")
+    if kl:
+        print(f"REST klines: last={kl['last_s']*1000:.0f}ms mean={kl['mean_s']*1000:.0f}ms "
+              f"n={kl['count']} err={kl['errors']} | rows={window.last_fetched}")
+    models = registry.metrics()
+    for key, m in models.items():
+        print(f"Model {key}: age={m['age_s']/3600:.1f}h fit={m['fit_s']:.2f}s rows={m['rows']}"
+              + (f" | retraining ({m['retraining']})" if m["retraining"] else ""))
+    if not models:
+        print("Model: first fit running in background")
+
+    # ---- Εμφάνιση επιπέδων/δεικτών ----
+    if lvls_changed(prev_lvls, lvls):
+        print("\n--- Fibonacci Levels ---")
+        for level, lvl_price in lvls.items():
+            print(f"{level}: {lvl_price:.2f}")
+        prev_lvls = lvls
+
+    print(f"RSI: {rsi:.2f} | EMA50: {ema50:.2f} | EMA200: {ema200:.2f} | ATR: {atr:.2f}")
+    print(f"MACD: {macd:.2f} | Signal: {macd_sig:.2f} | Price: {price:.2f} | Prob(up): {p_up:.2f}")
+
+    near_name, near_val, near_pct = nearest_fib(price, lvls)
+    print(f"Nearest Fib: {near_name} @ {near_val:.2f} (dist {near_pct:.2f}%)")
+
+    # ---- Κανόνες ----
+    all_ok_buy, decision = buy_rules(bar, near_pct, p_up)
+
+    # Χρησιμοποιούμε το open timestamp για να μην ξαναπάρουμε διπλό σήμα στο ίδιο κερί
+    if decision and last_signal_time != ts_open:
+        recent_low = float(window.df["low"].iloc[-20:].min())
+
+        sl_candidates = []
+        if atr == atr:
+            sl_candidates.append(price - 1.5 * atr)
+        sl_candidates.append(recent_low)
+        sl_candidates.append(near_val * (1 - float(settings.prox_pct) / 100.0))
+
+        max_sl_price = price * (1 - MAX_SL_PCT)
+        stop_loss = max(max_sl_price, min(sl_candidates))
+
+        higher_fibs = [v for v in lvls.values() if v > price]
+        if higher_fibs:
+            tp1 = min(higher_fibs)
+        elif atr == atr:
+            tp1 = price + 1.5 * atr
+        else:
+            tp1 = price * 1.01
+        max_tp_price = price * (1 + MAX_TP_PCT)
+        tp1 = min(tp1, max_tp_price)
+
+        risk = max(1e-6, price - stop_loss)
+        tp2 = min(price + 2.0 * risk, max_tp_price)
+
+        sl_pct  = (price - stop_loss) / price * 100.0
+        tp1_pct = (tp1 / price - 1) * 100.0
+        tp2_pct = (tp2 / price - 1) * 100.0
+
+        sl_lev  = sl_pct  * LEVERAGE
+        tp1_lev = tp1_pct * LEVERAGE
+        tp2_lev = tp2_pct * LEVERAGE
+
+        print(f"[{ts_open}] ✅ BUY @ {price:.2f}  |  x{LEVERAGE} lev | P(up)={p_up:.2f}")
+        print(f"   SL:  {stop_loss:.2f}  ({sl_pct:.2f}%  | lev≈{sl_lev:.1f}%)")
+        print(f"   TP1: {tp1:.2f}  ({tp1_pct:.2f}% | lev≈{tp1_lev:.1f}%)")
+        print(f"   TP2: {tp2:.2f}  ({tp2_pct:.2f}% | lev≈{tp2_lev:.1f}%)")
+
+        place_order("BUY", settings.symbol, settings.order_size_usdt)
+        last_signal_time = ts_open
+    else:
+        reasons = []
+        if not all_ok_buy: reasons.append("rule-fail")
+        if not (p_up > settings.threshold): reasons.append("prob<thr")
+        print(f"[{ts_open}] No signal ({', '.join(reasons)})")
+    if received is not None:
+        print(f"bar-close→decision: {(time.perf_counter() - received) * 1000:.1f}ms")
+
+def run_poll(window: KlineWindow):
     while True:
         try:
-            # df.index = open_time (UTC) και έχουμε στήλη close_time από το datafeed
-            df = get_klines(settings.symbol, settings.interval, settings.limit)
-            df, lvls = generate_signals(df, settings.rsi_len, settings.fib_lookback, settings.prox_pct)
-
-            # Προβλέψεις πιθανοτήτων
-            prob_df = ensure_probabilities(df)
-            p_up = float(prob_df["prob_up"].iloc[-1])
-
-            last_row = df.iloc[-1]
-            prev_row = df.iloc[-2]
-            ts_open  = df.index[-1]                   # open time του κεριού (UTC)
-            price    = float(last_row["close"])
-            rsi      = float(last_row.get("rsi", float("nan")))
-            ema50    = float(last_row.get("ema50", float("nan")))
-            ema200   = float(last_row.get("ema200", float("nan")))
-            atr      = float(last_row.get("atr", float("nan")))
-            macd     = float(last_row.get("macd", float("nan")))
-            macd_sig = float(last_row.get("macd_signal", float("nan")))
-
-            # ---- Ώρα τώρα & αντίστροφη μέτρηση μέχρι κλείσιμο κεριού ----
-            now_utc = pd.Timestamp.now(tz="UTC")
-
-            if "close_time" in df.columns:
-                bar_close = last_row["close_time"]
-            else:
-                bar_close = ts_open + interval_to_timedelta(settings.interval)
-
-            # Βεβαιώσου ότι το bar_close είναι tz-aware UTC
-            if not isinstance(bar_close, pd.Timestamp):
-                bar_close = pd.to_datetime(bar_close, utc=True)
-            elif bar_close.tzinfo is None:
-                bar_close = bar_close.tz_localize("UTC")
-
-            eta = max(pd.Timedelta(0), bar_close - now_utc)
-            print(f"[now={now_utc:%Y-%m-%d %H:%M:%S}Z] bar_open={ts_open} | bar_close={bar_close} | ETA={eta}")
-
-            # ---- Εμφάνιση επιπέδων/δεικτών ----
-            if lvls_changed(prev_lvls, lvls):
-                print("\n--- Fibonacci Levels ---")
-                for level, lvl_price in lvls.items():
-                    print(f"{level}: {lvl_price:.2f}")
-                prev_lvls = lvls
-
-            print(f"RSI: {rsi:.2f} | EMA50: {ema50:.2f} | EMA200: {ema200:.2f} | ATR: {atr:.2f}")
-            print(f"MACD: {macd:.2f} | Signal: {macd_sig:.2f} | Price: {price:.2f} | Prob(up): {p_up:.2f}")
-
-            near_name, near_val, near_pct = nearest_fib(price, lvls)
-            print(f"Nearest Fib: {near_name} @ {near_val:.2f} (dist {near_pct:.2f}%)")
-
-            # ---- Κανόνες ----
-            golden_cross = (last_row["ema50"] > last_row["ema200"]) and (prev_row["ema50"] <= prev_row["ema200"])
-            rsi_ok  = rsi < 60
-            prox_ok = near_pct <= float(settings.prox_pct)
-            macd_ok = macd > macd_sig
-
-            all_ok_buy = golden_cross and rsi_ok and prox_ok and macd_ok
-            decision = all_ok_buy and (p_up > settings.threshold)
-
-            # Χρησιμοποιούμε το open timestamp για να μην ξαναπάρουμε διπλό σήμα στο ίδιο κερί
-            if decision and last_signal_time != ts_open:
-                recent_low = float(df["low"].tail(20).min())
-
-                sl_candidates = []
-                if atr == atr:
-                    sl_candidates.append(price - 1.5 * atr)
-                sl_candidates.append(recent_low)
-                sl_candidates.append(near_val * (1 - float(settings.prox_pct) / 100.0))
-
-                max_sl_price = price * (1 - MAX_SL_PCT)
-                stop_loss = max(max_sl_price, min(sl_candidates))
-
-                higher_fibs = [v for v in lvls.values() if v > price]
-                if higher_fibs:
-                    tp1 = min(higher_fibs)
-                elif atr == atr:
-                    tp1 = price + 1.5 * atr
-                else:
-                    tp1 = price * 1.01
-                max_tp_price = price * (1 + MAX_TP_PCT)
-                tp1 = min(tp1, max_tp_price)
-
-                risk = max(1e-6, price - stop_loss)
-                tp2 = min(price + 2.0 * risk, max_tp_price)
-
-                sl_pct  = (price - stop_loss) / price * 100.0
-                tp1_pct = (tp1 / price - 1) * 100.0
-                tp2_pct = (tp2 / price - 1) * 100.0
-
-                sl_lev  = sl_pct  * LEVERAGE
-                tp1_lev = tp1_pct * LEVERAGE
-                tp2_lev = tp2_pct * LEVERAGE
-
-                print(f"[{ts_open}] ✅ BUY @ {price:.2f}  |  x{LEVERAGE} lev | P(up)={p_up:.2f}")
-                print(f"   SL:  {stop_loss:.2f}  ({sl_pct:.2f}%  | lev≈{sl_lev:.1f}%)")
-                print(f"   TP1: {tp1:.2f}  ({tp1_pct:.2f}% | lev≈{tp1_lev:.1f}%)")
-                print(f"   TP2: {tp2:.2f}  ({tp2_pct:.2f}% | lev≈{tp2_lev:.1f}%)")
-
-                place_order("BUY", settings.symbol, settings.order_size_usdt)
-                last_signal_time = ts_open
-            else:
-                reasons = []
-                if not all_ok_buy: reasons.append("rule-fail")
-                if not (p_up > settings.threshold): reasons.append("prob<thr")
-                print(f"[{ts_open}] No signal ({', '.join(reasons)})")
-
+            # μετά την πρώτη φόρτωση ζητάμε μόνο τα νέα κεριά
+            window.refresh()
+            evaluate(window)
         except Exception as e:
             print("Error:", e)
-
         time.sleep(settings.poll_seconds)
 
+def run_stream(window: KlineWindow):
+    """Event-driven: κάθε κερί από το kline websocket μπαίνει στο παράθυρο και η απόφαση
+    τρέχει μόλις κλείσει. Το REST μένει μόνο για gap-fill (χαμένα κεριά, reconnect ή
+    σιωπηλό socket), με batched backfill πριν ενημερωθούν οι δείκτες (βλ. barstream).
+    Δείκτες, features και fib προχωρούν O(1) ανά κερί (StreamScorer)· generate_signals
+    δεν τρέχει καθόλου εδώ."""
+    bars = BarStream(window=window).start()
+    scorer = StreamScorer(bars)
+    scorer.check_model()
+    try:
+        while True:
+            try:
+                backfills = bars.backfills
+                closed = bars.poll(timeout=settings.poll_seconds)
+                if bars.backfills != backfills:
+                    scorer.check_model()  # a reconnect/gap backfill spliced older bars in
+                if closed:
+                    scorer.on_closed(len(closed))
+                    evaluate(window, closed[-1]["received"], scorer)
+                elif bars.idle_s >= settings.poll_seconds:
+                    print("[ws] no klines for a poll period → REST gap-fill")
+                    bars.resync("silent socket")
+                    scorer.check_model()
+                    evaluate(window, scorer=scorer)
+                elif settings.ws_eval_updates and bars.live is not None:
+                    evaluate(window, scorer=scorer)
+            except Exception as e:
+                print("Error:", e)
+    finally:
+        bars.stop()
+
+def main():
+    mode = settings.live_mode
+    print(f"Running live ({mode}, poll={settings.poll_seconds}s) on {settings.symbol} {settings.interval}")
+    window = KlineWindow(settings.symbol, settings.interval, settings.limit)
+    # refits run in a worker process; the loop keeps scoring with the current model
+    registry.start_background()
+    if mode == "ws":
+        run_stream(window)
+    else:
+        run_poll(window)
+
 if __name__ == "__main__":
     main()
@@ -1,62 +1,67 @@
+import numpy as np
 import pandas as pd
-from indicators import add_rsi, add_ema, add_atr, add_macd, fib_levels, near_any_fib
-from features import make_features
-from model import fit_prob_model, add_probabilities
+import featgraph
+from model import add_probabilities
+from registry import get_model
 from config import settings
 
+def signal_masks(df: pd.DataFrame, lvls: dict, prox_pct=0.25, prob_thr=None):
+    """Vectorized BUY/SELL masks over an enriched frame (ema/rsi/macd/prob_up).
+    NaN inputs compare False, exactly like the per-row rules did.
+    """
+    thr = prob_thr or settings.threshold
+    close = df["close"].to_numpy(dtype=float)
+    ema50 = df["ema50"].to_numpy(dtype=float)
+    ema200 = df["ema200"].to_numpy(dtype=float)
+    rsi = df["rsi"].to_numpy(dtype=float)
+    prob_up = (df["prob_up"].to_numpy(dtype=float) if "prob_up" in df.columns
+               else np.full(len(df), 0.5))
+
+    above = ema50 > ema200
+    below = ema50 < ema200
+    golden_cross = np.zeros(len(df), dtype=bool)
+    death_cross = np.zeros(len(df), dtype=bool)
+    golden_cross[1:] = above[1:] & (ema50[:-1] <= ema200[:-1])
+    death_cross[1:] = below[1:] & (ema50[:-1] >= ema200[:-1])
+
+    levels = np.array([float(v) for v in lvls.values()])
+    near = (np.abs(close[:, None] - levels) / levels * 100.0 <= prox_pct).any(axis=1)
+    macd_ok = df["macd"].to_numpy(dtype=float) > df["macd_signal"].to_numpy(dtype=float)
+
+    buy = golden_cross & (rsi < 50) & near & macd_ok & (prob_up > thr)
+    sell = ~buy & death_cross & (rsi > 70) & near & ~macd_ok & (prob_up < (1 - thr))
+    return buy, sell
+
+def signal_column(df: pd.DataFrame, lvls: dict, prox_pct=0.25, prob_thr=None) -> np.ndarray:
+    buy, sell = signal_masks(df, lvls, prox_pct, prob_thr)
+    return np.where(buy, "BUY", np.where(sell, "SELL", "")).astype(object)
+
 # Conservative strategy
 def generate_signals(df: pd.DataFrame,
                      rsi_len=14,
                      lookback=200,
                      prox_pct=0.25,
-                     prob_thr=None):
+                     prob_thr=None,
+                     symbol=None,
+                     interval=None):
 
-    # --- Indicators ---
-    df = add_rsi(df, rsi_len).copy()
-    df = add_ema(df, spans=(50, 200))
-    df = add_atr(df, length=14)
-    df = add_macd(df, fast=12, slow=26, signal=9)
+    # --- Indicators + features: one memoized block per data version ---
+    blk = featgraph.block(df, rsi_len, lookback, prox_pct)
+    df = pd.concat([df, blk.frame(valid_only=False)[featgraph.INDICATOR_COLS]], axis=1)
 
     # --- Fibonacci ---
-    lvls = fib_levels(df, lookback)
+    lvls = featgraph.fib_levels(df, lookback)
 
     # --- Probabilities ---
-    feat_df, feats = make_features(df, rsi_len=rsi_len,
-                                   lookback=lookback,
-                                   prox_pct=prox_pct)
-    model = fit_prob_model(feat_df, feats)
-    prob_df = add_probabilities(model, feat_df, feats,
-                                thr=prob_thr or settings.threshold)
-    df["prob_up"] = prob_df["prob_up"]
-
-    signals = []
-    for i in range(len(df)):
-        row = df.iloc[i]
-        s = ""
-        price = row["close"]
-
-        if i > 0:
-            prev = df.iloc[i - 1]
-            golden_cross = (row["ema50"] > row["ema200"]) and (prev["ema50"] <= prev["ema200"])
-            death_cross  = (row["ema50"] < row["ema200"]) and (prev["ema50"] >= prev["ema200"])
-        else:
-            golden_cross = death_cross = False
-
-        # --- Filters ---
-        rsi = row.get("rsi")
-        near = near_any_fib(price, lvls, prox_pct)
-        macd_ok = row["macd"] > row["macd_signal"]
-        prob_up = row.get("prob_up", 0.5)
-
-        # --- BUY rules ---
-        if golden_cross and rsi < 50 and near and macd_ok and prob_up > (prob_thr or settings.threshold):
-            s = "BUY"
-
-        # --- SELL rules ---
-        elif death_cross and rsi > 70 and near and not macd_ok and prob_up < (1 - (prob_thr or settings.threshold)):
-            s = "SELL"
-
-        signals.append(s)
-
-    df["signal"] = signals
+    feat_df, feats = blk.features()
+    model = get_model(feat_df, feats, symbol, interval, rsi_len, lookback, prox_pct)
+    if model is None:  # first model still training in the background
+        df["prob_up"] = np.nan
+    else:
+        prob_df = add_probabilities(model, feat_df, feats,
+                                    thr=prob_thr or settings.threshold)
+        df["prob_up"] = prob_df["prob_up"]
+
+    # --- BUY / SELL rules (one vectorized pass) ---
+    df["signal"] = signal_column(df, lvls, prox_pct, prob_thr)
     return df, lvls
@@ -0,0 +1,272 @@
+"""Stateful O(1)-per-bar versions of indicators.add_rsi / add_ema / add_atr / add_macd.
+
+Each state is seeded from history once, then advanced bar by bar:
+
+    st = RSIState(14).seed(df)
+    st.update(bar, final=False)   # in-progress candle: value only, state untouched
+    st.update(bar, final=False)   # ...revised again on the next tick
+    st.update(bar)                # candle closed: committed
+
+`bar` is anything with close (and high/low for ATR) keys: a dict, a Series or a
+DataFrame row. Values match the batch pandas functions to floating tolerance.
+FeatureState does the same for the model features of features.build_features
+and the rolling Fibonacci levels, on top of the IndicatorSet values.
+"""
+import math
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from indicators import add_rsi, add_ema, add_atr, add_macd
+from extrema import FIB_RATIOS, MonotonicWindow
+from features import FEATURE_COLS
+
+NAN = float("nan")
+
+class EMAState:
+    """close.ewm(span, adjust=False).mean()"""
+
+    def __init__(self, span: int):
+        self.span = span
+        self.alpha = 2.0 / (span + 1.0)
+        self.prev = None
+        self.value = NAN
+
+    def seed(self, df: pd.DataFrame):
+        if len(df):
+            self.prev = self.value = float(add_ema(df[["close"]], spans=(self.span,))[f"ema{self.span}"].iloc[-1])
+        return self
+
+    def step(self, x: float) -> float:
+        return x if self.prev is None else self.alpha * x + (1.0 - self.alpha) * self.prev
+
+    def update(self, bar, final: bool = True) -> float:
+        self.value = self.step(float(bar["close"]))
+        if final:
+            self.prev = self.value
+        return self.value
+
+class _RMA:
+    """ewm(alpha=1/length, min_periods=length).mean() with adjust=True, as pandas_ta.rma:
+    num_t = x_t + (1-a)·num_{t-1}, den_t = 1 + (1-a)·den_{t-1}, value = num/den."""
+
+    def __init__(self, length: int):
+        self.length = length
+        self.decay = 1.0 - 1.0 / length
+        self.num = 0.0
+        self.den = 0.0
+        self.count = 0
+
+    def seed_from(self, value: float, count: int):
+        # den after `count` observations is a geometric sum; num follows from the mean
+        self.count = count
+        self.den = (1.0 - self.decay ** count) / (1.0 - self.decay) if count else 0.0
+        self.num = value * self.den if count and value == value else 0.0
+
+    def step(self, x: float):
+        num = x + self.decay * self.num
+        den = 1.0 + self.decay * self.den
+        return num, den, self.count + 1
+
+class RSIState:
+    """indicators.add_rsi (pandas_ta.rsi without TA-Lib)."""
+
+    def __init__(self, length: int = 14):
+        self.length = length
+        self.pos = _RMA(length)
+        self.neg = _RMA(length)
+        self.prev_close = None
+        self.value = NAN
+
+    def seed(self, df: pd.DataFrame):
+        close = df["close"].astype(float)
+        if len(close) == 0:
+            return self
+        diff = close.diff()
+        pos = diff.clip(lower=0).ewm(alpha=1.0 / self.length, min_periods=self.length).mean()
+        neg = diff.clip(upper=0).ewm(alpha=1.0 / self.length, min_periods=self.length).mean()
+        count = int(diff.notna().sum())
+        # while still warming up the ewm is NaN: rebuild the sums from the raw diffs instead
+        if count < self.length:
+            for d in diff.dropna():
+                self._commit(max(d, 0.0), min(d, 0.0))
+        else:
+            self.pos.seed_from(float(pos.iloc[-1]), count)
+            self.neg.seed_from(float(neg.iloc[-1]), count)
+        self.prev_close = float(close.iloc[-1])
+        self.value = float(add_rsi(df[["close"]], self.length)["rsi"].iloc[-1])
+        return self
+
+    def _commit(self, up: float, down: float):
+        self.pos.num, self.pos.den, self.pos.count = self.pos.step(up)
+        self.neg.num, self.neg.den, self.neg.count = self.neg.step(down)
+
+    def update(self, bar, final: bool = True) -> float:
+        close = float(bar["close"])
+        if self.prev_close is None:
+            if final:
+                self.prev_close = close
+            self.value = NAN
+            return self.value
+        d = close - self.prev_close
+        up, down = max(d, 0.0), min(d, 0.0)
+        pn, pd_, pc = self.pos.step(up)
+        nn, nd, _ = self.neg.step(down)
+        if pc < self.length:
+            self.value = NAN
+        else:
+            pa, na = pn / pd_, abs(nn / nd)
+            self.value = 100.0 * pa / (pa + na) if (pa + na) else NAN
+        if final:
+            self._commit(up, down)
+            self.prev_close = close
+        return self.value
+
+class ATRState:
+    """indicators.add_atr: simple rolling mean of the true range."""
+
+    def __init__(self, length: int = 14):
+        self.length = length
+        self.trs = deque(maxlen=length)
+        self.prev_close = None
+        self.value = NAN
+
+    def seed(self, df: pd.DataFrame):
+        if len(df) == 0:
+            return self
+        high, low, close = df["high"], df["low"], df["close"]
+        prev_close = close.shift(1)
+        tr = pd.concat([(high - low).abs(), (high - prev_close).abs(), (low - prev_close).abs()],
+                       axis=1).max(axis=1)
+        self.trs.extend(float(v) for v in tr.iloc[-self.length:])
+        self.prev_close = float(close.iloc[-1])
+        self.value = float(add_atr(df[["high", "low", "close"]], self.length)["atr"].iloc[-1])
+        return self
+
+    def update(self, bar, final: bool = True) -> float:
+        high, low = float(bar["high"]), float(bar["low"])
+        tr = high - low
+        if self.prev_close is not None:
+            tr = max(abs(tr), abs(high - self.prev_close), abs(low - self.prev_close))
+        window = list(self.trs)[1:] + [tr] if len(self.trs) == self.length else list(self.trs) + [tr]
+        self.value = math.fsum(window) / self.length if len(window) == self.length else NAN
+        if final:
+            self.trs.append(tr)
+            self.prev_close = float(bar["close"])
+        return self.value
+
+class MACDState:
+    """indicators.add_macd: macd, macd_signal, macd_hist."""
+
+    def __init__(self, fast: int = 12, slow: int = 26, signal: int = 9):
+        self.fast, self.slow = EMAState(fast), EMAState(slow)
+        self.signal = EMAState(signal)
+        self.value = (NAN, NAN, NAN)
+
+    def seed(self, df: pd.DataFrame):
+        if len(df) == 0:
+            return self
+        m = add_macd(df[["close"]], fast=self.fast.span, slow=self.slow.span, signal=self.signal.span)
+        self.fast.seed(df)
+        self.slow.seed(df)
+        self.signal.prev = self.signal.value = float(m["macd_signal"].iloc[-1])
+        self.value = tuple(float(m[c].iloc[-1]) for c in ("macd", "macd_signal", "macd_hist"))
+        return self
+
+    def update(self, bar, final: bool = True) -> tuple:
+        macd = self.fast.update(bar, final) - self.slow.update(bar, final)
+        sig = self.signal.update({"close": macd}, final)
+        self.value = (macd, sig, macd - sig)
+        return self.value
+
+class IndicatorSet:
+    """The columns generate_signals / make_features use, advanced together.
+    update() returns {rsi, ema50, ema200, atr, macd, macd_signal, macd_hist}.
+    """
+
+    def __init__(self, rsi_len: int = 14, spans=(50, 200), atr_len: int = 14, macd=(12, 26, 9)):
+        self.rsi = RSIState(rsi_len)
+        self.emas = {s: EMAState(s) for s in spans}
+        self.atr = ATRState(atr_len)
+        self.macd = MACDState(*macd)
+        self.last_time = None
+
+    def seed(self, df: pd.DataFrame):
+        self.rsi.seed(df)
+        for e in self.emas.values():
+            e.seed(df)
+        self.atr.seed(df)
+        self.macd.seed(df)
+        self.last_time = df.index[-1] if len(df) else None
+        return self
+
+    def update(self, bar, final: bool = True, time=None) -> dict:
+        row = {"rsi": self.rsi.update(bar, final)}
+        for s, e in self.emas.items():
+            row[f"ema{s}"] = e.update(bar, final)
+        row["atr"] = self.atr.update(bar, final)
+        row["macd"], row["macd_signal"], row["macd_hist"] = self.macd.update(bar, final)
+        if final and time is not None:
+            self.last_time = time
+        return row
+
+class FeatureState:
+    """features.build_features for the newest bar plus its fib levels (the levels of
+    indicators.fib_levels over the last `lookback` bars), from IndicatorSet values:
+    the EMA cross flags keep the previous bar's EMAs, vol_10 the last 10 log returns
+    and the Fibonacci distance a MonotonicWindow of high/low.
+    update() returns {FEATURE_COLS..., fib382, fib50, fib618}.
+    """
+
+    def __init__(self, lookback: int = 200, prox_pct: float = 0.25):
+        self.lookback = lookback
+        self.prox_pct = prox_pct
+        self.hilo = MonotonicWindow(lookback)
+        self.rets = deque(maxlen=10)
+        self.prev_close = None
+        self.prev_ema = (NAN, NAN)
+        self.value = {}
+
+    def seed(self, df: pd.DataFrame) -> dict:
+        """df: closed bars with OHLCV, ema50/ema200 and the feature columns (a
+        features.FeatureBuffer frame); returns the last bar's values."""
+        if len(df) == 0:
+            return self.value
+        self.hilo.seed(df)
+        close = df["close"].to_numpy(dtype=float)
+        self.rets.extend(np.diff(np.log(close[-11:])).tolist())
+        self.prev_close = float(close[-1])
+        self.prev_ema = (float(df["ema50"].iat[-1]), float(df["ema200"].iat[-1]))
+        self.value = {c: float(df[c].iat[-1]) for c in FEATURE_COLS}
+        self.value.update(self._levels(*self.hilo.hi_lo, len(df)))
+        return self.value
+
+    def _levels(self, hi: float, lo: float, bars: int) -> dict:
+        if bars < self.lookback:  # rolling(lookback) is still NaN
+            return {k: NAN for k in FIB_RATIOS}
+        rng = hi - lo
+        return {k: hi - r * rng for k, r in FIB_RATIOS.items()}
+
+    def update(self, bar, ind: dict, final: bool = True) -> dict:
+        close, high, low = float(bar["close"]), float(bar["high"]), float(bar["low"])
+        ret = math.log(close) - math.log(self.prev_close) if self.prev_close else NAN
+        rets = list(self.rets)[1:] + [ret] if len(self.rets) == 10 else list(self.rets) + [ret]
+        vol_10 = float(np.std(rets, ddof=1)) if len(rets) == 10 else NAN
+        lvls = self._levels(*self.hilo.push(high, low, final), self.hilo.t + (0 if final else 1))
+        dist = min(abs(close - v) / close for v in lvls.values())
+        e50, e200 = ind["ema50"], ind["ema200"]
+        p50, p200 = self.prev_ema
+        self.value = {
+            "rsi": ind["rsi"], "ema_spread": e50 - e200,
+            "ema_cross_up": float(e50 > e200 and p50 <= p200),
+            "ema_cross_down": float(e50 < e200 and p50 >= p200),
+            "macd_edge": ind["macd"] - ind["macd_signal"],
+            "fib_rel_dist": dist, "near_fib": float(dist <= self.prox_pct / 100.0),
+            "vol_10": vol_10, "atr_norm": ind["atr"] / close, **lvls,
+        }
+        if final:
+            self.rets.append(ret)
+            self.prev_close = close
+            self.prev_ema = (e50, e200)
+        return self.value
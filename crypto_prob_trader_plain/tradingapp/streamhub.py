@@ -0,0 +1,230 @@
+"""One multiplexed Binance combined-stream websocket per process.
+
+Every LiveTicker / KlineStream subscribes its stream names ("ethusdt@aggTrade",
+"ethusdt@kline_1h", ...) on the shared hub instead of starting its own
+ThreadedWebsocketManager, so 50 watched symbols are still one socket and one
+thread. Messages arrive as {"stream": name, "data": event} and are fanned out to
+the handlers of that stream. Streams are added/removed at runtime with the
+SUBSCRIBE/UNSUBSCRIBE control messages (batched and throttled to Binance's limit
+of 5 control messages per second); on a dropped connection the hub reconnects
+with exponential backoff plus jitter and resubscribes everything.
+"""
+import asyncio
+import json
+import random
+import threading
+import time
+
+import websockets
+
+from config import settings
+
+CONTROL_PER_SECOND = 5   # Binance: incoming control messages per second per connection
+PARAMS_PER_MESSAGE = 200  # streams per SUBSCRIBE/UNSUBSCRIBE message
+
+def ws_base_url() -> str:
+    if settings.ws_url:
+        return settings.ws_url.rstrip("/")
+    return "wss://testnet.binance.vision" if settings.testnet else "wss://stream.binance.com:9443"
+
+class StreamHub:
+    def __init__(self, url: str = None, backoff_min: float = 0.5, backoff_max: float = 30.0):
+        self.url = (url or ws_base_url()) + "/stream"
+        self.backoff_min = backoff_min
+        self.backoff_max = backoff_max
+        self._handlers = {}   # stream -> tuple of callbacks (replaced, never mutated)
+        self._ops = []        # pending (method, stream) control operations, in order
+        self._lock = threading.Lock()
+        self._connect_listeners = ()
+        self._loop = None
+        self._thread = None
+        self._ws = None
+        self._flushing = False
+        self._last_control = 0.0
+        self._next_id = 1
+        self._stopping = False
+        self.connected = False
+        self.connects = 0
+        self.messages = 0
+
+    # ---------- public API (any thread) ----------
+    def start(self):
+        if self._thread is not None:
+            return self
+        ready = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(ready,), name="streamhub", daemon=True)
+        self._thread.start()
+        ready.wait()
+        return self
+
+    def stop(self):
+        """Closes the socket for good; get_hub() starts a fresh hub after this one."""
+        global _hub
+        with _lock:
+            if _hub is self:
+                _hub = None
+        self._stopping = True
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._main_task.cancel)
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        self._thread = None
+
+    def subscribe(self, stream: str, handler):
+        with self._lock:
+            handlers = self._handlers.get(stream, ())
+            self._handlers[stream] = handlers + (handler,)
+            if not handlers:
+                self._ops.append(("SUBSCRIBE", stream))
+        self._schedule_flush()
+
+    def unsubscribe(self, stream: str, handler=None):
+        with self._lock:
+            handlers = tuple(h for h in self._handlers.get(stream, ()) if handler is not None and h != handler)
+            if handlers:
+                self._handlers[stream] = handlers
+                return
+            if self._handlers.pop(stream, None) is None:
+                return
+            self._ops.append(("UNSUBSCRIBE", stream))
+        self._schedule_flush()
+
+    def on_connect(self, listener):
+        """listener(reconnect: bool) runs on the hub thread after every (re)connection."""
+        with self._lock:
+            self._connect_listeners += (listener,)
+
+    def off_connect(self, listener):
+        with self._lock:
+            self._connect_listeners = tuple(l for l in self._connect_listeners if l != listener)
+
+    def call_later(self, delay: float, callback):
+        """Runs callback() on the hub thread (where the handlers run) after `delay` seconds."""
+        if self._stopping:
+            return
+        self._loop.call_soon_threadsafe(self._loop.call_later, max(0.0, delay), callback)
+
+    def streams(self) -> list:
+        with self._lock:
+            return list(self._handlers)
+
+    def stats(self) -> dict:
+        return {"connected": self.connected, "connects": self.connects,
+                "streams": len(self._handlers), "messages": self.messages}
+
+    # ---------- hub thread ----------
+    def _run(self, ready: threading.Event):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._main_task = self._loop.create_task(self._main())
+        ready.set()
+        try:
+            self._loop.run_until_complete(self._main_task)
+        except asyncio.CancelledError:
+            pass
+        finally:
+            self._loop.close()
+
+    async def _main(self):
+        delay = self.backoff_min
+        while not self._stopping:
+            try:
+                async with websockets.connect(self.url, ping_interval=20, max_size=None) as ws:
+                    self._ws = ws
+                    with self._lock:
+                        # everything subscribed so far goes out with the reconnect; queued ops are stale
+                        self._ops.clear()
+                        streams = list(self._handlers)
+                        listeners = self._connect_listeners
+                    self.connected = True
+                    reconnect = self.connects > 0
+                    self.connects += 1
+                    delay = self.backoff_min
+                    if streams:
+                        await self._send("SUBSCRIBE", streams)
+                    for listener in listeners:
+                        try:
+                            listener(reconnect)
+                        except Exception as e:
+                            print(f"[ws] connect listener error: {e}")
+                    async for raw in ws:
+                        self._dispatch(raw)
+                    if not self._stopping:
+                        print("[ws] connection closed by server")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if not self._stopping:
+                    print(f"[ws] connection lost: {e}")
+            finally:
+                self._ws = None
+                self.connected = False
+            if self._stopping:
+                break
+            await asyncio.sleep(delay * (0.5 + random.random()))
+            delay = min(self.backoff_max, delay * 2)
+
+    def _dispatch(self, raw):
+        msg = json.loads(raw)
+        stream = msg.get("stream")
+        if stream is None:
+            return  # control replies: {"result": null, "id": n}
+        self.messages += 1
+        for handler in self._handlers.get(stream, ()):
+            try:
+                handler(msg["data"])
+            except Exception as e:
+                print(f"[ws] {stream} handler error: {e}")
+
+    def _schedule_flush(self):
+        with self._lock:
+            if self._loop is None or self._flushing or self._stopping:
+                return
+            self._flushing = True
+        self._loop.call_soon_threadsafe(lambda: self._loop.create_task(self._flush()))
+
+    async def _flush(self):
+        try:
+            while True:
+                with self._lock:
+                    ops, self._ops = self._ops, []
+                    if not ops or self._ws is None:
+                        # not connected: the next connect subscribes self._handlers
+                        self._flushing = False
+                        return
+                # consecutive operations with the same method share one message
+                method, batch = ops[0][0], []
+                for op, stream in ops:
+                    if op != method:
+                        await self._send(method, batch)
+                        method, batch = op, []
+                    batch.append(stream)
+                await self._send(method, batch)
+        except Exception as e:
+            print(f"[ws] control message failed: {e}")
+            with self._lock:
+                self._flushing = False
+
+    async def _send(self, method: str, streams: list):
+        for i in range(0, len(streams), PARAMS_PER_MESSAGE):
+            wait = self._last_control + 1.0 / CONTROL_PER_SECOND - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            self._last_control = time.monotonic()
+            await self._ws.send(json.dumps({"method": method, "params": streams[i:i + PARAMS_PER_MESSAGE],
+                                            "id": self._next_id}))
+            self._next_id += 1
+
+_lock = threading.Lock()
+_hub = None
+
+def get_hub() -> StreamHub:
+    """The process-wide hub, started on first use (and again after stop())."""
+    global _hub
+    hub = _hub
+    if hub is not None:
+        return hub
+    with _lock:
+        if _hub is None:
+            _hub = StreamHub().start()
+        return _hub
@@ -0,0 +1,59 @@
+"""Deterministic synthetic data and instrumentation shared by the tests and bench.py."""
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+from indicators import add_rsi, add_ema, add_atr, add_macd
+
+def synthetic_ohlcv(n: int, seed: int = 42, freq: str = "1min") -> pd.DataFrame:
+    """Geometric random walk with plausible high/low/volume; same seed → same frame."""
+    rng = np.random.default_rng(seed)
+    rets = rng.normal(0.0, 0.002, n)
+    close = 2000.0 * np.exp(np.cumsum(rets))
+    open_ = np.empty(n)
+    open_[0] = close[0]
+    open_[1:] = close[:-1]
+    wick = np.abs(rng.normal(0.0, 0.001, n)) * close
+    high = np.maximum(open_, close) + wick
+    low = np.minimum(open_, close) - wick
+    volume = rng.gamma(2.0, 50.0, n)
+    idx = pd.date_range("2020-01-01", periods=n, freq=freq, name="time")
+    return pd.DataFrame({"open": open_, "high": high, "low": low,
+                         "close": close, "volume": volume}, index=idx)
+
+def enriched(n, seed=42):
+    df = synthetic_ohlcv(n, seed)
+    df = add_macd(add_atr(add_ema(add_rsi(df, 14), spans=(50, 200)), 14))
+    # rsi/probabilities as uniform noise (NaN warm-up like make_features leaves behind)
+    # so every rule branch is exercised, not just the rare real rsi<50 golden crosses
+    rng = np.random.default_rng(seed + 1)
+    rsi = rng.uniform(0.0, 100.0, n)
+    rsi[:min(n, 14)] = np.nan
+    p = rng.uniform(0.0, 1.0, n)
+    p[:min(n, 200)] = np.nan
+    df["rsi"] = rsi
+    df["prob_up"] = p
+    return df
+
+def with_random_signals(n, seed=42, rate=0.01):
+    df = synthetic_ohlcv(n, seed)
+    u = np.random.default_rng(seed + 2).uniform(0.0, 1.0, n)
+    df["signal"] = np.where(u < rate, "BUY", np.where(u > 1 - rate, "SELL", ""))
+    return df
+
+STREAM_COLS = ["rsi", "ema50", "ema200", "atr", "macd", "macd_signal", "macd_hist"]
+
+@contextmanager
+def count_frame_copies():
+    """Counts DataFrame.copy() calls (the full-frame duplications) inside the block."""
+    calls = {"n": 0}
+    orig = pd.DataFrame.copy
+    def counting(self, *a, **kw):
+        calls["n"] += 1
+        return orig(self, *a, **kw)
+    pd.DataFrame.copy = counting
+    try:
+        yield calls
+    finally:
+        pd.DataFrame.copy = orig
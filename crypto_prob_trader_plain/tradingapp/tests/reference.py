@@ -0,0 +1,68 @@
+"""The original per-row implementations, kept as oracles for the equivalence tests
+(and as the "before" side of the bench.py timings)."""
+import pandas as pd
+
+from indicators import near_any_fib
+
+def signals_loop(df, lvls, prox_pct, thr):
+    """The original per-row iloc loop of strategy.generate_signals."""
+    signals = []
+    for i in range(len(df)):
+        row = df.iloc[i]
+        s = ""
+        price = row["close"]
+        if i > 0:
+            prev = df.iloc[i - 1]
+            golden_cross = (row["ema50"] > row["ema200"]) and (prev["ema50"] <= prev["ema200"])
+            death_cross  = (row["ema50"] < row["ema200"]) and (prev["ema50"] >= prev["ema200"])
+        else:
+            golden_cross = death_cross = False
+        rsi = row.get("rsi")
+        near = near_any_fib(price, lvls, prox_pct)
+        macd_ok = row["macd"] > row["macd_signal"]
+        prob_up = row.get("prob_up", 0.5)
+        if golden_cross and rsi < 50 and near and macd_ok and prob_up > thr:
+            s = "BUY"
+        elif death_cross and rsi > 70 and near and not macd_ok and prob_up < (1 - thr):
+            s = "SELL"
+        signals.append(s)
+    return signals
+
+def long_only_loop(df, fee_rate=0.0004, sl_pct=None, tp_pct=None):
+    """The original iterrows implementation of backtest.simple_long_only."""
+    balance = 0.0
+    equity_curve = []
+    in_pos = False
+    entry = 0.0
+    max_dd = 0.0
+    peak = 0.0
+    trades = []
+    for ts, row in df.iterrows():
+        price = row["close"]
+        signal = row["signal"]
+        if not in_pos and signal == "BUY":
+            in_pos = True
+            entry = price
+            trades.append({"time_in": ts, "entry": entry})
+        elif in_pos:
+            hit_exit = False
+            exit_price = price
+            if sl_pct is not None and row["low"] <= entry * (1 - sl_pct/100):
+                exit_price = entry * (1 - sl_pct/100); hit_exit = True
+            if not hit_exit and tp_pct is not None and row["high"] >= entry * (1 + tp_pct/100):
+                exit_price = entry * (1 + tp_pct/100); hit_exit = True
+            if signal == "SELL" or hit_exit:
+                ret = (exit_price * (1 - fee_rate)) / (entry * (1 + fee_rate)) - 1
+                balance += ret
+                trades[-1].update({"time_out": ts, "exit": exit_price, "ret": ret})
+                in_pos = False
+        peak = max(peak, balance)
+        dd = peak - balance
+        max_dd = max(max_dd, dd)
+        equity_curve.append(balance)
+    return {
+        "total_return": balance,
+        "max_drawdown": max_dd,
+        "equity_curve": pd.Series(equity_curve, index=df.index),
+        "trades": pd.DataFrame(trades)
+    }
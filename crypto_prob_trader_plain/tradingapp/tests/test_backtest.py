@@ -0,0 +1,34 @@
+import pandas as pd
+import pytest
+
+import backtest
+from backtest import simple_long_only
+from registry import registry
+from tests.helpers import synthetic_ohlcv, with_random_signals
+from tests.reference import long_only_loop
+
+@pytest.mark.parametrize("n", [500, 5_000])
+@pytest.mark.parametrize("seed", [1, 7, 42])
+@pytest.mark.parametrize("sl, tp", [(None, None), (1.0, 2.0), (0.2, None), (None, 0.3)])
+def test_array_backtest_matches_iterrows(n, seed, sl, tp):
+    df = with_random_signals(n, seed, rate=0.02)
+    got = simple_long_only(df, 0.0004, sl, tp)
+    want = long_only_loop(df, 0.0004, sl, tp)
+    assert got["total_return"] == want["total_return"]
+    assert got["max_drawdown"] == want["max_drawdown"]
+    pd.testing.assert_series_equal(got["equity_curve"], want["equity_curve"])
+    pd.testing.assert_frame_equal(got["trades"], want["trades"], check_dtype=False)
+
+def test_no_signals_no_trades():
+    df = with_random_signals(200, rate=0.0)
+    res = simple_long_only(df)
+    assert res["total_return"] == 0.0 and res["trades"].empty
+
+def test_run_backtests_leaves_the_model_registry_alone(tmp_path, monkeypatch):
+    monkeypatch.setattr(registry, "root", tmp_path)
+    monkeypatch.setattr(registry, "_entries", {})
+    monkeypatch.setattr(backtest, "get_klines", lambda *a, **k: synthetic_ohlcv(1_500, 9))
+    res = backtest.run_backtests(train_size=400, test_size=200, workers=1)
+    assert registry._entries == {} and list(tmp_path.iterdir()) == []
+    prob_up = res["merged"]["prob_up"]
+    assert prob_up.notna().any() and prob_up.isna().any()
@@ -0,0 +1,41 @@
+import time
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+import fake_binance
+from config import settings
+from datafeed import get_klines, interval_ms, open_store
+from fake_binance import FakeBinance
+
+@pytest.fixture
+def fake(tmp_path, monkeypatch):
+    with FakeBinance(weight_limit=10 ** 9) as fake:
+        monkeypatch.setattr(settings, "rest_url", fake.url)
+        monkeypatch.setattr(settings, "store_dir", str(tmp_path))
+        monkeypatch.setattr(settings, "testnet", False)
+        yield fake
+
+def test_larger_limit_extends_the_store_backwards(fake):
+    assert len(get_klines("ETHUSDT", "1m", 300, use_store=True)) == 300
+    df = get_klines("ETHUSDT", "1m", 2_500, use_store=True)  # three pages before the store head
+    assert len(df) == 2_500
+    assert (np.diff(df.index.as_unit("ms").asi8) == interval_ms("1m")).all()
+    assert len(get_klines("ETHUSDT", "1m", 1_000, use_store=True)) == 1_000
+
+def test_in_progress_bar_is_never_stored(fake, monkeypatch):
+    # a local clock far ahead of the exchange must not make the live candle look final
+    monkeypatch.setattr(fake_binance, "time", SimpleNamespace(time=time.time, sleep=time.sleep))
+    monkeypatch.setattr(time, "time", lambda real=time.time: real() + 3_600)
+    df = get_klines("ETHUSDT", "1m", 100, use_store=True)
+    store = open_store("ETHUSDT", "1m")
+    assert len(store) == 99
+    assert store.last_open_time() == int(df.index[-2:-1].as_unit("ms").asi8[0])
+
+def test_backwards_fill_stops_at_the_listing(fake):
+    step = interval_ms("1m")
+    fake.history_start_ms = (int(time.time() * 1000) // step - 150) * step
+    df = get_klines("ETHUSDT", "1m", 500, use_store=True)
+    assert 150 <= len(df) <= 152
+    assert df.index[0].value // 1_000_000 == fake.history_start_ms
@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+from extrema import ExtremaIndex, MonotonicWindow
+from indicators import fib_levels
+from tests.helpers import synthetic_ohlcv
+
+LOOKBACKS = (1, 2, 3, 50, 100, 200, 255, 256, 257, 1000)
+
+@pytest.mark.parametrize("n", [300, 5_000])
+@pytest.mark.parametrize("seed", [1, 7, 42])
+def test_rolling_matches_pandas(n, seed):
+    df = synthetic_ohlcv(n, seed)
+    idx = ExtremaIndex.from_frame(df, max_window=max(LOOKBACKS))
+    for lb in LOOKBACKS:
+        hi, lo = idx.rolling(lb)
+        np.testing.assert_array_equal(hi, df["high"].rolling(lb).max().to_numpy())
+        np.testing.assert_array_equal(lo, df["low"].rolling(lb).min().to_numpy())
+
+@pytest.mark.parametrize("seed", [1, 7, 42])
+def test_fib_levels_at_any_bar(seed):
+    df = synthetic_ohlcv(2_000, seed)
+    idx = ExtremaIndex.from_frame(df)
+    for t in (0, 10, 199, 200, 1_000, len(df) - 1):
+        for lb in (50, 200, 500):
+            assert idx.fib_levels(lb, t) == fib_levels(df.iloc[:t + 1], lb)
+    frames = idx.rolling_fib([200])
+    assert frames[200].iloc[-1].to_dict() == fib_levels(df, 200)
+
+def test_window_over_max_raises():
+    idx = ExtremaIndex.from_frame(synthetic_ohlcv(1_000), max_window=100)
+    with pytest.raises(ValueError):
+        idx.rolling(200)
+
+@pytest.mark.parametrize("lookback", [1, 20, 200])
+@pytest.mark.parametrize("seed", [1, 42])
+def test_monotonic_window_matches_rolling(lookback, seed):
+    df = synthetic_ohlcv(3_000, seed)
+    want_hi = df["high"].rolling(lookback).max().to_numpy()
+    want_lo = df["low"].rolling(lookback).min().to_numpy()
+    mw = MonotonicWindow(lookback)
+    for t, (h, l) in enumerate(zip(df["high"].to_numpy(), df["low"].to_numpy())):
+        # an in-progress answer first: must equal the final one and not change the state
+        assert mw.push(h, l, final=False) == mw.push(h, l)
+        if t >= lookback - 1:
+            assert mw.hi_lo == (want_hi[t], want_lo[t])
@@ -0,0 +1,31 @@
+import numpy as np
+import pandas as pd
+
+import featgraph
+from features import FeatureBuffer
+from tests.helpers import synthetic_ohlcv
+
+def test_same_content_hits_the_cache():
+    featgraph.graph.clear()
+    df = synthetic_ohlcv(1_000, 4)
+    a = featgraph.block(df)
+    assert featgraph.block(df.copy()) is a
+
+def test_corrected_middle_bar_is_a_new_version():
+    featgraph.graph.clear()
+    df = synthetic_ohlcv(1_000, 4)
+    stale = featgraph.features(df)[0]
+    fixed = df.copy()
+    fixed.iloc[500, fixed.columns.get_loc("close")] *= 1.05  # same length, ends and last bar
+    assert featgraph.data_version(fixed) != featgraph.data_version(df)
+    got = featgraph.features(fixed)[0]
+    pd.testing.assert_frame_equal(got, FeatureBuffer().compute(fixed).features()[0])
+    assert not got["vol_10"].equals(stale["vol_10"])
+
+def test_retimed_bar_with_same_values_is_a_new_version():
+    df = synthetic_ohlcv(1_000, 4)
+    moved = df.copy()
+    times = moved.index.to_numpy().copy()
+    times[400] -= np.timedelta64(30, "s")  # a splice that re-times one bar, same values and ends
+    moved.index = pd.DatetimeIndex(times, name="time")
+    assert featgraph.data_version(moved) != featgraph.data_version(df)
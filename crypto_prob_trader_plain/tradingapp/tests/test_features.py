@@ -0,0 +1,27 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from features import FeatureBuffer, make_features
+from tests.helpers import count_frame_copies, synthetic_ohlcv
+
+@pytest.mark.parametrize("n", [250, 2_000, 20_000])
+@pytest.mark.parametrize("seed", [1, 7, 42])
+@pytest.mark.parametrize("rsi_len, lookback, prox_pct", [(14, 200, 0.25), (10, 50, 0.5)])
+def test_buffer_matches_make_features(n, seed, rsi_len, lookback, prox_pct):
+    df = synthetic_ohlcv(n, seed)
+    want, cols = make_features(df, rsi_len, lookback, prox_pct)
+    got, got_cols = FeatureBuffer(n).compute(df, rsi_len, lookback, prox_pct).features()
+    assert got_cols == cols
+    pd.testing.assert_frame_equal(got[want.columns], want, check_dtype=False, check_exact=True)
+
+def test_buffer_is_reused_and_copy_free():
+    df = synthetic_ohlcv(5_000, 3)
+    buf = FeatureBuffer(5_000)
+    block = buf.block
+    with count_frame_copies() as copies:
+        feat, _ = buf.compute(df).features()
+    assert copies["n"] == 0
+    assert buf.block is block and np.shares_memory(feat.to_numpy(), block)
+    buf.compute(df.iloc[:4_000])  # a shorter history fits the same block
+    assert buf.block is block
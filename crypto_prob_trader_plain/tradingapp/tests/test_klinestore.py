@@ -0,0 +1,81 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import klinestore
+from klinestore import JOURNAL, KlineStore
+from tests.helpers import synthetic_ohlcv
+
+class Killed(BaseException):
+    """Stands in for the process dying: nothing after it runs."""
+
+def _store(tmp_path, df):
+    store = KlineStore("TEST", "1m", root=str(tmp_path))
+    store.append_frame(df)
+    return store
+
+def _merge_frame(store, df):
+    ms = df.index.as_unit("ms").asi8
+    return store.merge(ms, {c: df[c].to_numpy() for c in klinestore.VALUE_COLS})
+
+def test_append_and_merge_roundtrip(tmp_path):
+    df = synthetic_ohlcv(1_000)
+    store = _store(tmp_path, df.iloc[::2])
+    assert _merge_frame(store, df.iloc[1::2]) == 500
+    pd.testing.assert_frame_equal(KlineStore("TEST", "1m", root=str(tmp_path)).frame(), df,
+                                  check_freq=False, check_index_type=False)
+
+@pytest.mark.parametrize("crash_after", [0, 1, 3, 5])
+def test_merge_killed_mid_swap_is_finished_on_open(tmp_path, monkeypatch, crash_after):
+    df = synthetic_ohlcv(600)
+    store = _store(tmp_path, df.iloc[::3])
+    real, calls = os.replace, []
+
+    def dying_replace(src, dst):
+        if str(src).endswith(".new"):
+            if len(calls) == crash_after:
+                raise Killed  # between two column swaps, after the journal was committed
+            calls.append(src)
+        real(src, dst)
+
+    monkeypatch.setattr(klinestore.os, "replace", dying_replace)
+    with pytest.raises(Killed):
+        _merge_frame(store, df)
+    monkeypatch.undo()
+    (tmp_path / "TEST_1m" / ".lock").unlink(missing_ok=True)
+    pd.testing.assert_frame_equal(KlineStore("TEST", "1m", root=str(tmp_path)).frame(), df,
+                                  check_freq=False, check_index_type=False)
+    assert not (tmp_path / "TEST_1m" / JOURNAL).exists()
+
+def test_merge_killed_before_commit_keeps_old_rows(tmp_path, monkeypatch):
+    df = synthetic_ohlcv(600)
+    store = _store(tmp_path, df.iloc[::3])
+    before = store.frame().copy()
+
+    def dying_replace(src, dst):
+        raise Killed  # the journal itself never lands
+
+    monkeypatch.setattr(klinestore.os, "replace", dying_replace)
+    with pytest.raises(Killed):
+        _merge_frame(store, df)
+    monkeypatch.undo()
+    (tmp_path / "TEST_1m" / ".lock").unlink(missing_ok=True)
+    reopened = KlineStore("TEST", "1m", root=str(tmp_path))
+    pd.testing.assert_frame_equal(reopened.frame(), before)
+    assert not list((tmp_path / "TEST_1m").glob("*.new"))
+
+def test_store_disagreeing_with_journal_refuses_to_open(tmp_path):
+    store = _store(tmp_path, synthetic_ohlcv(100))
+    (store.dir / JOURNAL).write_text("150")
+    with pytest.raises(RuntimeError, match="corrupt"):
+        KlineStore("TEST", "1m", root=str(tmp_path))
+    with pytest.raises(RuntimeError, match="corrupt"):  # and keeps refusing
+        KlineStore("TEST", "1m", root=str(tmp_path))
+
+def test_interrupted_append_is_trimmed(tmp_path):
+    store = _store(tmp_path, synthetic_ohlcv(100))
+    with open(store._path("close"), "ab") as f:
+        f.write(np.zeros(3).tobytes())
+    assert len(KlineStore("TEST", "1m", root=str(tmp_path)).frame()) == 100
@@ -0,0 +1,57 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import featgraph
+from features import FEATURE_COLS, FeatureBuffer
+from indicators import fib_levels
+from registry import registry
+from run_live import StreamScorer, last_bar
+from stream_indicators import FeatureState, IndicatorSet
+from strategy import generate_signals
+from tests.helpers import synthetic_ohlcv
+
+def _stream(df, seed_bars, lookback=200, prox_pct=0.25):
+    """What BarStream does: one batch seed, then every bar advanced in O(1)."""
+    ind = IndicatorSet().seed(df.iloc[:seed_bars])
+    feat = FeatureState(lookback, prox_pct)
+    feat.seed(FeatureBuffer().compute(df.iloc[:seed_bars], lookback=lookback, prox_pct=prox_pct)
+              .frame(valid_only=False))
+    rows = []
+    for _, bar in df.iloc[seed_bars:].iterrows():
+        revised = {**bar, "close": bar["close"] * 0.999, "low": min(bar["low"], bar["close"] * 0.999)}
+        feat.update(revised, ind.update(revised, final=False), final=False)
+        i = ind.update(bar)
+        rows.append({"close": bar["close"], **i, **feat.update(bar, i)})
+    return pd.DataFrame(rows, index=df.index[seed_bars:])
+
+@pytest.mark.parametrize("seed_bars", [150, 400])
+@pytest.mark.parametrize("seed", [1, 7])
+def test_streaming_features_match_batch(seed_bars, seed):
+    df = synthetic_ohlcv(1_200, seed)
+    got = _stream(df, seed_bars)
+    want = FeatureBuffer().compute(df).frame(valid_only=False).iloc[seed_bars:]
+    for c in FEATURE_COLS:
+        np.testing.assert_allclose(got[c], want[c], rtol=1e-7, atol=1e-12, equal_nan=True, err_msg=c)
+    for t in (250, 700, len(df) - 1):
+        if t >= seed_bars:
+            lvls = fib_levels(df.iloc[:t + 1], 200)
+            np.testing.assert_allclose([got[k].iat[t - seed_bars] for k in lvls], list(lvls.values()))
+
+def test_stream_scorer_decides_like_generate_signals(tmp_path, monkeypatch):
+    monkeypatch.setattr(registry, "root", tmp_path)
+    monkeypatch.setattr(registry, "_entries", {})
+    featgraph.graph.clear()
+    df = synthetic_ohlcv(1_000, 11)
+    rows = _stream(df, 500)
+    latest = {"time": df.index[-1], **rows.iloc[-1].to_dict()}
+    scorer = StreamScorer(SimpleNamespace(window=SimpleNamespace(df=df), latest=lambda: dict(latest)))
+    scorer.check_model()
+    bar, lvls = scorer.state()
+
+    want = last_bar(generate_signals(df, 14, 200, 0.25)[0])
+    assert lvls == pytest.approx(fib_levels(df, 200))
+    for k in ("close", "rsi", "ema50", "ema200", "atr", "macd", "macd_signal", "ema_cross_up", "prob_up"):
+        assert bar[k] == pytest.approx(want[k], rel=1e-6), k
@@ -0,0 +1,22 @@
+import sys
+
+import numpy as np
+
+import run_multi
+
+def test_max_rss_is_megabytes():
+    # a Python process is well above 1MB and nowhere near 1TB, whatever ru_maxrss's unit
+    assert 1 < run_multi.max_rss_mb() < 1024 * 1024
+
+def test_max_rss_without_resource_module(monkeypatch):
+    monkeypatch.setitem(sys.modules, "resource", None)  # as on Windows
+    assert np.isnan(run_multi.max_rss_mb())
+
+def test_load_test_against_fake_exchange(monkeypatch):
+    # load_test points these at its temp dirs / fake exchange; restore them afterwards
+    monkeypatch.setattr(run_multi.settings, "rest_url", run_multi.settings.rest_url)
+    monkeypatch.setattr(run_multi.settings, "store_dir", run_multi.settings.store_dir)
+    monkeypatch.setattr(run_multi.registry, "root", run_multi.registry.root)
+    states = run_multi.load_test(3, cycles=2, limit=300, latency_s=0.0, cpu_workers=2)
+    assert sum(st.errors for st in states) == 0
+    assert all(np.isfinite(st.eval_s) and st.prev_lvls is not None for st in states)
@@ -0,0 +1,34 @@
+import pytest
+
+from features import make_features
+from registry import ModelRegistry
+from tests.helpers import synthetic_ohlcv
+
+def _features(seed, n=2_000):
+    return make_features(synthetic_ohlcv(n, seed), 14, 200, 0.25)
+
+@pytest.mark.parametrize("seed", range(1, 9))
+def test_fresh_fit_needs_no_retrain(tmp_path, seed):
+    reg = ModelRegistry(root=str(tmp_path), max_age_h=24, drift=1.0)
+    feat_df, feats = _features(seed)
+    entry = reg.fit("k", feat_df, feats)
+    assert reg.retrain_reason(entry, feat_df) is None
+    assert reg.get(feat_df, feats, "ETHUSDT", "1h") is not None
+    fitted = reg.get(feat_df, feats, "ETHUSDT", "1h")
+    assert reg.get(feat_df, feats, "ETHUSDT", "1h") is fitted  # no refit per poll
+
+def test_drift_and_age_trigger_a_retrain(tmp_path):
+    reg = ModelRegistry(root=str(tmp_path), max_age_h=24, drift=1.0)
+    feat_df, feats = _features(1)
+    entry = reg.fit("k", feat_df, feats)
+    shifted = feat_df.copy()
+    shifted.iloc[-200:, shifted.columns.get_loc("rsi")] += 60.0
+    assert reg.retrain_reason(entry, shifted) == "drift"
+    entry.meta["trained_at"] -= 25 * 3600
+    assert reg.retrain_reason(entry, feat_df) == "age"
+
+def test_saved_model_is_reloaded(tmp_path):
+    feat_df, feats = _features(2)
+    first = ModelRegistry(root=str(tmp_path)).get(feat_df, feats, "ETHUSDT", "1h")
+    again = ModelRegistry(root=str(tmp_path)).get(feat_df, feats, "ETHUSDT", "1h")
+    assert again.meta["trained_at"] == first.meta["trained_at"]
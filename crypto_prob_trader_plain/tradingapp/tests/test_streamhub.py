@@ -0,0 +1,33 @@
+import time
+
+import pytest
+
+import streamhub
+from config import settings
+from fake_binance import FakeStreams
+
+@pytest.fixture
+def streams(monkeypatch):
+    with FakeStreams() as fake:
+        monkeypatch.setattr(settings, "ws_url", fake.url)
+        monkeypatch.setattr(streamhub, "_hub", None)
+        yield fake
+        if streamhub._hub is not None:
+            streamhub._hub.stop()
+
+def _wait(cond, timeout=5.0):
+    t0 = time.monotonic()
+    while not cond() and time.monotonic() - t0 < timeout:
+        time.sleep(0.02)
+    return cond()
+
+def test_get_hub_after_stop_starts_a_fresh_hub(streams):
+    old = streamhub.get_hub()
+    old.stop()
+    old.subscribe("ethusdt@trade", lambda msg: None)  # a stale reference must not raise either
+    hub = streamhub.get_hub()
+    assert hub is not old
+    got = []
+    hub.subscribe("ethusdt@trade", got.append)
+    assert _wait(lambda: got)
+    assert got[0]["e"] == "trade"
@@ -0,0 +1,52 @@
+import time
+
+import ws_live
+from ws_live import BarAggregator, LiveTicker
+
+def test_flush_closes_a_bar_without_a_trade():
+    agg = BarAggregator("15s")
+    agg.add(100.0, 1.0, 1_000)
+    agg.add(101.0, 2.0, 14_000)
+    assert agg.flush(14_999) == []
+    assert agg.flush(15_000) == [(0, 100.0, 101.0, 100.0, 101.0, 3.0)]
+    assert agg.current() is None
+    # a quiet market keeps producing flat bars, then the next trade opens its own bar
+    assert agg.flush(47_000) == [(15_000, 101.0, 101.0, 101.0, 101.0, 0.0),
+                                 (30_000, 101.0, 101.0, 101.0, 101.0, 0.0)]
+    assert agg.add(99.0, 1.0, 76_000) == [(45_000, 101.0, 101.0, 101.0, 101.0, 0.0),
+                                          (60_000, 101.0, 101.0, 101.0, 101.0, 0.0)]
+    assert agg.current() == (75_000, 99.0, 99.0, 99.0, 99.0, 1.0)
+    assert len(agg.frame()) == 6
+
+class _Hub:
+    def __init__(self):
+        self.timers = []
+
+    def subscribe(self, stream, handler):
+        pass
+
+    def unsubscribe(self, stream, handler=None):
+        pass
+
+    def call_later(self, delay, callback):
+        self.timers.append((delay, callback))
+
+def test_ticker_timer_closes_the_last_bar(monkeypatch):
+    hub = _Hub()
+    monkeypatch.setattr(ws_live, "get_hub", lambda: hub)
+    ticker = LiveTicker("ETHUSDT", bar_intervals=("1s",))
+    ticker.start()
+    t = int(time.time() * 1000) - 3_000
+    ticker._on_msg({"e": "trade", "p": "100.5", "q": "2", "T": t, "m": False})
+    assert ticker.bars(include_current=False).empty
+
+    delay, fire = hub.timers.pop()
+    assert 0 < delay <= 1.5
+    fire()  # no trade since: the timer alone closes the bar and fills the silence
+    bars = ticker.bars(include_current=False)
+    assert len(bars) >= 2 and bars["volume"].iat[0] == 2.0 and (bars["volume"].iloc[1:] == 0).all()
+    assert len(hub.timers) == 1  # re-armed for the next boundary
+
+    ticker.stop()
+    hub.timers.pop()[1]()  # a timer from before stop() is a no-op
+    assert hub.timers == []
@@ -0,0 +1,136 @@
+"""Walk-forward training: fit on a train window, score the next test window, slide on.
+
+Windows are "expanding" (train always starts at the first row) or "rolling" (fixed
+train length). The label y is the next bar's return, so the last train row's label
+would be the first test bar: a one-bar purge between train and test drops it.
+Every fold is independent, so folds run in parallel on a process pool; the feature
+block is published once through shared memory (sweep.SharedFrame) and each task
+only carries its four row positions. The out-of-sample prob_up of all test windows
+is stitched into one series that goes straight into the backtester.
+
+    python walkforward.py --train 2000 --test 250 --mode rolling --workers 4
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from config import settings
+from model import fit_prob_model, evaluate
+from sweep import SharedFrame
+
+PURGE = 1  # y[t] looks one bar ahead
+
+def fold_ranges(n: int, train_size: int, test_size: int, mode: str = "expanding",
+                purge: int = PURGE) -> list:
+    """[(train_start, train_stop, test_start, test_stop), ...] covering rows train_size+purge..n,
+    with `purge` unused rows between each train window and its test window."""
+    if mode not in ("expanding", "rolling"):
+        raise ValueError(f"Unsupported walk-forward mode {mode}")
+    folds = []
+    for test_start in range(train_size + purge, n, test_size):
+        train_stop = test_start - purge
+        train_start = 0 if mode == "expanding" else train_stop - train_size
+        folds.append((train_start, train_stop, test_start, min(n, test_start + test_size)))
+    return folds
+
+# ---------- worker side ----------
+_shared = None
+
+def _init_worker(spec):
+    global _shared
+    _shared = SharedFrame.attach(spec)
+
+def _fit_fold(fold, feats, C):
+    return _score_fold(_shared.frame(), fold, feats, C)
+
+def _score_fold(frame, fold, feats, C):
+    train_start, train_stop, test_start, test_stop = fold
+    train, test = frame.iloc[train_start:train_stop], frame.iloc[test_start:test_stop]
+    t0 = time.perf_counter()
+    model = fit_prob_model(train, feats, C=C)
+    fit_s = time.perf_counter() - t0
+    prob = model.predict_proba(test[feats].values)[:, 1]
+    if test["y"].nunique() > 1:
+        metrics = evaluate(model, test, feats)
+    else:  # one-class test window: AUC undefined
+        metrics = {"AUC": np.nan, "Brier": np.nan, "LogLoss": np.nan}
+    row = {"train_start": frame.index[train_start], "test_start": frame.index[test_start],
+           "test_end": frame.index[test_stop - 1], "train_rows": train_stop - train_start,
+           "test_rows": test_stop - test_start, "fit_s": fit_s, **metrics}
+    return test_start, prob, row
+
+# ---------- parent side ----------
+def walk_forward(feat_df: pd.DataFrame, feats, train_size: int = None, test_size: int = None,
+                 mode: str = None, workers: int = None, C: float = 1.0):
+    """Returns (prob_up, folds): out-of-sample prob_up on feat_df.index (NaN inside the
+    first train window and its purge bar) and one row of test metrics per fold."""
+    train_size = train_size or settings.wf_train
+    test_size = test_size or settings.wf_test
+    mode = mode or settings.wf_mode
+    folds = fold_ranges(len(feat_df), train_size, test_size, mode)
+    prob_up = np.full(len(feat_df), np.nan)
+    if not folds:
+        return pd.Series(prob_up, index=feat_df.index, name="prob_up"), pd.DataFrame()
+
+    workers = workers or min(len(folds), os.cpu_count() or 1)
+    shared = SharedFrame.publish(feat_df[list(feats) + ["y"]])
+    rows = []
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(shared.spec,)) as pool:
+            for test_start, prob, row in pool.map(_fit_fold, folds, [list(feats)] * len(folds),
+                                                  [C] * len(folds)):
+                prob_up[test_start:test_start + len(prob)] = prob
+                rows.append(row)
+    finally:
+        shared.close(unlink=True)
+
+    folds_df = pd.DataFrame(rows)
+    folds_df.index.name = "fold"
+    return pd.Series(prob_up, index=feat_df.index, name="prob_up"), folds_df
+
+def oos_prob_up(feat_df: pd.DataFrame, feats, train_size: int = None, test_size: int = None,
+                mode: str = None, C: float = 1.0):
+    """walk_forward() without the process pool: the same (prob_up, folds), fitted serially
+    in this process. For callers that already run inside a pool worker (sweep tasks)."""
+    folds = fold_ranges(len(feat_df), train_size or settings.wf_train, test_size or settings.wf_test,
+                        mode or settings.wf_mode)
+    prob_up = np.full(len(feat_df), np.nan)
+    rows = []
+    for fold in folds:
+        test_start, prob, row = _score_fold(feat_df, fold, list(feats), C)
+        prob_up[test_start:test_start + len(prob)] = prob
+        rows.append(row)
+    folds_df = pd.DataFrame(rows)
+    folds_df.index.name = "fold"
+    return pd.Series(prob_up, index=feat_df.index, name="prob_up"), folds_df
+
+def summarize_folds(folds: pd.DataFrame) -> dict:
+    """Out-of-sample metrics averaged over folds (weighted by test rows)."""
+    out = {}
+    for k in ("AUC", "Brier", "LogLoss"):
+        ok = folds[k].notna()
+        if ok.any():
+            out[k] = float(np.average(folds.loc[ok, k], weights=folds.loc[ok, "test_rows"]))
+    return out
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--train", type=int, default=settings.wf_train, help="train window (bars)")
+    ap.add_argument("--test", type=int, default=settings.wf_test, help="test window (bars)")
+    ap.add_argument("--mode", choices=["expanding", "rolling"], default=settings.wf_mode)
+    ap.add_argument("--workers", type=int, default=None)
+    args = ap.parse_args()
+
+    from backtest import run_backtests
+    t0 = time.perf_counter()
+    res = run_backtests(train_size=args.train, test_size=args.test, mode=args.mode, workers=args.workers)
+    print(f"\n{len(res['folds'])} folds in {time.perf_counter() - t0:.1f}s")
+    print(res["folds"][["test_start", "test_end", "train_rows", "AUC", "Brier", "fit_s"]].to_string())
+
+if __name__ == "__main__":
+    main()
@@ -1,44 +1,325 @@
-# ws_live.py
-import threading
-from binance import ThreadedWebsocketManager
-from config import settings
-
-class LiveTicker:
-    """
-    Binance trade WebSocket: κρατάει την τελευταία τιμή σε πραγματικό χρόνο.
-    Public stream (δεν χρειάζονται API keys για ανάγνωση).
-    """
-    def __init__(self, symbol: str):
-        self.symbol = symbol.upper()
-        self.latest_price: float | None = None
-        self.latest_ts: int | None = None
-        self._lock = threading.Lock()
-        self._twm: ThreadedWebsocketManager | None = None
-        self._started = False
-
-    def _on_msg(self, msg: dict):
-        # trade event → price 'p' (string), trade time 'T'
-        if msg.get("e") == "trade":
-            try:
-                p = float(msg["p"])
-                t = int(msg["T"])
-            except Exception:
-                return
-            with self._lock:
-                self.latest_price = p
-                self.latest_ts = t
-
-    def start(self):
-        if self._started:
-            return
-        # testnet flag από settings (αν το spot testnet δεν εκπέμπει, βάλε BINANCE_TESTNET=false)
-        self._twm = ThreadedWebsocketManager(testnet=settings.testnet)
-        self._twm.start()
-        self._twm.start_trade_socket(callback=self._on_msg, symbol=self.symbol)
-        self._started = True
-
-    def stop(self):
-        if self._twm:
-            self._twm.stop()
-            self._twm = None
-        self._started = False
+# ws_live.py
+import bisect
+import queue
+import time
+from collections import deque, namedtuple
+import numpy as np
+import pandas as pd
+from config import settings
+from datafeed import interval_ms
+from streamhub import get_hub
+
+class TradeRing:
+    """
+    Ring buffer σταθερής χωρητικότητας για trades (price, qty, time, side) σε numpy arrays.
+    side: +1 όταν ο aggressor αγοράζει, -1 όταν πουλάει (Binance 'm' = buyer is maker).
+    """
+    def __init__(self, capacity: int = 100_000):
+        self.capacity = capacity
+        self.price = np.zeros(capacity)
+        self.qty = np.zeros(capacity)
+        self.time = np.zeros(capacity, dtype=np.int64)
+        self.side = np.zeros(capacity, dtype=np.int8)
+        self.count = 0  # trades ever pushed; slot = count % capacity
+
+    def push(self, price: float, qty: float, t: int, side: int):
+        i = self.count % self.capacity
+        self.price[i], self.qty[i], self.time[i], self.side[i] = price, qty, t, side
+        self.count += 1
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    def last(self, n: int = None) -> dict:
+        """Τα τελευταία n trades σε χρονολογική σειρά (αντίγραφα)."""
+        n = len(self) if n is None else min(n, len(self))
+        idx = (np.arange(self.count - n, self.count)) % self.capacity
+        return {"price": self.price[idx], "qty": self.qty[idx], "time": self.time[idx], "side": self.side[idx]}
+
+    def since(self, t_ms: int) -> dict:
+        """Trades με time >= t_ms που υπάρχουν ακόμα στο buffer."""
+        out = self.last()
+        k = int(np.searchsorted(out["time"], t_ms, side="left"))
+        return {c: v[k:] for c, v in out.items()}
+
+BAR_COLS = ["open", "high", "low", "close", "volume"]
+
+class BarAggregator:
+    """
+    Χτίζει OHLCV κεριά οποιουδήποτε interval (και κάτω από λεπτό, π.χ. "15s") από trades.
+    Διαστήματα χωρίς trade βγαίνουν επίπεδα κεριά με volume 0, όπως στα klines του Binance.
+    """
+    def __init__(self, interval: str, max_bars: int = 1000):
+        self.interval = interval
+        self.step = interval_ms(interval)
+        self.bars: deque = deque(maxlen=max_bars)  # κλειστά κεριά: (open_ms, o, h, l, c, v)
+        self._cur = None                           # [open_ms, o, h, l, c, v]
+
+    def add(self, price: float, qty: float, t: int) -> list:
+        """Προσθέτει ένα trade· επιστρέφει τα κεριά που έκλεισαν εξαιτίας του."""
+        start = t - t % self.step
+        closed = []
+        cur = self._cur
+        if cur is not None and start < cur[0]:
+            return closed  # trade από κερί που έχει ήδη κλείσει
+        if cur is not None and start > cur[0]:
+            closed = self._close_until(start)
+            cur = None
+        if cur is None:
+            if self.bars and start <= self.bars[-1][0]:
+                return closed
+            closed += self._flat_until(start)  # σιωπή μετά από flush(): επίπεδα κεριά μέχρι αυτό το trade
+            self._cur = [start, price, price, price, price, qty]
+            return closed
+        cur[2] = max(cur[2], price)
+        cur[3] = min(cur[3], price)
+        cur[4] = price
+        cur[5] += qty
+        return closed
+
+    def flush(self, now_ms: int) -> list:
+        """Κλείνει το τρέχον κερί αν πέρασε ο χρόνος του, χωρίς να χρειάζεται νέο trade·
+        σε συνεχιζόμενη σιωπή προσθέτει επίπεδα κεριά μέχρι το now_ms."""
+        start = now_ms - now_ms % self.step
+        if self._cur is None:
+            return self._flat_until(start)
+        if start <= self._cur[0]:
+            return []
+        return self._close_until(start)
+
+    def _flat_until(self, start: int) -> list:
+        if not self.bars:
+            return []
+        close = self.bars[-1][4]
+        fill = [(t, close, close, close, close, 0.0) for t in range(self.bars[-1][0] + self.step, start, self.step)]
+        self.bars.extend(fill)
+        return fill
+
+    def _close_until(self, start: int) -> list:
+        self.bars.append(tuple(self._cur))
+        self._cur = None
+        return [self.bars[-1]] + self._flat_until(start)
+
+    def current(self):
+        return tuple(self._cur) if self._cur is not None else None
+
+    def frame(self, include_current: bool = True) -> pd.DataFrame:
+        """Τα κεριά σαν datafeed.get_klines (index 'time' = open time, OHLCV float στήλες)."""
+        rows = list(self.bars)
+        if include_current and self._cur is not None:
+            rows.append(tuple(self._cur))
+        arr = np.array(rows, dtype=float).reshape(-1, 6)
+        idx = pd.DatetimeIndex(pd.to_datetime(arr[:, 0].astype(np.int64), unit="ms"), name="time")
+        return pd.DataFrame(arr[:, 1:], index=idx, columns=BAR_COLS)
+
+LATENCY_EDGES_MS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+class LatencyHistogram:
+    """
+    Ιστόγραμμα καθυστερήσεων (ms) με σταθερά bins: record() είναι ένα bisect κι ένα +1,
+    χωρίς lock (ένας writer, το thread του websocket). Η πρώτη θέση μετράει τιμές < 0
+    (ρολόι πίσω από του exchange), η τελευταία ό,τι ξεπερνά το μεγαλύτερο όριο.
+    """
+    def __init__(self, edges_ms=LATENCY_EDGES_MS):
+        self.edges = list(edges_ms)
+        self.counts = [0] * (len(self.edges) + 1)
+        self.total = 0.0
+        self.max = float("-inf")
+
+    def record(self, ms: float):
+        self.counts[bisect.bisect_right(self.edges, ms)] += 1
+        self.total += ms
+        if ms > self.max:
+            self.max = ms
+
+    def snapshot(self) -> dict:
+        counts = list(self.counts)
+        n = sum(counts)
+        out = {"count": n, "mean_ms": self.total / n if n else 0.0, "max_ms": self.max if n else 0.0,
+               "bins": {f"<{e}": c for e, c in zip(self.edges, counts)} | {f">={self.edges[-1]}": counts[-1]}}
+        cum = np.cumsum(counts)
+        for q in (50, 95, 99):
+            # άνω όριο του bin που περιέχει το quantile
+            k = int(np.searchsorted(cum, n * q / 100.0)) if n else 0
+            out[f"p{q}_ms"] = float(self.edges[k]) if k < len(self.edges) else float("inf")
+        return out
+
+    def reset(self):
+        self.counts = [0] * (len(self.edges) + 1)
+        self.total = 0.0
+        self.max = float("-inf")
+
+Tick = namedtuple("Tick", "price ts seq")
+
+FLUSH_GRACE_MS = 500  # περιθώριο για trades που φτάνουν λίγο μετά το όριο του κεριού
+
+class LiveTicker:
+    """
+    Binance trade/aggTrade WebSocket: κρατάει την τελευταία τιμή σε πραγματικό χρόνο,
+    όλα τα πρόσφατα trades σε ring buffer και κεριά (bar_intervals) χτισμένα τοπικά,
+    χωρίς κλήσεις REST. Το aggTrade stream στέλνει λιγότερα μηνύματα στα ίδια κεριά.
+    Public stream (δεν χρειάζονται API keys για ανάγνωση).
+
+    Χωρίς lock στο hot path: μόνο το thread του websocket γράφει. Η τελευταία τιμή είναι
+    ένα immutable Tick που αντικαθίσταται ατομικά· buffer και κεριά διαβάζονται με
+    versioned αντίγραφο (seqlock: μονός αριθμός = εγγραφή σε εξέλιξη, ξαναδοκιμή αν άλλαξε).
+    feed_latency: τοπική ώρα λήψης − ώρα trade 'T' του exchange· callback_cost: κόστος ανά μήνυμα.
+    Ένας timer στο thread του hub κλείνει τα κεριά σε κάθε όριο interval και χωρίς trade.
+    """
+    def __init__(self, symbol: str, stream: str = None, capacity: int = None, bar_intervals=("1m",)):
+        self.symbol = symbol.upper()
+        self.stream = stream or settings.trade_stream
+        self.trades = TradeRing(capacity or settings.trade_buffer)
+        self.aggregators = {iv: BarAggregator(iv) for iv in bar_intervals}
+        self.feed_latency = LatencyHistogram()
+        self.callback_cost = LatencyHistogram((0, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1, 5))
+        self._tick = Tick(None, None, 0)
+        self._seq = 0
+        self._stream_name = f"{self.symbol.lower()}@{'aggTrade' if self.stream == 'aggTrade' else 'trade'}"
+        self._started = False
+        self._timer = 0  # γενιά του timer· stop() ακυρώνει όποιον εκκρεμεί
+
+    @property
+    def latest_price(self) -> float | None:
+        return self._tick.price
+
+    @property
+    def latest_ts(self) -> int | None:
+        return self._tick.ts
+
+    def snapshot(self) -> Tick:
+        """(price, ts, seq) της ίδιας ενημέρωσης, με μία ανάγνωση."""
+        return self._tick
+
+    def _on_msg(self, msg: dict):
+        # trade / aggTrade event → price 'p', qty 'q' (strings), trade time 'T', buyer-is-maker 'm'
+        if msg.get("e") in ("trade", "aggTrade"):
+            t0 = time.perf_counter()
+            recv_ms = time.time() * 1000.0
+            try:
+                p = float(msg["p"])
+                q = float(msg["q"])
+                t = int(msg["T"])
+                side = -1 if msg.get("m") else 1
+            except Exception:
+                return
+            self._seq += 1  # μονός: εγγραφή σε εξέλιξη
+            self.trades.push(p, q, t, side)
+            for agg in self.aggregators.values():
+                agg.add(p, q, t)
+            self._seq += 1
+            self._tick = Tick(p, t, self._seq)
+            self.feed_latency.record(recv_ms - t)
+            self.callback_cost.record((time.perf_counter() - t0) * 1000.0)
+
+    def _flush_bars(self, timer: int):
+        """Timer στο thread του hub (ο ίδιος writer με το _on_msg): κλείνει ό,τι έληξε."""
+        if timer != self._timer:
+            return
+        now_ms = int(time.time() * 1000)
+        self._seq += 1
+        try:
+            for agg in self.aggregators.values():
+                agg.flush(now_ms - FLUSH_GRACE_MS)
+        finally:
+            self._seq += 1
+        self._schedule_flush(now_ms)
+
+    def _schedule_flush(self, now_ms: int):
+        # ξυπνάει λίγο μετά το επόμενο όριο κεριού, όποιου interval έρχεται πρώτο
+        wait_ms = min(agg.step - now_ms % agg.step for agg in self.aggregators.values()) + FLUSH_GRACE_MS
+        timer = self._timer
+        get_hub().call_later(wait_ms / 1000.0, lambda: self._flush_bars(timer))
+
+    def _read(self, fn):
+        """Αντίγραφο που δεν μπλέχτηκε με εγγραφή: ξαναδοκιμάζει αν άλλαξε το seq."""
+        while True:
+            seq = self._seq
+            if seq & 1:
+                time.sleep(0)
+                continue
+            try:
+                out = fn()
+            except RuntimeError:  # deque άλλαξε κατά την αντιγραφή
+                continue
+            if self._seq == seq:
+                return out
+
+    def bars(self, interval: str = None, include_current: bool = True) -> pd.DataFrame:
+        """OHLCV κεριά από το stream· το τελευταίο είναι το τρέχον (ή το τελευταίο με trades)."""
+        agg = self.aggregators[interval or next(iter(self.aggregators))]
+        return self._read(lambda: agg.frame(include_current))
+
+    def recent_trades(self, n: int = None) -> dict:
+        return self._read(lambda: self.trades.last(n))
+
+    def latency(self) -> dict:
+        return {"feed": self.feed_latency.snapshot(), "callback": self.callback_cost.snapshot()}
+
+    def start(self):
+        if self._started:
+            return
+        # ένα κοινό multiplexed socket για όλα τα symbols (streamhub)· testnet/URL από settings
+        # (αν το spot testnet δεν εκπέμπει, βάλε BINANCE_TESTNET=false)
+        get_hub().subscribe(self._stream_name, self._on_msg)
+        self._started = True
+        if self.aggregators:
+            self._schedule_flush(int(time.time() * 1000))
+
+    def stop(self):
+        if self._started:
+            get_hub().unsubscribe(self._stream_name, self._on_msg)
+        self._started = False
+        self._timer += 1
+
+# raw: kline στη μορφή γραμμής του REST (datafeed.KLINE_COLS), closed: τελικό κερί,
+# event_ms: ώρα γεγονότος του exchange, received: time.perf_counter() στη λήψη
+KlineEvent = namedtuple("KlineEvent", "raw closed event_ms received")
+
+class KlineStream:
+    """
+    Binance kline WebSocket: κάθε ενημέρωση κεριού (σε εξέλιξη ή κλειστό) μπαίνει σε ουρά.
+    Ο live runner ξυπνάει τη στιγμή που κλείνει το κερί αντί να κάνει polling.
+    """
+    def __init__(self, symbol: str, interval: str):
+        self.symbol = symbol.upper()
+        self.interval = interval
+        self._q: queue.Queue = queue.Queue()
+        self._stream_name = f"{self.symbol.lower()}@kline_{interval}"
+        self._started = False
+
+    def _on_msg(self, msg: dict):
+        if msg.get("e") != "kline":
+            return
+        k = msg["k"]
+        try:
+            raw = [int(k["t"]), k["o"], k["h"], k["l"], k["c"], k["v"],
+                   int(k["T"]), k["q"], int(k["n"]), k["V"], k["Q"], "0"]
+            closed = bool(k["x"])
+        except Exception:
+            return
+        self._q.put(KlineEvent(raw, closed, int(msg.get("E", 0)), time.perf_counter()))
+
+    def get(self, timeout: float) -> list:
+        """Μπλοκάρει μέχρι το πρώτο γεγονός (ή timeout → []) και επιστρέφει και όσα περιμένουν."""
+        try:
+            events = [self._q.get(timeout=timeout)]
+        except queue.Empty:
+            return []
+        while True:
+            try:
+                events.append(self._q.get_nowait())
+            except queue.Empty:
+                return events
+
+    def start(self):
+        if self._started:
+            return self
+        get_hub().subscribe(self._stream_name, self._on_msg)
+        self._started = True
+        return self
+
+    def stop(self):
+        if self._started:
+            get_hub().unsubscribe(self._stream_name, self._on_msg)
+        self._started = False